@@ -1,23 +1,27 @@
 import logging
 from flask import Flask, jsonify
 from flask_cors import CORS
-from controllers import chat_bp, call_bp
+from controllers import chat_bp, call_bp, menu_bp
+from controllers.common import RequestError, health_report
 
 app = Flask(__name__)
 CORS(app)
 
 app.register_blueprint(chat_bp)
 app.register_blueprint(call_bp)
+app.register_blueprint(menu_bp)
+
+@app.errorhandler(RequestError)
+def request_error(error):
+    body, status_code = error.response()
+    return jsonify(body), status_code
+
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    from services import whatsapp_service, phone_number_service
-    
-    return jsonify({
-        'status': 'healthy',
-        'active_whatsapp_sessions': whatsapp_service.get_active_sessions_count(),
-        'active_call_sessions': phone_number_service.get_active_sessions_count()
-    }), 200
+    from services import whatsapp_service
+
+    return jsonify(health_report(whatsapp_service.queue, whatsapp_service.graph)), 200
 
 
 if __name__ == '__main__':
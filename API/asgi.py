@@ -0,0 +1,26 @@
+"""ASGI entry point: the same API as app.py on an event loop.
+
+    hypercorn asgi:app --bind 0.0.0.0:5000
+"""
+from quart import Quart, jsonify
+from quart_cors import cors
+from controllers.aio import chat_bp, call_bp, menu_bp
+from controllers.common import RequestError, health_report
+
+app = cors(Quart(__name__))
+
+app.register_blueprint(chat_bp)
+app.register_blueprint(call_bp)
+app.register_blueprint(menu_bp)
+
+@app.errorhandler(RequestError)
+async def request_error(error):
+    body, status_code = error.response()
+    return jsonify(body), status_code
+
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    from services import whatsapp_service
+
+    return jsonify(health_report(whatsapp_service.async_queue, whatsapp_service.async_graph, mode='asgi')), 200
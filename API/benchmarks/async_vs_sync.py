@@ -0,0 +1,135 @@
+"""Webhook throughput: sync Flask worker threads vs. one async (ASGI) worker.
+
+Gemini and the Graph API are replaced by stubs that only sleep for a fixed
+latency, so the numbers show how many turns one worker keeps in flight
+rather than how fast the real backends are.
+
+    cd API
+    python -m benchmarks.async_vs_sync --messages 300 --threads 8
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import whatsapp_service
+
+
+class StubLLM:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def chat(self, text):
+        time.sleep(self.latency)
+        return f"echo: {text}"
+
+    async def achat(self, text):
+        await asyncio.sleep(self.latency)
+        return f"echo: {text}"
+
+
+def install_stubs(senders, llm_latency, graph_latency):
+    whatsapp_service.chat_sessions.clear()
+    for sender in senders:
+        whatsapp_service.chat_sessions[sender] = StubLLM(llm_latency)
+    # Whole turns inside the request, non-streamed, as this compares servers
+    whatsapp_service.stream_replies = False
+    whatsapp_service.async_ack = False
+
+    def send_message(to, text):
+        time.sleep(graph_latency)
+        return {}
+
+    async def send_message_async(to, text):
+        await asyncio.sleep(graph_latency)
+        return {}
+
+    whatsapp_service.send_message = send_message
+    whatsapp_service.send_message_async = send_message_async
+
+
+def webhook_payload(sender, text, message_id=None):
+    message = {"from": sender, "text": {"body": text}}
+    if message_id is not None:
+        message["id"] = message_id
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "messages": [message]
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def run_sync(payloads, threads):
+    from app import app
+
+    client = app.test_client()
+
+    def post(payload):
+        return client.post("/chat/webhook", json=payload).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(post, payloads))
+    return time.perf_counter() - start, statuses
+
+
+def run_async(payloads):
+    from asgi import app
+
+    async def main():
+        client = app.test_client()
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post("/chat/webhook", json=p) for p in payloads)
+        )
+        return time.perf_counter() - start, [r.status_code for r in responses]
+
+    return asyncio.run(main())
+
+
+def report(label, elapsed, statuses):
+    ok = sum(1 for s in statuses if s == 200)
+    print(
+        f"{label:<30} {elapsed:7.2f} s   {len(statuses) / elapsed:8.1f} msg/s   "
+        f"{ok}/{len(statuses)} ok"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=8, help="sync worker threads")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--graph-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    senders = [f"9715000{i:05d}" for i in range(args.messages)]
+    payloads = [webhook_payload(s, "I want a burger") for s in senders]
+    install_stubs(senders, args.llm_latency, args.graph_latency)
+
+    turn = args.llm_latency + args.graph_latency
+    print(
+        f"{args.messages} webhooks, stubbed turn = {turn:.2f} s "
+        f"(LLM {args.llm_latency} s + Graph {args.graph_latency} s)\n"
+    )
+    # Silence the per-message User:/Bot: logging while timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_result = run_sync(payloads, args.threads)
+        async_result = run_async(payloads)
+
+    report(f"Flask, {args.threads} threads", *sync_result)
+    report("ASGI, 1 worker", *async_result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Status notifications for a batch of orders: one /chat/notify-status call
+per order (what LiveOrders does) vs. one /chat/notify-status/bulk call.
+
+Orders live in the in-memory storage backend behind a fixed round-trip
+delay standing in for Supabase, and sends go to the local stub Graph
+server, so the numbers show wall time, database round trips and
+WhatsApp messages delivered for the whole batch.
+
+    cd API
+    python -W ignore -m benchmarks.bulk_notify --orders 40
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+from benchmarks.storage_baseline import MENU
+from benchmarks.stub_graph import StubGraphServer
+from services import whatsapp_service
+from services.menu_catalog import menu_catalog
+from services.storage_backend import SQLiteStorage, set_storage_backend
+
+
+class RemoteStorage(SQLiteStorage):
+    """SQLite with a network round trip added to every query"""
+
+    def __init__(self, round_trip):
+        super().__init__(":memory:")
+        self.round_trip = round_trip
+        self.queries = 0
+        self._count_lock = threading.Lock()
+
+    def _remote(self):
+        with self._count_lock:
+            self.queries += 1
+        time.sleep(self.round_trip)
+
+    def fetch_menu_rows(self):
+        self._remote()
+        return super().fetch_menu_rows()
+
+    def get_order(self, order_id):
+        self._remote()
+        return super().get_order(order_id)
+
+    def get_orders(self, order_ids):
+        self._remote()
+        return super().get_orders(order_ids)
+
+
+def reset(orders, round_trip, graph):
+    storage = RemoteStorage(round_trip)
+    storage.load_menu(MENU)
+    item_ids = [row["item_id"] for row in storage.fetch_menu_rows()]
+    storage.insert_orders([
+        {
+            "items": {str(item_ids[i % len(item_ids)]): 1 + i % 3, str(item_ids[(i + 5) % len(item_ids)]): 1},
+            "total_amount": 42.0,
+            "delivery_address": f"Marina Walk, villa {i}",
+            "customer_phone_number": f"9715300{i:05d}",
+            "status": "ON_ROUTE",
+        }
+        for i in range(orders)
+    ])
+    set_storage_backend(storage)
+    from app import app  # noqa: F401 (registers the Flask controllers)
+    from controllers import chat
+
+    chat.db_service.storage = storage
+    menu_catalog.invalidate()
+    whatsapp_service.use_graph_url(graph.url)
+    storage.queries = 0
+    return storage
+
+
+def run_one_by_one(order_ids):
+    from app import app
+
+    client = app.test_client()
+    return [client.post("/chat/notify-status", json={"order_id": order_id}).status_code == 200 for order_id in order_ids]
+
+
+def run_bulk(order_ids):
+    from app import app
+
+    response = app.test_client().post("/chat/notify-status/bulk", json={"order_ids": order_ids})
+    return [result["sent"] for result in response.get_json()["results"]]
+
+
+def run_bulk_asgi(order_ids):
+    from asgi import app
+
+    async def main():
+        # The async storage wrapper and Graph client bind to this loop
+        from controllers.aio import chat
+
+        chat.db_service._storage = None
+        whatsapp_service.use_graph_url(whatsapp_service.graph_url)
+        response = await app.test_client().post("/chat/notify-status/bulk", json={"order_ids": order_ids})
+        return [result["sent"] for result in (await response.get_json())["results"]]
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=40)
+    parser.add_argument("--round-trip", type=float, default=0.04, help="database round trip")
+    parser.add_argument("--latency", type=float, default=0.08, help="Graph API response time")
+    args = parser.parse_args()
+
+    print(
+        f"{args.orders} orders marked ON_ROUTE, database round trip {args.round_trip * 1000:.0f} ms,"
+        f" Graph latency {args.latency * 1000:.0f} ms\n"
+    )
+    order_ids = list(range(1, args.orders + 1))
+    runs = [
+        ("one call per order", run_one_by_one),
+        ("bulk (Flask)", run_bulk),
+        ("bulk (ASGI)", run_bulk_asgi),
+    ]
+    for label, run in runs:
+        graph = StubGraphServer(args.latency).start()
+        storage = reset(args.orders, args.round_trip, graph)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sent = run(order_ids)
+        elapsed = time.perf_counter() - start
+        graph.stop()
+        print(
+            f"{label:<20} {elapsed:6.2f} s   database queries {storage.queries:4d}"
+            f"   notified {sum(sent)}/{len(order_ids)}   delivered {graph.messages}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Call session registry: the old process-local dict vs. the TTL-expiring,
+capped registry, in memory and across worker processes.
+
+A day of voice calls registers through /call/webhook; only some report
+their end. The first part shows how many entries and how much memory each
+registry is left holding. The second spreads each call's tool requests
+(place order, order status, send menu) over several workers: with a
+registry per worker most lookups miss, with one shared store (the
+in-process Redis stand-in here, Redis in production) none do.
+
+    cd API
+    python -W ignore -m benchmarks.call_sessions --calls 50000 --workers 4
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from services.phone_number_service import LocalCallRegistry, PhoneNumberService, RedisCallRegistry
+from services.shared_sessions import LocalRedis
+
+
+class DictRegistry(LocalCallRegistry):
+    """The previous behaviour: a plain dict nothing ever expires from"""
+
+    def __init__(self):
+        super().__init__(ttl=float("inf"), max_size=10 ** 12)
+
+
+def run_growth(label, service, calls, ended, rng):
+    """Calls register back to back; a share of them report their end"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(calls):
+        call_id = f"call_{i:08d}"
+        service.set_phone(call_id, f"9715{rng.randrange(10 ** 8):08d}")
+        service.get_phone(call_id)
+        if rng.random() < ended:
+            service.clear_phone(call_id)
+        if i % 1000 == 999:
+            service.registry.sweep()
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        f"{label:<26} entries left {service.get_active_sessions_count():6d}   memory held {held / 1024:8.0f} KiB"
+        f"   evicted {service.stats()['evicted']:6d}   {calls / elapsed:9.0f} calls/s"
+    )
+
+
+def run_workers(label, workers, calls, requests_per_call, rng):
+    """Each call registers on one worker; its tool requests land anywhere"""
+    misses = lookups = 0
+    for i in range(calls):
+        call_id = f"call_{i:08d}"
+        rng.choice(workers).set_phone(call_id, f"9715{i:08d}")
+        for _ in range(requests_per_call):
+            lookups += 1
+            misses += rng.choice(workers).get_phone(call_id) is None
+        rng.choice(workers).clear_phone(call_id)
+    print(f"{label:<26} tool requests {lookups:6d}   no phone for call_id {misses:6d} ({misses / lookups:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--ended", type=float, default=0.3, help="share of calls that report their end")
+    parser.add_argument("--ttl", type=float, default=0.5, help="registry ttl (s); calls register back to back")
+    parser.add_argument("--max", type=int, default=5000, help="registry size cap")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls, {args.ended:.0%} report their end\n")
+    runs = [
+        ("dict, never cleared", PhoneNumberService(DictRegistry())),
+        ("local, ttl + cap", PhoneNumberService(LocalCallRegistry(args.ttl, args.max))),
+        ("local-redis, ttl + cap", PhoneNumberService(RedisCallRegistry(LocalRedis(), args.ttl, args.max))),
+    ]
+    for label, service in runs:
+        run_growth(label, service, args.calls, args.ended, random.Random(args.seed))
+
+    print(f"\n{args.calls // 10} calls, 3 tool requests each, spread over {args.workers} workers\n")
+    per_worker = [PhoneNumberService(LocalCallRegistry()) for _ in range(args.workers)]
+    run_workers("registry per worker", per_worker, args.calls // 10, 3, random.Random(args.seed))
+    store = LocalRedis()
+    shared = [PhoneNumberService(RedisCallRegistry(store)) for _ in range(args.workers)]
+    run_workers("shared store", shared, args.calls // 10, 3, random.Random(args.seed))
+
+
+if __name__ == "__main__":
+    main()
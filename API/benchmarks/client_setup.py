@@ -0,0 +1,75 @@
+"""Per-request Supabase client construction vs. the shared pooled client.
+
+Runs against a local stub PostgREST server so only client setup and
+connection handling are measured, not network latency to Supabase.
+
+    cd API
+    python -m benchmarks.client_setup --requests 300
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from supabase import create_client
+
+from services.supabase_client import build_supabase_client
+
+STUB_KEY = "stub-anon-key"
+
+
+class StubPostgrestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StubPostgrestHandler.connections += 1
+
+    def do_GET(self):
+        body = json.dumps([{"item_id": 1, "name": "French Fries"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, get_client, requests):
+    StubPostgrestHandler.connections = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        client = get_client()
+        client.table("menu").select("item_id, name").execute()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} {elapsed * 1000 / requests:8.2f} ms/request"
+        f"   {StubPostgrestHandler.connections:5d} TCP connections"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPostgrestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    shared = build_supabase_client(url=url, key=STUB_KEY)
+
+    print(f"{args.requests} requests against {url}\n")
+    run("create_client per request", lambda: create_client(url, STUB_KEY), args.requests)
+    run("shared pooled client", lambda: shared, args.requests)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
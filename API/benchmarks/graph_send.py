@@ -0,0 +1,113 @@
+"""Outbound WhatsApp send throughput: a bare requests.post per message vs.
+the pooled keep-alive Graph client, against the local stub Graph server.
+
+Every new connection to the stub pays a handshake delay standing in for
+TCP + TLS to graph.facebook.com, and a share of requests can fail with
+503/429, so the numbers show what connection reuse and retries buy:
+messages/sec, connections opened and messages actually delivered.
+
+    cd API
+    python -W ignore -m benchmarks.graph_send --messages 400 --threads 16
+    python -W ignore -m benchmarks.graph_send --error-rate 0.1
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_graph import StubGraphServer
+from services.graph_client import AsyncGraphClient, GraphClient, text_payload
+from services.reply_stream import percentile
+
+HEADERS = {"Authorization": "Bearer stub-token", "Content-Type": "application/json"}
+
+
+def bare_send(url):
+    def send(i):
+        response = requests.post(url, headers=HEADERS, json=text_payload(f"9715{i:08d}", "Your order is on its way!"))
+        return response.status_code < 400
+
+    return send
+
+
+def pooled_send(client):
+    def send(i):
+        return "error" not in client.send(f"9715{i:08d}", "Your order is on its way!")
+
+    return send
+
+
+def run_threads(send, messages, threads):
+    timings = []
+
+    def timed(i):
+        started = time.perf_counter()
+        ok = send(i)
+        timings.append((time.perf_counter() - started) * 1000)
+        return ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        delivered = sum(pool.map(timed, range(messages)))
+    return time.perf_counter() - start, delivered, timings
+
+
+def run_async(client, messages):
+    timings = []
+
+    async def timed(i):
+        started = time.perf_counter()
+        result = await client.send(f"9715{i:08d}", "Your order is on its way!")
+        timings.append((time.perf_counter() - started) * 1000)
+        return "error" not in result
+
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(i) for i in range(messages)))
+        await client.aclose()
+        return time.perf_counter() - start, sum(results)
+
+    elapsed, delivered = asyncio.run(main())
+    return elapsed, delivered, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16, help="sending threads (Flask workers)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Graph API response time")
+    parser.add_argument("--handshake", type=float, default=0.06, help="cost of opening a connection")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--connections", type=int, default=16, help="pooled client max connections")
+    args = parser.parse_args()
+
+    print(
+        f"{args.messages} messages, {args.threads} threads, Graph latency {args.latency * 1000:.0f} ms,"
+        f" handshake {args.handshake * 1000:.0f} ms, error rate {args.error_rate:.0%}\n"
+    )
+    runs = [
+        ("requests.post per send", lambda url: run_threads(bare_send(url), args.messages, args.threads)),
+        ("pooled GraphClient", lambda url: run_threads(
+            pooled_send(GraphClient(url, "stub-token", max_connections=args.connections, retry_base=0.05)),
+            args.messages, args.threads,
+        )),
+        ("pooled AsyncGraphClient", lambda url: run_async(
+            AsyncGraphClient(url, "stub-token", max_connections=args.connections, retry_base=0.05),
+            args.messages,
+        )),
+    ]
+    for label, run in runs:
+        graph = StubGraphServer(args.latency, args.error_rate, args.handshake).start()
+        elapsed, delivered, timings = run(graph.url)
+        graph.stop()
+        print(
+            f"{label:<25} {args.messages / elapsed:7.1f} msgs/s   send p50 {percentile(timings, 50):6.1f} ms"
+            f"  p99 {percentile(timings, 99):6.1f} ms   connections {graph.connections:4d}"
+            f"   delivered {delivered}/{args.messages}   requests {graph.requests}"
+        )
+
+
+if __name__ == "__main__":
+    main()
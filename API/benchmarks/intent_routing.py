@@ -0,0 +1,104 @@
+"""Fraction of messages answered by the intent fast path and time saved.
+
+Replays a labelled sample of customer messages through LLMService.chat
+with Gemini stubbed at a fixed per-round-trip latency (messages that need
+a tool cost two round trips). Prints any message the router answered with
+the wrong intent, which must stay at zero.
+
+    cd API
+    python -W ignore -m benchmarks.intent_routing --llm-ms 900
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+import google.generativeai as genai
+
+from benchmarks.storage_baseline import MENU
+from services.intent_router import intent_router
+from services.llm_service import LLMService
+from services.storage_backend import SQLiteStorage
+from services.supabase_service import SupabaseService
+
+# (message, intent the fast path may answer it with, or None for the LLM)
+SAMPLES = [
+    ("where is my order", "order_status"),
+    ("Where's my order??", "order_status"),
+    ("order status", "order_status"),
+    ("can you check my order", "order_status"),
+    ("where is my food it's really late", None),
+    ("I want to cancel my order", None),
+    ("menu", "menu"),
+    ("Menu please", "menu"),
+    ("send me the menu", "menu"),
+    ("can I see the menu?", "menu"),
+    ("is shawarma on the menu", None),
+    ("Do you have shawarma on the menu?", None),
+    ("how much is the burger on the menu", None),
+    ("menu? also is the karak tea sweet", None),
+    ("hi, menu please", "menu"),
+    ("what are today's specials", "today_specials"),
+    ("any specials today?", "today_specials"),
+    ("what day is it", "today_specials"),
+    ("what specials do you have today", "today_specials"),
+    ("what specials do you have today and how much is the burger", None),
+    ("whats the special today, and is the mango shake on it?", None),
+    ("I want 2 chicken shawarma and fries", None),
+    ("can I get a karak tea delivered to Marina Walk", None),
+    ("yes confirm", None),
+    ("hi", None),
+    ("add one more fries to my order", None),
+    ("وين طلبي", "order_status"),
+    ("ارسل المنيو", "menu"),
+    ("ايش عروض اليوم", "today_specials"),
+    ("ابغى اطلب شاورما", None),
+    ("thanks!", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm-ms", type=float, default=900)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    def send_message(chat, content, **kwargs):
+        time.sleep(args.llm_ms / 1000)
+        part = SimpleNamespace(text="Sure!", function_call=SimpleNamespace(name=""))
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+    genai.ChatSession.send_message = send_message
+
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    db_service = SupabaseService(storage=storage)
+    db_service.place_order({"French Fries": 1}, "Marina Walk", "971500000001")
+
+    wrong = []
+    for message, expected in SAMPLES:
+        match = intent_router.classify(message)
+        answered = match.intent if match.confidence >= intent_router.threshold else None
+        if answered is not None and answered != expected:
+            wrong.append((message, match))
+        print(f"  {str(answered):<15} {match.confidence:4.2f}  {message}")
+
+    llm = LLMService("971500000001", db_service)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.repeat):
+            for message, _ in SAMPLES:
+                llm.chat(message)
+
+    stats = intent_router.stats()
+    print(f"\nskipped LLM: {stats['skipped_llm']}/{stats['messages']} ({stats['skipped_fraction']:.0%})")
+    print(f"fast path avg {stats['fast_path_avg_ms']} ms vs LLM turn avg {stats['llm_turn_avg_ms']} ms")
+    print(f"estimated time saved: {stats['estimated_saved_ms'] / 1000:.1f} s")
+    print(f"wrong fast-path answers: {len(wrong)} {wrong}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Per-turn cost of a long conversation with and without history compaction.
+
+Gemini is replaced by a stub whose latency grows with the size of the
+history it is sent (base + per-1k-token cost), which is how the real API
+behaves. Every tenth turn the stub calls get_order_status, so tool
+calls and responses are part of the history.
+
+    cd API
+    python -W ignore -m benchmarks.long_conversation --turns 300
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+import google.generativeai as genai
+from google.generativeai.types import content_types
+
+from benchmarks.storage_baseline import MENU
+from services.history_manager import HistoryManager, estimate_tokens
+from services.llm_service import LLMService
+from services.storage_backend import SQLiteStorage
+from services.supabase_service import SupabaseService
+
+REPLY = (
+    "Sure! Our French Fries are $12 and the Chicken Shawarma is $18. "
+    "Would you like me to add anything else to your order before we confirm it?"
+)
+
+
+class StubGemini:
+    def __init__(self, base_ms, per_1k_tokens_ms):
+        self.base = base_ms / 1000
+        self.per_token = per_1k_tokens_ms / 1000 / 1000
+        self.calls = 0
+        self.tokens_sent = 0
+
+    def send_message(self, chat, content, **kwargs):
+        content = content_types.to_content(content)
+        if not content.role:
+            content.role = "user"
+        tokens = estimate_tokens(chat._history + [content])
+        self.tokens_sent = tokens
+        time.sleep(self.base + tokens * self.per_token)
+        self.calls += 1
+
+        if content.parts[0].text and self.calls % 10 == 0:
+            part = genai.protos.Part(
+                function_call=genai.protos.FunctionCall(name="get_order_status", args={})
+            )
+        else:
+            part = genai.protos.Part(text=REPLY)
+        reply = genai.protos.Content(role="model", parts=[part])
+        chat._history.extend([content, reply])
+        return SimpleNamespace(candidates=[SimpleNamespace(content=reply)])
+
+
+def run(label, turns, stub, db_service, history):
+    llm = LLMService("971500000001", db_service)
+    if history is not None:
+        llm.history = history
+    else:
+        llm._compact_history = lambda: None
+
+    checkpoints = {10, 50, 100, 200, 300, 500, 1000, turns}
+    window = []
+    for turn in range(1, turns + 1):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            llm.chat(f"Message {turn}: can I get some fries and a karak tea delivered to Marina Walk?")
+        window = (window + [((time.perf_counter() - start) * 1000, stub.tokens_sent)])[-10:]
+        if turn in checkpoints:
+            latency = sum(ms for ms, _ in window) / len(window)
+            tokens = sum(t for _, t in window) // len(window)
+            print(
+                f"{label:<10} turns {turn - len(window) + 1:>4}-{turn:<4}"
+                f"  {latency:7.1f} ms/turn  ~{tokens:>6} tokens sent"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--base-ms", type=float, default=5)
+    parser.add_argument("--per-1k-tokens-ms", type=float, default=4)
+    args = parser.parse_args()
+
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    db_service = SupabaseService(storage=storage)
+    db_service.place_order({"French Fries": 1}, "Marina Walk", "971500000001")
+
+    stub = StubGemini(args.base_ms, args.per_1k_tokens_ms)
+    genai.ChatSession.send_message = lambda chat, content, **kw: stub.send_message(chat, content, **kw)
+
+    run("unbounded", args.turns, stub, db_service, None)
+    history = HistoryManager()
+    run("bounded", args.turns, stub, db_service, history)
+    print(f"history: {history.stats()}")
+    print(f"summary sent as first turn:\n{history.summary.render()}")
+
+
+if __name__ == "__main__":
+    main()
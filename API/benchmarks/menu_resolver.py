@@ -0,0 +1,67 @@
+"""Fuzzy menu-name resolution cost per lookup.
+
+Builds a MenuResolver over a menu of --menu-items dishes and resolves a
+mix of exact names, partial names, synonyms and typos, cold (first lookup)
+and warm (repeated lookup served from the per-snapshot cache).
+
+    cd API
+    python -m benchmarks.menu_resolver --menu-items 80
+"""
+import argparse
+import time
+
+from benchmarks.storage_baseline import MENU
+from services.menu_resolver import MenuResolver
+
+QUERIES = [
+    "French Fries",
+    "fries",
+    "chips",
+    "frnech fries",
+    "chicken shwarma",
+    "Chiken Shawarma",
+    "karak chai",
+    "tea",
+    "breakfast",
+    "friday machbous",
+    "pizza",
+    "large fries",
+]
+DISHES = ["Lamb", "Kebab", "Hummus", "Falafel", "Salad", "Soup", "Rice", "Biryani", "Mandi", "Harees"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--menu-items", type=int, default=80)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    items = MENU + [
+        {"item_id": 100 + i, "name": f"{DISHES[i % len(DISHES)]} Special {i}"}
+        for i in range(max(0, args.menu_items - len(MENU)))
+    ]
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        resolver = MenuResolver(items)
+    print(f"index build        {(time.perf_counter() - start) / args.rounds * 1e6:8.1f} us")
+
+    for query in QUERIES:
+        cold = 0.0
+        for _ in range(args.rounds):
+            resolver._cache.clear()
+            start = time.perf_counter()
+            result = resolver.resolve(query)
+            cold += time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            resolver.resolve(query)
+        warm = time.perf_counter() - start
+        print(
+            f"{query:<18} cold {cold / args.rounds * 1e6:7.1f} us  warm {warm / args.rounds * 1e6:5.2f} us"
+            f"  -> {result.name or 'suggest ' + str(result.candidates)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
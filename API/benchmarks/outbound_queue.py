@@ -0,0 +1,169 @@
+"""Peak-hour outbound burst: sending inline from request threads vs. the
+durable, prioritized, rate-limited outbound queue.
+
+A rush of chat replies (each split into several streamed chunks) lands
+together with order confirmations and status updates, against the local
+stub Graph server with a per-second throughput limit like Meta's, a share
+of 503/429 errors and a few invalid recipients. The numbers show messages
+delivered, how often the limit was hit, send lag per priority (enqueue to
+accepted by the stub), chunks delivered out of order, and dead letters. A
+last run stops the queue part-way and restarts it from the journal.
+
+    cd API
+    python -W ignore -m benchmarks.outbound_queue --chat 60 --chunks 6 --transactional 60
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_graph import StubGraphServer
+from services.graph_client import GraphClient
+from services.outbound_queue import CHAT, TRANSACTIONAL, OutboundQueue, graph_sender
+from services.reply_stream import percentile
+
+
+def workload(chat, chunks, transactional, invalid):
+    """(to, text, priority) in submission order: replies first, then the
+    notifications, as when a status-update sweep follows a chat rush"""
+    messages = []
+    for i in range(chunks):
+        for c in range(chat):
+            messages.append((f"9715100{c:05d}", f"reply {c} chunk {i}", CHAT))
+    for t in range(transactional):
+        messages.append((f"9715200{t:05d}", f"order {t} is on its way", TRANSACTIONAL))
+    for b in range(invalid):
+        messages.append((f"+971-bad-{b}", f"order bad {b} confirmed", TRANSACTIONAL))
+    return messages
+
+
+def report(label, graph, messages, submitted, elapsed, dead):
+    lags = {CHAT: [], TRANSACTIONAL: []}
+    priority_of = {text: priority for _, text, priority in messages}
+    last_chunk = {}
+    out_of_order = 0
+    for at, to, text in graph.delivered:
+        lags[priority_of[text]].append((at - submitted[text]) * 1000)
+        if priority_of[text] == CHAT:
+            chunk = int(text.rsplit(" ", 1)[1])
+            out_of_order += chunk < last_chunk.get(to, -1)
+            last_chunk[to] = max(chunk, last_chunk.get(to, -1))
+    print(
+        f"{label:<18} delivered {len(graph.delivered):4d}/{len(messages)}   dead {dead:3d}"
+        f"   429 over limit {graph.throttled:4d}   out of order {out_of_order:3d}   {elapsed:5.2f} s\n"
+        f"{'':<18} lag transactional p50 {percentile(lags[TRANSACTIONAL], 50):6.0f} ms"
+        f"  p95 {percentile(lags[TRANSACTIONAL], 95):6.0f} ms"
+        f"   chat p50 {percentile(lags[CHAT], 50):6.0f} ms  p95 {percentile(lags[CHAT], 95):6.0f} ms"
+    )
+
+
+def run_inline(messages, threads, graph):
+    """Each chat recipient's chunks go out in order from its own turn; every
+    notification is its own request thread. All share one pooled client."""
+    client = GraphClient(graph.url, "stub-token", retry_base=0.05)
+    # The whole burst arrives at once; waiting for a free thread counts
+    start = time.perf_counter()
+    submitted = {text: start for _, text, _ in messages}
+    dead = []
+    by_recipient = {}
+    for to, text, priority in messages:
+        by_recipient.setdefault((to, priority), []).append(text)
+
+    def send_all(key):
+        to, _ = key
+        for text in by_recipient[key]:
+            if "error" in client.send(to, text):
+                dead.append(text)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send_all, by_recipient))
+    return submitted, time.perf_counter() - start, len(dead)
+
+
+def run_queue(messages, graph, journal, rate, burst):
+    queue = OutboundQueue(graph_sender(graph.url, "stub-token").deliver, journal, rate=rate, burst=burst, retry_base=0.05)
+    submitted = {}
+    start = time.perf_counter()
+    for to, text, priority in messages:
+        submitted[text] = time.perf_counter()
+        queue.enqueue(to, text, priority)
+    queue.join()
+    elapsed = time.perf_counter() - start
+    stats = queue.stats()
+    queue.close()
+    return submitted, elapsed, stats["dead_lettered"], stats
+
+
+def run_restart(messages, graph, journal, rate, burst, stop_after):
+    """Stop the queue part-way through, then let a new one replay the journal"""
+    first = OutboundQueue(graph_sender(graph.url, "stub-token").deliver, journal, rate=rate, burst=burst, retry_base=0.05)
+    for to, text, priority in messages:
+        first.enqueue(to, text, priority)
+    time.sleep(stop_after)
+    first.close(timeout=0)
+    left = first.depth()
+
+    second = OutboundQueue(graph_sender(graph.url, "stub-token").deliver, journal, rate=rate, burst=burst, retry_base=0.05)
+    second.start()
+    second.join()
+    second.close()
+    return left, second.replayed, first.sent + second.sent, first.dead_lettered + second.dead_lettered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chat", type=int, default=60, help="customers getting a chat reply")
+    parser.add_argument("--chunks", type=int, default=6, help="streamed chunks per reply")
+    parser.add_argument("--transactional", type=int, default=60, help="order confirmations / status updates")
+    parser.add_argument("--invalid", type=int, default=3, help="notifications to invalid numbers")
+    parser.add_argument("--threads", type=int, default=32, help="request / turn threads sending inline")
+    parser.add_argument("--latency", type=float, default=0.03, help="Graph API response time")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--limit", type=float, default=80, help="stub's messages/second limit")
+    parser.add_argument("--rate", type=float, default=75, help="queue's token bucket rate")
+    parser.add_argument("--burst", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = workload(args.chat, args.chunks, args.transactional, args.invalid)
+    print(
+        f"{len(messages)} messages ({args.chat} replies x {args.chunks} chunks, {args.transactional}"
+        f" notifications, {args.invalid} invalid), limit {args.limit:.0f}/s, error rate {args.error_rate:.0%}\n"
+    )
+
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        graph = StubGraphServer(args.latency, args.error_rate, seed=7, rate_limit=args.limit).start()
+        submitted, elapsed, dead = run_inline(messages, args.threads, graph)
+        graph.stop()
+        inline = (graph, submitted, elapsed, dead)
+
+        graph = StubGraphServer(args.latency, args.error_rate, seed=7, rate_limit=args.limit).start()
+        journal = os.path.join(directory, "outbound_journal.jsonl")
+        submitted, elapsed, dead, stats = run_queue(messages, graph, journal, args.rate, args.burst)
+        graph.stop()
+        queued = (graph, submitted, elapsed, dead)
+
+        graph = StubGraphServer(args.latency, args.error_rate, seed=7, rate_limit=args.limit).start()
+        journal = os.path.join(directory, "restarted_journal.jsonl")
+        restart = run_restart(messages, graph, journal, args.rate, args.burst, stop_after=1.0)
+        graph.stop()
+        with open(journal + ".dead", encoding="utf-8") as f:
+            dead_letters = sum(1 for _ in f)
+
+    graph, submitted, elapsed, dead = inline
+    report("inline sends", graph, messages, submitted, elapsed, dead)
+    graph, submitted, elapsed, dead = queued
+    report("outbound queue", graph, messages, submitted, elapsed, dead)
+
+    left, replayed, sent, dead = restart
+    print(
+        f"\nstopped after 1 s with {left} unsent; restart replayed {replayed},"
+        f" sent {sent} in total, dead-lettered {dead} (dead-letter file: {dead_letters} lines)"
+    )
+    print(f"\nqueue: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""End-to-end webhook -> LLM -> tool -> WhatsApp load test, fully offline.
+
+Uses the fake LLM backend (sampled latency, scripted tool calls), the
+in-memory storage backend and a local stub Graph server, then drives the
+real webhook route with many concurrent senders, each holding a short
+conversation (browse, confirm an order, ask for its status).
+
+    cd API
+    python -W ignore -m benchmarks.pipeline_load --senders 50 --mode both
+    python -W ignore -m benchmarks.pipeline_load --latency lognormal:700:1800 --mode asgi
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from benchmarks.async_vs_sync import webhook_payload
+from benchmarks.storage_baseline import MENU
+from benchmarks.stub_graph import StubGraphServer
+from services import whatsapp_service
+from services.intent_router import intent_router
+from services.llm_backend import FakeBackend, LatencyModel, set_llm_backend
+from services.llm_service import model_cache
+from services.menu_catalog import menu_catalog
+from services.storage_backend import SQLiteStorage, set_storage_backend
+
+CONVERSATION = [
+    "Hi, can I get fries and two karak tea to Marina Walk?",
+    "Yes, confirm",
+    "What are the specials today?",
+    "where is my order",
+]
+
+
+def reset(latency, graph):
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    set_storage_backend(storage)
+    menu_catalog.invalidate()
+    backend = FakeBackend(LatencyModel(latency, seed=7))
+    set_llm_backend(backend)
+    model_cache.clear()
+    whatsapp_service.chat_sessions.clear()
+    # Time whole turns: each message waits for its reply before the next
+    whatsapp_service.async_ack = False
+    whatsapp_service.use_graph_url(graph.url)
+    return storage, backend
+
+
+def run_flask(senders, threads):
+    from app import app
+
+    client = app.test_client()
+    latencies = []
+
+    def converse(sender):
+        for text in CONVERSATION:
+            start = time.perf_counter()
+            client.post("/chat/webhook", json=webhook_payload(sender, text))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(converse, senders))
+    return time.perf_counter() - start, latencies
+
+
+def run_asgi(senders):
+    from asgi import app
+
+    latencies = []
+
+    async def main():
+        client = app.test_client()
+
+        async def converse(sender):
+            for text in CONVERSATION:
+                start = time.perf_counter()
+                await client.post("/chat/webhook", json=webhook_payload(sender, text))
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(converse(sender) for sender in senders))
+        return time.perf_counter() - start
+
+    return asyncio.run(main()), latencies
+
+
+def report(label, elapsed, latencies, storage, backend, graph):
+    latencies = sorted(ms * 1000 for ms in latencies)
+    p = lambda pct: latencies[min(len(latencies) - 1, int(len(latencies) * pct))]
+    orders = storage._conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    print(
+        f"{label:<18} {len(latencies) / elapsed:7.1f} turns/s   turn p50 {statistics.median(latencies):7.0f} ms"
+        f"  p95 {p(0.95):7.0f} ms  p99 {p(0.99):7.0f} ms\n"
+        f"{'':<18} model calls {backend_calls(backend):5d}   orders {orders:4d}"
+        f"   WhatsApp sends {graph.messages:5d}   sessions {whatsapp_service.get_active_sessions_count()}"
+    )
+
+
+def backend_calls(backend):
+    compiled = model_cache._compiled
+    return compiled.model.calls if compiled else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16, help="Flask worker threads")
+    parser.add_argument("--latency", default="lognormal:300:800", help="fake model latency spec")
+    parser.add_argument("--graph-latency", type=float, default=0.08)
+    parser.add_argument("--mode", choices=["flask", "asgi", "both"], default="both")
+    args = parser.parse_args()
+
+    graph = StubGraphServer(args.graph_latency).start()
+    senders = [f"9715{i:08d}" for i in range(args.senders)]
+    print(
+        f"{args.senders} senders x {len(CONVERSATION)} messages, model latency {args.latency},"
+        f" Graph {args.graph_latency * 1000:.0f} ms\n"
+    )
+
+    modes = ["flask", "asgi"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        storage, backend = reset(args.latency, graph)
+        graph.messages = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == "flask":
+                elapsed, latencies = run_flask(senders, args.threads)
+            else:
+                elapsed, latencies = run_asgi(senders)
+        label = f"Flask {args.threads} threads" if mode == "flask" else "ASGI 1 worker"
+        report(label, elapsed, latencies, storage, backend, graph)
+
+    print(f"\nintent fast path: {intent_router.stats()['skipped_fraction']:.0%} of messages")
+    print(f"reply timings: {whatsapp_service.reply_timings.stats()}")
+    graph.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Resident memory of chat sessions as the number of customers grows:
+an unbounded store vs. a capped one that hibernates idle sessions.
+
+Every sender holds a short conversation through the offline fake model
+(in-memory storage, no network). Memory is measured with tracemalloc after
+all conversations, then a second message from the earliest senders shows
+the cost of rehydrating a hibernated session.
+
+    cd API
+    python -W ignore -m benchmarks.session_memory --senders 2000 --max-active 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from benchmarks.storage_baseline import MENU
+from services.llm_backend import FakeBackend, LatencyModel, set_llm_backend
+from services.llm_service import LLMService, model_cache
+from services.menu_catalog import menu_catalog
+from services.session_store import SessionStore
+from services.storage_backend import SQLiteStorage, set_storage_backend
+
+CONVERSATION = [
+    "Hi, can I get fries and two karak tea to Marina Walk?",
+    "Yes, confirm",
+    "What are the specials today?",
+]
+
+
+def setup():
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    set_storage_backend(storage)
+    menu_catalog.invalidate()
+    set_llm_backend(FakeBackend(LatencyModel("fixed:0"), chars_per_second=1e9))
+    model_cache.clear()
+
+
+def converse(store, sender, messages):
+    llm, source = store.get_or_create(sender, lambda: LLMService(sender))
+    with store.pinned(sender):
+        for text in messages:
+            "".join(llm.chat_stream(text))
+    return llm, source
+
+
+def run(senders, max_active):
+    store = SessionStore(LLMService.restore, max_active=max_active)
+    # Warm the shared model and menu before measuring
+    with contextlib.redirect_stdout(io.StringIO()):
+        converse(SessionStore(LLMService.restore), "warmup", CONVERSATION[:1])
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for sender in senders:
+            converse(store, sender, CONVERSATION)
+    elapsed = time.perf_counter() - start
+    resident = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    # The earliest senders come back; with a cap they were hibernated
+    returning = senders[:100]
+    history_ok = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for sender in returning:
+            llm, _ = converse(store, sender, ["where is my order"])
+            # 3 earlier turns plus this one, each at least a user/model pair
+            history_ok += len(llm.chat_session.history) >= 8
+    return_ms = (time.perf_counter() - start) * 1000 / len(returning)
+    return store, resident, elapsed, return_ms, history_ok, len(returning)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--senders", type=int, default=2000)
+    parser.add_argument("--max-active", type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    senders = [f"9715{i:08d}" for i in range(args.senders)]
+    print(f"{args.senders} senders x {len(CONVERSATION)} messages\n")
+
+    for label, cap in (("unbounded", args.senders + 1), (f"max_active={args.max_active}", args.max_active)):
+        store, resident, elapsed, return_ms, history_ok, returning = run(senders, cap)
+        stats = store.stats()
+        print(
+            f"{label:<18} resident {resident / 1024 / 1024:7.1f} MiB"
+            f" ({resident / args.senders / 1024:5.1f} KiB/sender)   live {stats['live']:5d}"
+            f"   hibernated {stats['hibernated']:5d} (avg {stats['avg_hibernated_bytes'] or 0} B)"
+            f"   {args.senders * len(CONVERSATION) / elapsed:6.0f} turns/s\n"
+            f"{'':<18} returning sender turn {return_ms:6.2f} ms"
+            f"   history kept {history_ok}/{returning}   rehydrated {stats['rehydrated']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""First-message latency and per-session memory for new chat sessions.
+
+Compares building the menu prompt, tool declarations and GenerativeModel
+for every new sender (the old behaviour) with the shared compiled model.
+Gemini is stubbed and the menu lives in the in-memory backend behind a
+simulated Supabase round trip, so only session setup is measured.
+
+    cd API
+    python -W ignore -m benchmarks.session_startup --sessions 200 --db-latency-ms 60
+"""
+import argparse
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+import google.generativeai as genai
+
+from benchmarks.storage_baseline import MENU
+from services import llm_service
+from services.llm_backend import GeminiBackend
+from services.llm_service import LLMService, build_tools, generate_system_prompt, model_cache
+from services.menu_catalog import menu_catalog
+from services.storage_backend import SQLiteStorage
+from services.supabase_service import SupabaseService
+
+
+class SlowStorage:
+    """Adds a fixed delay per call to stand in for the Supabase round trip"""
+
+    def __init__(self, backend, latency):
+        self.backend = backend
+        self.latency = latency
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+
+        def call(*args, **kwargs):
+            time.sleep(self.latency)
+            return method(*args, **kwargs)
+
+        return call
+
+
+def _stub_reply(self, content, **kwargs):
+    part = SimpleNamespace(text="Hello, I am Emma!", function_call=SimpleNamespace(name=""))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class PerSessionLLM(LLMService):
+    """The pre-sharing setup: fresh menu fetch, prompt, tools and model per sender"""
+
+    def __init__(self, phone_number, db_service):
+        menu_catalog.invalidate()
+        self.db_service = db_service
+        # GeminiBackend() configures the SDK, as every new session used to
+        self.model = GeminiBackend().build_model(
+            generate_system_prompt(db_service.get_menu_items()), build_tools()
+        )
+        self.menu_version = None
+        self.tool_handler = llm_service.ToolHandler(phone_number, db_service)
+        self.chat_session = self.model.start_chat(enable_automatic_function_calling=True)
+
+    def _sync_model(self):
+        pass
+
+
+def measure(label, sessions, factory):
+    gc.collect()
+    latencies = []
+    kept = []
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for i in range(sessions):
+        start = time.perf_counter()
+        llm = factory(f"9715{i:08d}")
+        llm.chat("Hi")
+        latencies.append((time.perf_counter() - start) * 1000)
+        kept.append(llm)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    per_session_kb = (current - base) / sessions / 1024
+    print(
+        f"{label:<12} first message p50 {statistics.median(latencies):7.2f} ms"
+        f"  p95 {p95:7.2f} ms   memory {per_session_kb:7.1f} KiB/session"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--db-latency-ms", type=float, default=60)
+    parser.add_argument("--menu-items", type=int, default=60)
+    args = parser.parse_args()
+
+    storage = SQLiteStorage(":memory:")
+    extra = [
+        {"item_id": 100 + i, "name": f"Dish {i}", "category": f"Category {i % 8}",
+         "description": "House special", "price": 10 + i % 25}
+        for i in range(max(0, args.menu_items - len(MENU)))
+    ]
+    storage.load_menu(MENU + extra)
+    db_service = SupabaseService(storage=SlowStorage(storage, args.db_latency_ms / 1000))
+    genai.ChatSession.send_message = _stub_reply
+
+    measure("per-session", args.sessions, lambda phone: PerSessionLLM(phone, db_service))
+
+    menu_catalog.invalidate()
+    model_cache.clear()
+    measure("shared", args.sessions, lambda phone: LLMService(phone, db_service))
+    print(f"model cache: {model_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
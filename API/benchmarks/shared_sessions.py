@@ -0,0 +1,136 @@
+"""Several worker processes serving the same senders through the shared
+session store: does every turn see the whole conversation, and what does
+keeping the store in step cost per turn?
+
+Each round, every sender's next message goes to a different process than
+the last one (as a load balancer in front of gunicorn workers would do),
+so each turn has to pick up what another process added. Processes share a
+SQLite file; the offline fake model stands in for Gemini. The bytes each
+turn writes (only the entries it added) are compared with re-saving the
+whole conversation every turn.
+
+    cd API
+    python -W ignore -m benchmarks.shared_sessions --processes 4 --senders 50
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from benchmarks.session_memory import setup
+from services.llm_service import LLMService
+from services.reply_stream import percentile
+from services.session_store import SessionStore
+from services.shared_sessions import SharedSessions, SQLiteSessionBackend, encode_content
+
+CONVERSATION = [
+    "Hi, can I get fries and two karak tea to Marina Walk?",
+    "Yes, confirm",
+    "What are the specials today?",
+    "Add a chicken shawarma please",
+    "Where is my order?",
+    "Thanks!",
+]
+
+
+def customer_texts(history):
+    return [
+        part.text
+        for content in history
+        if content.role == "user"
+        for part in content.parts
+        if part.text
+    ]
+
+
+def worker(index, processes, path, senders, rounds, barrier, results):
+    setup()
+    sync = SharedSessions(SQLiteSessionBackend(path))
+    store = SessionStore(LLMService.restore, keep_hibernated=False)
+    sync_ms, turn_ms, full_bytes = [], [], 0
+    missing = 0
+
+    for round_ in range(rounds):
+        text = CONVERSATION[round_ % len(CONVERSATION)]
+        expected = [CONVERSATION[i % len(CONVERSATION)] for i in range(round_ + 1)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, sender in enumerate(senders):
+                if (i + round_) % processes != index:
+                    continue
+                llm, _ = store.get_or_create(sender, lambda: LLMService(sender))
+                started = time.perf_counter()
+                with store.pinned(sender), sync.turn(sender, llm):
+                    chat_started = time.perf_counter()
+                    "".join(llm.chat_stream(text))
+                    chat_ms = (time.perf_counter() - chat_started) * 1000
+                elapsed = (time.perf_counter() - started) * 1000
+                turn_ms.append(elapsed)
+                sync_ms.append(elapsed - chat_ms)
+                full_bytes += sum(len(encode_content(c)) for c in llm.chat_session.history)
+                missing += customer_texts(llm.chat_session.history) != expected
+        barrier.wait()
+
+    results.put({
+        "stats": sync.stats(),
+        "sync_ms": sync_ms,
+        "turn_ms": turn_ms,
+        "full_bytes": full_bytes,
+        "missing": missing,
+    })
+
+
+def run(processes, senders, rounds, path):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(i, processes, path, senders, rounds, barrier, results))
+        for i in range(processes)
+    ]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    collected = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    return time.perf_counter() - started, collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=len(CONVERSATION))
+    args = parser.parse_args()
+
+    senders = [f"9715{i:08d}" for i in range(args.senders)]
+    with tempfile.TemporaryDirectory() as directory:
+        elapsed, results = run(args.processes, senders, args.rounds, os.path.join(directory, "sessions.db"))
+
+    turns = args.senders * args.rounds
+    sync_ms = [ms for result in results for ms in result["sync_ms"]]
+    written = sum(result["stats"]["bytes_written"] for result in results)
+    full = sum(result["full_bytes"] for result in results)
+    pulls = {}
+    for result in results:
+        for mode, count in result["stats"]["pulls"].items():
+            pulls[mode] = pulls.get(mode, 0) + count
+
+    print(f"{args.processes} processes, {args.senders} senders x {args.rounds} turns, each sender moving process every turn\n")
+    print(f"turns that saw the whole conversation  {turns - sum(r['missing'] for r in results)}/{turns}")
+    print(f"pulls                                  {pulls}")
+    print(f"store sync per turn (lock+pull+push)   p50 {percentile(sync_ms, 50):6.2f} ms   p95 {percentile(sync_ms, 95):6.2f} ms")
+    print(
+        f"bytes written per turn                 delta {written / turns:8.0f} B"
+        f"   whole conversation {full / turns:8.0f} B   ({full / max(written, 1):.1f}x)"
+    )
+    print(f"throughput                             {turns / elapsed:6.0f} turns/s (including process start-up)")
+
+
+if __name__ == "__main__":
+    main()
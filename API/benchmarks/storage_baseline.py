@@ -0,0 +1,65 @@
+"""Offline baseline for the menu and order paths on the in-memory backend.
+
+Runs SupabaseService against SQLiteStorage(":memory:") so the numbers are
+our own overhead (pricing, formatting, caching) with no network involved.
+
+    cd API
+    python -m benchmarks.storage_baseline --ops 2000
+"""
+import argparse
+import time
+
+from services.menu_catalog import menu_catalog
+from services.storage_backend import SQLiteStorage
+from services.supabase_service import SupabaseService
+
+MENU = [
+    {"item_id": 1, "name": "French Fries", "category": "Sides", "description": "Crispy fries", "price": 12},
+    {"item_id": 2, "name": "Chicken Shawarma", "category": "Mains", "description": "Wrap", "price": 18},
+    {"item_id": 3, "name": "Karak Tea", "category": "Drinks", "description": "Spiced milk tea", "price": 5},
+    {"item_id": 4, "name": "Friday Machboos", "category": "Mains", "description": "Available on Friday", "price": 35},
+    {"item_id": 5, "name": "Breakfast Platter", "category": "Breakfast", "description": "Eggs and bread",
+     "price": 28, "available_from": "07:00", "available_until": "11:30"},
+]
+PHONES = [f"97150000{i:04d}" for i in range(50)]
+
+
+def run(label, ops, fn):
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {ops / elapsed:>10.0f} ops/s  {elapsed / ops * 1e6:>8.1f} us/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    service = SupabaseService(storage=storage)
+    menu_catalog.invalidate()
+
+    run("get_menu_items", args.ops, lambda i: service.get_menu_items())
+    run(
+        "place_order",
+        args.ops,
+        lambda i: service.place_order(
+            {"French Fries": 1 + i % 3, "Karak Tea": 2},
+            "Marina Walk, Dubai",
+            PHONES[i % len(PHONES)],
+        ),
+    )
+    run("get_order_status", args.ops, lambda i: service.get_order_status(PHONES[i % len(PHONES)]))
+    run(
+        "get_order_history",
+        args.ops,
+        lambda i: service.get_order_history(PHONES[i % len(PHONES)], limit=10),
+    )
+    print(f"menu cache: {menu_catalog.stats()}")
+
+
+if __name__ == "__main__":
+    main()
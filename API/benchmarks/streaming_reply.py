@@ -0,0 +1,109 @@
+"""Time-to-first-message vs. total turn time, blocking vs. streamed replies.
+
+Gemini is stubbed to generate an order confirmation at a fixed rate, and
+sends to the Graph API are stubbed with a fixed latency, so the numbers
+show how much sooner the customer sees the first WhatsApp message.
+
+    cd API
+    python -W ignore -m benchmarks.streaming_reply --turns 20 --chars-per-second 400
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+import google.generativeai as genai
+
+from benchmarks.storage_baseline import MENU
+from services.llm_service import LLMService
+from services.storage_backend import SQLiteStorage
+from services.supabase_service import SupabaseService
+from services.whatsapp_service import WhatsAppService
+
+REPLY = (
+    "Let me confirm your order:\n"
+    "- Chicken Shawarma x2 - $36\n"
+    "- French Fries x1 - $12\n"
+    "- Karak Tea x2 - $10\n"
+    "Total: $58\n"
+    "Delivery to: Marina Walk, Dubai\n\n"
+    "Would you like to confirm this order? If you'd like to change anything, "
+    "just tell me what to add or remove and I'll update it for you. "
+    "We usually deliver within 30 to 40 minutes, and payment is cash on delivery."
+)
+CHUNK_CHARS = 24
+
+
+def _chunk(text):
+    part = SimpleNamespace(text=text, function_call=SimpleNamespace(name=""))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class StubStream:
+    def __init__(self, delay):
+        self.delay = delay
+        self.candidates = _chunk(REPLY).candidates
+
+    def __iter__(self):
+        for i in range(0, len(REPLY), CHUNK_CHARS):
+            time.sleep(self.delay)
+            yield _chunk(REPLY[i : i + CHUNK_CHARS])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--chars-per-second", type=float, default=400)
+    parser.add_argument("--graph-latency-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    chunk_delay = CHUNK_CHARS / args.chars_per_second
+
+    def send_message(chat, content, stream=False, **kwargs):
+        if stream:
+            return StubStream(chunk_delay)
+        time.sleep(chunk_delay * len(range(0, len(REPLY), CHUNK_CHARS)))
+        return _chunk(REPLY)
+
+    genai.ChatSession.send_message = send_message
+
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    db_service = SupabaseService(storage=storage)
+
+    for label, stream in (("blocking", False), ("streamed", True)):
+        service = WhatsAppService()
+        service.stream_replies = stream
+        service.async_ack = False
+        sent = []
+
+        def stub_send(to, text):
+            time.sleep(args.graph_latency_ms / 1000)
+            sent.append(text)
+            return {}
+
+        service.send_message = stub_send
+        service.chat_sessions["971500000001"] = LLMService("971500000001", db_service)
+        payload = {
+            "entry": [{"changes": [{"value": {"messages": [
+                {"from": "971500000001", "text": {"body": "Confirm my order please"}}
+            ]}}]}]
+        }
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.turns):
+                service.process_webhook_event(payload)
+
+        stats = service.reply_timings.stats()
+        print(
+            f"{label:<9} first message p50 {stats['first_message_p50_ms']:7.1f} ms"
+            f"   total p50 {stats['total_p50_ms']:7.1f} ms"
+            f"   messages/turn {len(sent) / args.turns:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
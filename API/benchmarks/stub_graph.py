@@ -0,0 +1,134 @@
+"""Local stand-in for the WhatsApp Cloud API messages endpoint.
+
+Accepts POST /<phone_number_id>/messages, sleeps for a configurable
+latency and answers like the Graph API. Used by the pipeline benchmarks so
+outbound sends hit a real HTTP server without leaving the machine.
+error_rate makes that share of requests fail with 503 or 429 (half each),
+the responses the Graph client retries. handshake_latency is paid once per
+new connection, standing in for the TCP + TLS handshake to graph.facebook.com.
+rate_limit answers 429 with Retry-After once more than that many messages a
+second arrive, like Meta's per-number throughput limit; the second is read
+from clock, which tests replace to control the windows. A recipient that is
+not all digits is rejected with a permanent 400. Accepted messages are kept
+in delivered as (time, to, text), in the order they arrived.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when many clients open at once
+    request_queue_size = 128
+
+
+class StubGraphServer:
+    def __init__(
+        self,
+        latency: float = 0.08,
+        error_rate: float = 0.0,
+        handshake_latency: float = 0.0,
+        seed: int = 7,
+        rate_limit: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.latency = latency
+        self.handshake_latency = handshake_latency
+        self.error_rate = error_rate
+        self.messages = 0
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.delivered = []
+        self.rate_limit = rate_limit
+        self.clock = clock
+        self._window = (0, 0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                time.sleep(stub.handshake_latency)
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(stub.latency)
+                headers = {}
+                with stub._lock:
+                    stub.requests += 1
+                    failed = stub._random.random() < stub.error_rate
+                    if failed:
+                        stub.errors += 1
+                        status = 503 if stub._random.random() < 0.5 else 429
+                        message = "Service temporarily unavailable"
+                    elif not str(payload.get("to", "")).isdigit():
+                        failed = True
+                        stub.rejected += 1
+                        status, message = 400, "Invalid parameter"
+                    elif stub._over_rate():
+                        failed = True
+                        stub.throttled += 1
+                        status, message = 429, "Too many messages"
+                        headers["Retry-After"] = "1"
+                    else:
+                        stub.messages += 1
+                        status = 200
+                        message_id = f"wamid.stub{stub.messages}"
+                        stub.delivered.append(
+                            (time.perf_counter(), payload.get("to"), payload.get("text", {}).get("body"))
+                        )
+                if failed:
+                    body = json.dumps({"error": {"message": message, "code": status}}).encode()
+                else:
+                    body = json.dumps({"messaging_product": "whatsapp", "messages": [{"id": message_id}]}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _over_rate(self) -> bool:
+        """Counts the message against the current one-second window (lock held)"""
+        if not self.rate_limit:
+            return False
+        second = int(self.clock())
+        window, count = self._window
+        if window != second:
+            window, count = second, 0
+        self._window = (window, count + 1)
+        return count >= self.rate_limit
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v20.0/stub/messages"
+
+    def start(self) -> "StubGraphServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
@@ -0,0 +1,210 @@
+"""Webhook ack latency and per-sender ordering: inline turns vs. the
+per-sender worker queues.
+
+Each sender sends a burst of messages that arrive close together, as when a
+customer types several lines in a row. The LLM and Graph API are stubs that
+sleep, so the numbers show how long WhatsApp waits for the 200 and whether
+one sender's turns ever overlap or run in a different order from the one
+their webhooks arrived in.
+
+    cd API
+    python -m benchmarks.webhook_ack --senders 20 --burst 4
+    python -m benchmarks.webhook_ack --mode asgi --llm-latency 2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.async_vs_sync import webhook_payload
+from services import whatsapp_service
+from services.reply_stream import percentile
+
+
+class OrderCheckingLLM:
+    """Stub chat session that notices overlapping turns and turns that do
+    not follow webhook arrival order"""
+
+    lock = threading.Lock()
+    overlaps = 0
+    out_of_order = 0
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.in_flight = 0
+        self.arrivals = []
+
+    def _enter(self, text):
+        with self.lock:
+            self.in_flight += 1
+            if self.in_flight > 1:
+                OrderCheckingLLM.overlaps += 1
+            if self.arrivals and self.arrivals[0] != text:
+                OrderCheckingLLM.out_of_order += 1
+            if text in self.arrivals:
+                self.arrivals.remove(text)
+
+    def _exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def chat(self, text):
+        self._enter(text)
+        time.sleep(self.latency)
+        self._exit()
+        return f"echo: {text}"
+
+    async def achat(self, text):
+        self._enter(text)
+        await asyncio.sleep(self.latency)
+        self._exit()
+        return f"echo: {text}"
+
+
+def install_stubs(senders, llm_latency, graph_latency, queued):
+    OrderCheckingLLM.overlaps = OrderCheckingLLM.out_of_order = 0
+    whatsapp_service.chat_sessions.clear()
+    for sender in senders:
+        whatsapp_service.chat_sessions[sender] = OrderCheckingLLM(llm_latency)
+    whatsapp_service.stream_replies = False
+    whatsapp_service.async_ack = queued
+    # Every message is its own turn here, so ordering can be checked per message
+    whatsapp_service.queue.coalesce_window = 0
+    whatsapp_service.async_queue.coalesce_window = 0
+    whatsapp_service.queue.max_batch = whatsapp_service.async_queue.max_batch = 1
+
+    def send_message(to, text):
+        time.sleep(graph_latency)
+        return {}
+
+    async def send_message_async(to, text):
+        await asyncio.sleep(graph_latency)
+        return {}
+
+    whatsapp_service.send_message = send_message
+    whatsapp_service.send_message_async = send_message_async
+
+    # Arrival order is the order messages reach the queue (or, inline, the
+    # order their webhooks were parsed)
+    def record(message):
+        session = whatsapp_service.chat_sessions.peek(message.sender)
+        session.arrivals.append(message.text)
+
+    parse = type(whatsapp_service)._parse_webhook
+
+    def parse_and_record(data):
+        messages = parse(whatsapp_service, data)
+        if not queued:
+            with OrderCheckingLLM.lock:
+                for message in messages:
+                    record(message)
+        return messages
+
+    def recording_submit(queue):
+        submit = type(queue).submit
+
+        def wrapper(sender, message):
+            with OrderCheckingLLM.lock:
+                record(message)
+                return submit(queue, sender, message)
+
+        return wrapper
+
+    whatsapp_service._parse_webhook = parse_and_record
+    whatsapp_service.queue.submit = recording_submit(whatsapp_service.queue)
+    whatsapp_service.async_queue.submit = recording_submit(whatsapp_service.async_queue)
+
+
+def run_flask(payloads, threads):
+    from app import app
+
+    client = app.test_client()
+    acks = []
+
+    def post(payload):
+        start = time.perf_counter()
+        client.post("/chat/webhook", json=payload)
+        acks.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(post, payloads))
+    whatsapp_service.queue.join()
+    return time.perf_counter() - start, acks
+
+
+def run_asgi(payloads, spacing):
+    from asgi import app
+
+    acks = []
+
+    async def main():
+        client = app.test_client()
+
+        async def post(payload, delay):
+            await asyncio.sleep(delay)
+            start = time.perf_counter()
+            await client.post("/chat/webhook", json=payload)
+            acks.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(p, i * spacing) for i, p in enumerate(payloads)))
+        await whatsapp_service.async_queue.join()
+        return time.perf_counter() - start
+
+    return asyncio.run(main()), acks
+
+
+def report(label, elapsed, acks, turns):
+    acks = [ack * 1000 for ack in acks]
+    print(
+        f"{label:<26} ack p50 {percentile(acks, 50):8.1f} ms  p99 {percentile(acks, 99):8.1f} ms"
+        f"   all turns done {elapsed:6.2f} s ({turns / elapsed:5.1f} turns/s)"
+        f"   overlapping {OrderCheckingLLM.overlaps:3d}   out of order {OrderCheckingLLM.out_of_order:3d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--senders", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=4, help="messages per sender")
+    parser.add_argument("--threads", type=int, default=16, help="Flask server threads")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--graph-latency", type=float, default=0.1)
+    parser.add_argument("--spacing-ms", type=float, default=1, help="gap between webhook arrivals (ASGI)")
+    parser.add_argument("--mode", choices=["flask", "asgi", "both"], default="both")
+    args = parser.parse_args()
+
+    senders = [f"9715000{i:05d}" for i in range(args.senders)]
+    # Bursts interleave: every sender's first message, then every second one...
+    payloads = [
+        webhook_payload(sender, f"message #{seq}")
+        for seq in range(args.burst)
+        for sender in senders
+    ]
+    print(
+        f"{args.senders} senders x {args.burst} messages, stubbed turn"
+        f" {args.llm_latency + args.graph_latency:.2f} s, {whatsapp_service.queue.workers} queue workers\n"
+    )
+
+    modes = ["flask", "asgi"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        for queued in (False, True):
+            install_stubs(senders, args.llm_latency, args.graph_latency, queued)
+            with contextlib.redirect_stdout(io.StringIO()):
+                if mode == "flask":
+                    elapsed, acks = run_flask(payloads, args.threads)
+                else:
+                    elapsed, acks = run_asgi(payloads, args.spacing_ms / 1000)
+            label = f"{'Flask' if mode == 'flask' else 'ASGI'} {'queued' if queued else 'inline'}"
+            report(label, elapsed, acks, len(payloads))
+
+    print(f"\nqueue: {whatsapp_service.queue.stats()}")
+    print(f"async queue: {whatsapp_service.async_queue.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Rapid-fire messages and batched webhook payloads: one turn per message
+vs. coalescing each sender's burst into one turn.
+
+Every sender types a few short bubbles ("hi", "I want a burger", "and
+fries") a moment apart. Some webhooks arrive batched, with several
+messages across entries and changes in one payload. The chat session is a
+stub that records what each turn was given, so the numbers show model
+calls, replies sent, whether any message was lost, and how long after a
+sender's last bubble the reply went out.
+
+    cd API
+    python -W ignore -m benchmarks.webhook_coalesce --senders 30 --gap-ms 300
+"""
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+from services import whatsapp_service
+from services.reply_stream import percentile
+
+BUBBLES = ["hi", "I want a burger", "and fries", "no onions please"]
+
+
+class RecordingLLM:
+    lock = threading.Lock()
+    turns = []
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def chat(self, text):
+        with RecordingLLM.lock:
+            RecordingLLM.turns.append(text)
+        time.sleep(self.latency)
+        return "Got it!"
+
+
+def message(sender, text, message_id):
+    return {"from": sender, "id": message_id, "type": "text", "text": {"body": text}}
+
+
+def batched_payload(messages):
+    """Messages spread over two entries, each with one change per message"""
+    half = (len(messages) + 1) // 2
+    return {
+        "entry": [
+            {"changes": [{"value": {"messages": [m]}} for m in part]}
+            for part in (messages[:half], messages[half:])
+            if part
+        ]
+    }
+
+
+def install_stubs(senders, latency, window_ms):
+    RecordingLLM.turns = []
+    whatsapp_service.chat_sessions.clear()
+    for sender in senders:
+        whatsapp_service.chat_sessions[sender] = RecordingLLM(latency)
+    whatsapp_service.stream_replies = False
+    whatsapp_service.async_ack = True
+    whatsapp_service.queue.coalesce_window = window_ms / 1000
+    whatsapp_service.queue.max_batch = 10 if window_ms else 1
+    whatsapp_service.dedup.enabled = False
+    replied = {}
+
+    def send_message(to, text):
+        replied[to] = time.perf_counter()
+        return {}
+
+    whatsapp_service.send_message = send_message
+    return replied
+
+
+def run(senders, bubbles, gap, batched_senders, latency, window_ms):
+    from app import app
+
+    client = app.test_client()
+    replied = install_stubs(senders, latency, window_ms)
+    last_bubble = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Batched deliveries: all of a sender's bubbles in one payload
+        batched = senders[:batched_senders]
+        client.post("/chat/webhook", json=batched_payload([
+            message(sender, text, f"wamid.{sender}.{i}")
+            for sender in batched
+            for i, text in enumerate(bubbles)
+        ]))
+        for sender in batched:
+            last_bubble[sender] = time.perf_counter()
+
+        # Everyone else types bubble by bubble
+        for i, text in enumerate(bubbles):
+            for sender in senders[batched_senders:]:
+                client.post("/chat/webhook", json=batched_payload([
+                    message(sender, text, f"wamid.{sender}.{i}")
+                ]))
+                last_bubble[sender] = time.perf_counter()
+            time.sleep(gap)
+        whatsapp_service.queue.join()
+    elapsed = time.perf_counter() - start
+
+    received = "\n".join(RecordingLLM.turns)
+    lost = sum(
+        received.count(text) < len(senders) for text in bubbles
+    )
+    after_last = [(replied[s] - last_bubble[s]) * 1000 for s in senders if s in replied]
+    return len(RecordingLLM.turns), lost, after_last, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--senders", type=int, default=30)
+    parser.add_argument("--bubbles", type=int, default=3)
+    parser.add_argument("--gap-ms", type=float, default=300, help="pause between a sender's bubbles")
+    parser.add_argument("--batched", type=int, default=5, help="senders whose bubbles arrive in one payload")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--window-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    senders = [f"9715000{i:05d}" for i in range(args.senders)]
+    bubbles = BUBBLES[: args.bubbles]
+    print(
+        f"{args.senders} senders x {len(bubbles)} bubbles {args.gap_ms:.0f} ms apart"
+        f" ({args.batched} senders' bubbles batched in one payload), stubbed turn {args.llm_latency:.2f} s\n"
+    )
+    for label, window in (("one turn per message", 0), (f"coalesce {args.window_ms:.0f} ms", args.window_ms)):
+        turns, lost, after_last, elapsed = run(
+            senders, bubbles, args.gap_ms / 1000, args.batched, args.llm_latency, window
+        )
+        print(
+            f"{label:<22} model calls / replies {turns:4d}   bubbles lost {lost}"
+            f"   reply after last bubble p50 {percentile(after_last, 50):7.0f} ms"
+            f"  p95 {percentile(after_last, 95):7.0f} ms   all done {elapsed:5.2f} s"
+        )
+    print(f"\nqueue: {whatsapp_service.queue.stats()}")
+
+
+if __name__ == "__main__":
+    main()
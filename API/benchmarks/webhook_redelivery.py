@@ -0,0 +1,123 @@
+"""Webhook redeliveries with and without message-id dedup.
+
+A share of the messages is delivered again (as WhatsApp does when an ack
+is slow or lost), some while the first copy is still queued. The chat
+session is a stub that counts model calls, so the numbers show how many
+turns and replies each redelivery costs. A last run restarts the
+deduplicator from its journal and redelivers everything again.
+
+    cd API
+    python -W ignore -m benchmarks.webhook_redelivery --messages 500 --redelivered 0.3
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.async_vs_sync import webhook_payload
+from services import whatsapp_service
+from services.message_dedup import MessageDeduplicator
+
+
+class CountingLLM:
+    lock = threading.Lock()
+    calls = 0
+
+    def chat(self, text):
+        with CountingLLM.lock:
+            CountingLLM.calls += 1
+        time.sleep(0.002)
+        return f"echo: {text}"
+
+
+def install_stubs(senders, dedup):
+    CountingLLM.calls = 0
+    whatsapp_service.chat_sessions.clear()
+    for sender in senders:
+        whatsapp_service.chat_sessions[sender] = CountingLLM()
+    whatsapp_service.stream_replies = False
+    whatsapp_service.async_ack = True
+    # One turn per message, so model calls count deliveries that got through
+    whatsapp_service.queue.coalesce_window = 0
+    whatsapp_service.queue.max_batch = 1
+    whatsapp_service.dedup = dedup
+    sent = []
+
+    def send_message(to, text):
+        sent.append(text)
+        return {}
+
+    whatsapp_service.send_message = send_message
+    return sent
+
+
+def deliveries(senders, messages, redelivered, rng):
+    payloads = []
+    for i in range(messages):
+        sender = senders[i % len(senders)]
+        payload = webhook_payload(sender, f"message #{i}", f"wamid.{i:012d}")
+        payloads.append(payload)
+        if rng.random() < redelivered:
+            payloads.extend([payload] * rng.randint(1, 3))
+    # Redeliveries land a little later, mixed in with newer messages
+    for i in range(len(payloads) - 1, 0, -1):
+        j = max(0, i - rng.randint(0, 8))
+        payloads[i], payloads[j] = payloads[j], payloads[i]
+    return payloads
+
+
+def run(payloads, senders, dedup):
+    from app import app
+
+    client = app.test_client()
+    sent = install_stubs(senders, dedup)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for payload in payloads:
+            client.post("/chat/webhook", json=payload)
+        whatsapp_service.queue.join()
+    return time.perf_counter() - start, CountingLLM.calls, len(sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--senders", type=int, default=25)
+    parser.add_argument("--redelivered", type=float, default=0.3, help="share of messages delivered again")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    senders = [f"9715000{i:05d}" for i in range(args.senders)]
+    payloads = deliveries(senders, args.messages, args.redelivered, random.Random(args.seed))
+    print(f"{args.messages} messages, {len(payloads)} webhook deliveries\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = os.path.join(directory, "seen_message_ids.tsv")
+        runs = [
+            ("no dedup", MessageDeduplicator(enabled=False)),
+            ("dedup", MessageDeduplicator(path=journal)),
+        ]
+        for label, dedup in runs:
+            elapsed, calls, replies = run(payloads, senders, dedup)
+            print(
+                f"{label:<22} model calls {calls:5d}   replies sent {replies:5d}"
+                f"   duplicates dropped {dedup.duplicates:5d}   {elapsed:5.2f} s"
+            )
+        dedup.close()
+
+        restarted = MessageDeduplicator(path=journal)
+        elapsed, calls, replies = run(payloads, senders, restarted)
+        print(
+            f"{'after restart':<22} model calls {calls:5d}   replies sent {replies:5d}"
+            f"   duplicates dropped {restarted.duplicates:5d}   {elapsed:5.2f} s"
+        )
+        print(f"\n{restarted.stats()}")
+        restarted.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 """Controllers package"""
 from .chat import chat_bp
 from .call import call_bp
+from .menu import menu_bp
 
-__all__ = ['chat_bp', 'call_bp']
+__all__ = ['chat_bp', 'call_bp', 'menu_bp']
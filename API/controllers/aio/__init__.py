@@ -0,0 +1,6 @@
+"""Async (Quart) controllers served by asgi.py; same routes as the Flask ones"""
+from .chat import chat_bp
+from .call import call_bp
+from .menu import menu_bp
+
+__all__ = ['chat_bp', 'call_bp', 'menu_bp']
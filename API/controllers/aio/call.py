@@ -0,0 +1,67 @@
+from quart import Blueprint, request, jsonify
+from services import AsyncSupabaseService, whatsapp_service
+from services.order_messages import MENU_MESSAGE
+from services.outbound_queue import TRANSACTIONAL
+from .. import common
+
+call_bp = Blueprint('call', __name__, url_prefix='/call')
+db_service = AsyncSupabaseService()
+
+
+@call_bp.route('/webhook', methods=['POST'])
+async def register_call():
+    body, status_code = common.register_call(await request.get_json())
+    return jsonify(body), status_code
+
+
+@call_bp.route('/place-order', methods=['POST'])
+async def place_order():
+    """Place an order via call"""
+    items, delivery_address, customer_phone_number, special_requests = common.call_order_args(
+        await request.get_json()
+    )
+    
+    order = common.placed_order(
+        await db_service.create_order(items, delivery_address, customer_phone_number, special_requests),
+        customer_phone_number,
+    )
+    
+    items_text = await db_service.format_order_items(order.get('items', {}))
+    try:
+        await whatsapp_service.send_message_async(
+            customer_phone_number, common.confirmation_message(order, items_text), TRANSACTIONAL
+        )
+        print(f"✅ Order confirmation sent to {customer_phone_number}")
+    except Exception as e:
+        print(f"❌ Failed to send confirmation: {e}")
+    
+    body, status_code = common.order_placed(order['order_id'])
+    return jsonify(body), status_code
+
+
+@call_bp.route('/order-status', methods=['POST'])
+async def get_order_status():
+    """Get order/delivery status for a call session"""
+    phone_number = common.caller_phone(await request.get_json())
+    orders = await db_service.get_order_status(phone_number)
+    print(f"📋 Order status checked for {phone_number}")
+    return jsonify(orders)
+
+
+@call_bp.route('/send-menu', methods=['POST'])
+async def send_menu_link():
+    """Send menu link to customer via WhatsApp"""
+    phone_number = common.caller_phone(await request.get_json())
+    
+    try:
+        await whatsapp_service.send_message_async(phone_number, MENU_MESSAGE, TRANSACTIONAL)
+        body, status_code = common.menu_sent(phone_number)
+    except Exception as e:
+        body, status_code = common.send_failed(e)
+    return jsonify(body), status_code
+
+
+@call_bp.route('/get-current-day', methods=['POST'])
+async def get_current_day():
+    body, status_code = common.current_day()
+    return jsonify(body), status_code
@@ -0,0 +1,87 @@
+from quart import Blueprint, request, jsonify
+from services import AsyncSupabaseService, whatsapp_service
+from services.outbound_queue import TRANSACTIONAL
+from .. import common
+
+chat_bp = Blueprint('chat', __name__, url_prefix='/chat')
+db_service = AsyncSupabaseService()
+
+
+@chat_bp.route('/webhook', methods=['GET'])
+async def webhook_verify():
+    """Verify WhatsApp webhook"""
+    mode = request.args.get('hub.mode')
+    token = request.args.get('hub.verify_token')
+    challenge = request.args.get('hub.challenge')
+    
+    result, status_code = whatsapp_service.verify_webhook(mode, token, challenge)
+    return result, status_code
+
+
+@chat_bp.route('/webhook', methods=['POST'])
+async def webhook_receive():
+    """Handle incoming WhatsApp messages"""
+    result = await whatsapp_service.process_webhook_event_async(await request.get_json())
+    body, status_code = common.webhook_response(result)
+    return jsonify(body), status_code
+
+
+@chat_bp.route('/place-order', methods=['POST'])
+async def place_order():
+    """Place an order via WhatsApp"""
+    order_args = common.chat_order_args(await request.get_json())
+    body, status_code = common.order_placed(await db_service.place_order(*order_args))
+    return jsonify(body), status_code
+
+
+@chat_bp.route('/order-status', methods=['GET'])
+async def get_order_status():
+    """Get order/delivery status for WhatsApp user"""
+    phone_number = common.require(request.args.get('phone_number'), 'phone_number is required')
+    return jsonify(await db_service.get_order_status(phone_number))
+
+
+@chat_bp.route('/order-history', methods=['GET'])
+async def get_order_history():
+    """Paginated order history, newest first"""
+    return jsonify(await db_service.get_order_history(**common.history_params(request.args)))
+
+
+@chat_bp.route('/usage', methods=['GET'])
+async def get_token_usage():
+    """Gemini token usage for a customer (phone_number), a day (date,
+    YYYY-MM-DD, UAE time) or, with neither, overall"""
+    body, status_code = common.usage_report(request.args, whatsapp_service.get_session_usage)
+    return jsonify(body), status_code
+
+
+@chat_bp.route('/notify-status', methods=['POST'])
+async def notify_order_status():
+    """Send WhatsApp notification when order status changes"""
+    order = await db_service.get_order(common.notify_order_id(await request.get_json()))
+    phone_number = common.notification_recipient(order)
+    message = common.status_message(order, await db_service.format_order_items(order.get('items', {})))
+    
+    try:
+        await whatsapp_service.send_message_async(phone_number, message, TRANSACTIONAL)
+        body, status_code = common.notification_sent(phone_number)
+    except Exception as e:
+        body, status_code = common.send_failed(e)
+    return jsonify(body), status_code
+
+
+@chat_bp.route('/notify-status/bulk', methods=['POST'])
+async def notify_order_statuses():
+    """Send WhatsApp status notifications for many orders at once"""
+    order_ids = common.notify_order_ids(await request.get_json())
+    
+    # One query for all orders; item names come from the cached menu
+    notifications = await db_service.get_status_notifications(order_ids)
+    sendable = common.sendable_notifications(notifications)
+    
+    # Fan the sends out concurrently
+    sent = await whatsapp_service.send_many_async(
+        [(n['phone_number'], n['message']) for n in sendable], TRANSACTIONAL
+    )
+    body, status_code = common.bulk_notify_response(notifications, sendable, sent)
+    return jsonify(body), status_code
@@ -1,179 +1,65 @@
 from flask import Blueprint, request, jsonify
-from services import SupabaseService, phone_number_service, whatsapp_service
+from services import SupabaseService, whatsapp_service
+from services.order_messages import MENU_MESSAGE
+from services.outbound_queue import TRANSACTIONAL
+from . import common
 
 call_bp = Blueprint('call', __name__, url_prefix='/call')
 db_service = SupabaseService()
 
 @call_bp.route('/webhook', methods=['POST'])
 def register_call():
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-
-    call_data = data.get('call', {})
-    
-    call_id = call_data.get('call_id')
-    phone_number = call_data.get('from_number') or call_data.get('caller_id')
-    
-    if not call_id:
-        return jsonify({'error': 'call_id is required'}), 400
-    
-    if not phone_number:
-        return jsonify({'error': 'phone_number is required'}), 400
-    
-    phone_number_service.set_phone(call_id, phone_number)
-    
-    print(f"Call: {call_id} | Phone: {phone_number}")
-    
-    return jsonify({
-        'message': 'Call registered successfully',
-        'call_id': call_id,
-        'phone_number': phone_number
-    }), 200
+    body, status_code = common.register_call(request.get_json())
+    return jsonify(body), status_code
 
 
 @call_bp.route('/place-order', methods=['POST'])
 def place_order():
     """Place an order via call"""
-    raw_data = request.get_json()
-    
-    if not raw_data:
-        return jsonify({'error': 'No JSON data provided'}), 400
+    items, delivery_address, customer_phone_number, special_requests = common.call_order_args(request.get_json())
     
-    call_data = raw_data.get('call', {})
-    call_id = call_data.get('call_id')
+    order = common.placed_order(
+        db_service.create_order(items, delivery_address, customer_phone_number, special_requests),
+        customer_phone_number,
+    )
     
-    if not call_id:
-        return jsonify({'error': 'call_id is required'}), 400
-    
-    # Get order data from 'args'
-    args = raw_data.get('args', {})
-    
-    items = args.get('items')
-    delivery_address = args.get('delivery_address')
-    special_requests = args.get('special_requests')
-    
-    if not items:
-        return jsonify({'error': 'items is required'}), 400
-    
-    if not delivery_address:
-        return jsonify({'error': 'delivery_address is required'}), 400
-    
-    # Get phone number from call session
-    customer_phone_number = phone_number_service.get_phone(call_id)
-    
-    if not customer_phone_number:
-        return jsonify({'error': f'No phone number for call_id: {call_id}'}), 400
-    
-    order_id = db_service.place_order(items, delivery_address, customer_phone_number, special_requests)
+    # Send WhatsApp confirmation
+    items_text = db_service.format_order_items(order.get('items', {}))
+    try:
+        whatsapp_service.send_message(
+            customer_phone_number, common.confirmation_message(order, items_text), TRANSACTIONAL
+        )
+        print(f"✅ Order confirmation sent to {customer_phone_number}")
+    except Exception as e:
+        print(f"❌ Failed to send confirmation: {e}")
     
-    if order_id:
-        print(f"✅ Order {order_id} placed for {customer_phone_number}")
-        
-        order_response = db_service.supabase.table('orders').select('*').eq('order_id', order_id).single().execute()
-        
-        if order_response.data:
-            order = order_response.data
-            
-            items_dict = order.get('items', {})
-            items_list = []
-            
-            for item_id, quantity in items_dict.items():
-                menu_item = db_service.supabase.table('menu').select('name').eq('item_id', int(item_id)).execute()
-                if menu_item.data:
-                    item_name = menu_item.data[0]['name']
-                    if quantity > 1:
-                        items_list.append(f"{item_name} x{quantity}")
-                    else:
-                        items_list.append(item_name)
-            
-            items_text = ', '.join(items_list) if items_list else 'your order'
-            total = order.get('total_amount', 0)
-            
-            # Send WhatsApp confirmation
-            confirmation_message = f"Your order of {items_text} has been placed successfully! Total: {total} AED. We'll notify you when it's on the way."
-            
-            try:
-                whatsapp_service.send_message(customer_phone_number, confirmation_message)
-                print(f"✅ Order confirmation sent to {customer_phone_number}")
-            except Exception as e:
-                print(f"❌ Failed to send confirmation: {e}")
-        
-        return jsonify({'order_id': order_id, 'message': 'Order placed successfully'}), 201
-    else:
-        return jsonify({'error': 'Failed to place order'}), 500
+    body, status_code = common.order_placed(order['order_id'])
+    return jsonify(body), status_code
 
 
 @call_bp.route('/order-status', methods=['POST'])
 def get_order_status():
     """Get order/delivery status for a call session"""
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-    
-    # Extract real call_id from nested 'call' object
-    call_data = data.get('call', {})
-    call_id = call_data.get('call_id')
-    
-    if not call_id:
-        return jsonify({'error': 'call_id is required'}), 400
-    
-    phone_number = phone_number_service.get_phone(call_id)
-    
-    if not phone_number:
-        return jsonify({'error': f'No phone number for call_id: {call_id}'}), 400
-    
+    phone_number = common.caller_phone(request.get_json())
     orders = db_service.get_order_status(phone_number)
-    
     print(f"📋 Order status checked for {phone_number}")
-    
     return jsonify(orders)
 
 
 @call_bp.route('/send-menu', methods=['POST'])
 def send_menu_link():
     """Send menu link to customer via WhatsApp"""
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-    
-    call_data = data.get('call', {})
-    call_id = call_data.get('call_id')
-    
-    if not call_id:
-        return jsonify({'error': 'call_id is required'}), 400
-    
-    phone_number = phone_number_service.get_phone(call_id)
-    
-    if not phone_number:
-        return jsonify({'error': f'No phone for call_id: {call_id}'}), 400
-    
-    message = "Here's our complete menu: https://ritaj-restaurant.vercel.app/"
+    phone_number = common.caller_phone(request.get_json())
     
     try:
-        whatsapp_service.send_message(phone_number, message)
-        print(f"✅ Menu sent to {phone_number}")
-        
-        return jsonify({
-            'message': 'Menu link sent',
-            'phone_number': phone_number
-        }), 200
+        whatsapp_service.send_message(phone_number, MENU_MESSAGE, TRANSACTIONAL)
+        body, status_code = common.menu_sent(phone_number)
     except Exception as e:
-        print(f"❌ WhatsApp error: {e}")
-        return jsonify({'error': str(e)}), 500
+        body, status_code = common.send_failed(e)
+    return jsonify(body), status_code
 
 
 @call_bp.route('/get-current-day', methods=['POST'])
 def get_current_day():
-
-    from services.day_service import DayService
-    
-    day_service = DayService()
-    current_day = day_service.get_current_day()
-    
-    print(f"📅 Current day requested: {current_day}")
-    
-    return jsonify({'day': current_day}), 200
+    body, status_code = common.current_day()
+    return jsonify(body), status_code
@@ -0,0 +1,273 @@
+"""Request parsing and response building shared by the Flask controllers
+and their Quart mirrors in controllers/aio.
+
+Each stack keeps only the transport: reading the request, calling or
+awaiting the services, and turning the (body, status) pairs built here
+into responses. Invalid requests raise RequestError, which app.py and
+asgi.py turn into {'error': message} responses.
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import SupabaseService, phone_number_service
+from services.day_service import DayService
+from services.order_messages import order_confirmation_message, order_status_message
+from services.supabase_service import DEFAULT_ORDER_HISTORY_LIMIT, MAX_NOTIFY_ORDERS
+from services.token_usage import token_usage
+
+Response = Tuple[Any, int]
+
+
+class RequestError(Exception):
+    """A request that cannot be served, with the status to answer it with"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def response(self) -> Response:
+        return {'error': self.message}, self.status
+
+
+def require(value, message: str, status: int = 400):
+    if not value:
+        raise RequestError(message, status)
+    return value
+
+
+def send_failed(error: Exception) -> Response:
+    print(f"❌ WhatsApp error: {error}")
+    return {'error': str(error)}, 500
+
+
+# Chat ----------------------------------------------------------------------
+
+def webhook_response(result: str) -> Response:
+    # Not acknowledged, so WhatsApp redelivers once the queue has drained
+    return {'status': result}, 503 if result == 'BUSY' else 200
+
+
+def chat_order_args(raw: Optional[Dict]) -> Tuple[Any, str, str, Optional[str]]:
+    """(items, delivery_address, phone_number, special_requests) of a chat
+    order, given at the top level or under 'args'"""
+    if raw is None:
+        raise RequestError('No JSON data provided')
+    data = raw['args'] if 'args' in raw else raw
+    if data is None:
+        raise RequestError('No order data provided')
+
+    required_fields = ['items', 'delivery_address', 'phone_number']
+    missing_fields = [field for field in required_fields if field not in data]
+    if missing_fields:
+        raise RequestError(f'Missing required fields: {missing_fields}')
+    return data['items'], data['delivery_address'], data['phone_number'], data.get('special_requests')
+
+
+def order_placed(order_id) -> Response:
+    require(order_id, 'Failed to place order', 500)
+    return {'order_id': order_id, 'message': 'Order placed successfully'}, 201
+
+
+def history_params(args) -> Dict[str, Any]:
+    """Keyword arguments for get_order_history from the query string"""
+    phone_number = require(args.get('phone_number'), 'phone_number is required')
+    try:
+        limit = int(args.get('limit', DEFAULT_ORDER_HISTORY_LIMIT))
+        cursor = args.get('cursor')
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        raise RequestError('limit and cursor must be integers')
+    statuses = SupabaseService.parse_status_filter(args.get('status'))
+    return {'phone_number': phone_number, 'limit': limit, 'cursor': cursor, 'statuses': statuses}
+
+
+def usage_report(args, session_usage) -> Response:
+    """Token usage for a customer (phone_number), a day (date) or overall;
+    session_usage(phone_number) adds the customer's live session"""
+    phone_number = args.get('phone_number')
+    day = args.get('date')
+
+    if day:
+        try:
+            date.fromisoformat(day)
+        except ValueError:
+            raise RequestError('date must be YYYY-MM-DD')
+
+    if phone_number:
+        usage = token_usage.for_sender(phone_number)
+        usage['active_session'] = session_usage(phone_number)
+        return usage, 200
+    if day:
+        return token_usage.for_day(day), 200
+    return token_usage.stats(), 200
+
+
+def notify_order_id(data: Optional[Dict]):
+    require(data, 'No data provided')
+    return require(data.get('order_id'), 'order_id is required')
+
+
+def notification_recipient(order: Optional[Dict]) -> str:
+    require(order, 'Order not found', 404)
+    return require(order.get('customer_phone_number'), 'No phone number for this order')
+
+
+def status_message(order: Dict, items_text: str) -> str:
+    return order_status_message(order.get('status'), items_text, order.get('delivery_address'))
+
+
+def notification_sent(phone_number: str) -> Response:
+    print(f"✅ Status notification sent to {phone_number}")
+    return {'message': 'Notification sent successfully'}, 200
+
+
+def notify_order_ids(data: Optional[Dict]) -> List[Any]:
+    require(data, 'No data provided')
+    order_ids = require(
+        SupabaseService.parse_order_ids(data.get('order_ids')),
+        'order_ids must be a non-empty list of order ids',
+    )
+    if len(order_ids) > MAX_NOTIFY_ORDERS:
+        raise RequestError(f'At most {MAX_NOTIFY_ORDERS} orders per request')
+    return order_ids
+
+
+def sendable_notifications(notifications: Optional[List[Dict]]) -> List[Dict]:
+    require(notifications is not None, 'Failed to fetch orders', 500)
+    return [n for n in notifications if 'error' not in n]
+
+
+def bulk_notify_response(notifications: List[Dict], sendable: List[Dict], sent: List[Dict]) -> Response:
+    for notification, result in zip(sendable, sent):
+        if 'error' in result:
+            notification['error'] = str(result['error'])
+
+    results = []
+    for notification in notifications:
+        result = {'order_id': notification['order_id'], 'sent': 'error' not in notification}
+        if 'status' in notification:
+            result['status'] = notification['status']
+        if 'error' in notification:
+            result['error'] = notification['error']
+        results.append(result)
+
+    sent_count = sum(result['sent'] for result in results)
+    print(f"✅ Status notifications sent for {sent_count}/{len(results)} orders")
+    return {
+        'results': results,
+        'sent': sent_count,
+        'failed': len(results) - sent_count
+    }, 200
+
+
+# Call ----------------------------------------------------------------------
+
+def register_call(data: Optional[Dict]) -> Response:
+    """Remember the caller's number for the call's tool requests, or forget
+    it once the call has ended"""
+    require(data, 'No data provided')
+    call_data = data.get('call', {})
+    call_id = require(call_data.get('call_id'), 'call_id is required')
+    phone_number = call_data.get('from_number') or call_data.get('caller_id')
+
+    # The call is over; its tool requests are done with the phone number
+    if data.get('event') == 'call_ended':
+        phone_number_service.clear_phone(call_id)
+        print(f"Call ended: {call_id}")
+        return {'message': 'Call ended', 'call_id': call_id}, 200
+
+    require(phone_number, 'phone_number is required')
+    require(phone_number_service.set_phone(call_id, phone_number), 'Failed to register call', 500)
+    print(f"Call: {call_id} | Phone: {phone_number}")
+    return {
+        'message': 'Call registered successfully',
+        'call_id': call_id,
+        'phone_number': phone_number
+    }, 200
+
+
+def call_id_of(data: Optional[Dict]) -> str:
+    require(data, 'No data provided')
+    return require(data.get('call', {}).get('call_id'), 'call_id is required')
+
+
+def phone_for_call(call_id: str) -> str:
+    return require(phone_number_service.get_phone(call_id), f'No phone number for call_id: {call_id}')
+
+
+def caller_phone(data: Optional[Dict]) -> str:
+    """Phone number registered for the request's call"""
+    return phone_for_call(call_id_of(data))
+
+
+def call_order_args(raw: Optional[Dict]) -> Tuple[Any, str, str, Optional[str]]:
+    """(items, delivery_address, phone_number, special_requests) of an
+    order placed during a call"""
+    require(raw, 'No JSON data provided')
+    call_id = call_id_of(raw)
+    args = raw.get('args', {})
+    items = require(args.get('items'), 'items is required')
+    delivery_address = require(args.get('delivery_address'), 'delivery_address is required')
+    return items, delivery_address, phone_for_call(call_id), args.get('special_requests')
+
+
+def placed_order(order: Optional[Dict], phone_number: str) -> Dict:
+    require(order, 'Failed to place order', 500)
+    print(f"✅ Order {order['order_id']} placed for {phone_number}")
+    return order
+
+
+def confirmation_message(order: Dict, items_text: str) -> str:
+    return order_confirmation_message(items_text, order.get('total_amount', 0))
+
+
+def menu_sent(phone_number: str) -> Response:
+    print(f"✅ Menu sent to {phone_number}")
+    return {
+        'message': 'Menu link sent',
+        'phone_number': phone_number
+    }, 200
+
+
+def current_day() -> Response:
+    day = DayService.get_current_day()
+    print(f"📅 Current day requested: {day}")
+    return {'day': day}, 200
+
+
+# Health --------------------------------------------------------------------
+
+def health_report(webhook_queue, graph_client, **extra) -> Dict[str, Any]:
+    """/health body; the stacks differ only in their webhook queue and
+    Graph client"""
+    from services import whatsapp_service, menu_catalog
+    from services.intent_router import intent_router
+    from services.llm_service import model_cache
+    from services.order_writer import order_writer
+    from services.turn_trace import turn_tracer
+
+    return {
+        'status': 'healthy',
+        **extra,
+        'active_whatsapp_sessions': whatsapp_service.get_active_sessions_count(),
+        'whatsapp_sessions': whatsapp_service.chat_sessions.stats(),
+        'shared_sessions': (
+            whatsapp_service.shared_sessions.stats() if whatsapp_service.shared_sessions else None
+        ),
+        'active_call_sessions': phone_number_service.get_active_sessions_count(),
+        'call_sessions': phone_number_service.stats(),
+        'menu_cache': menu_catalog.stats(),
+        'llm_models': model_cache.stats(),
+        'reply_latency': whatsapp_service.reply_timings.stats(),
+        'webhook_queue': webhook_queue.stats(),
+        'webhook_dedup': whatsapp_service.dedup.stats(),
+        'graph_client': graph_client.stats(),
+        'intent_router': intent_router.stats(),
+        'outbound_queue': (
+            whatsapp_service.outbound.stats() if whatsapp_service.outbound else {'enabled': False}
+        ),
+        'order_writer': order_writer.stats() if order_writer else {'enabled': False},
+        'turn_traces': turn_tracer.stats(),
+        'token_usage': token_usage.stats()
+    }
@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from services import SupabaseService, menu_catalog
+
+menu_bp = Blueprint('menu', __name__, url_prefix='/menu')
+db_service = SupabaseService()
+
+
+@menu_bp.route('', methods=['GET'])
+def get_menu():
+    """Menu grouped by category with what is orderable right now (used by the website)"""
+    menu = db_service.get_menu_items(request.args.get('category'))
+    return jsonify(menu), 200
+
+
+@menu_bp.route('/refresh', methods=['POST'])
+def refresh_menu_cache():
+    """Invalidate the cached menu after the Dashboard edits it"""
+    menu_catalog.invalidate()
+    print("🔄 Menu cache invalidated")
+    return jsonify({'message': 'Menu cache invalidated'}), 200
+
+
+@menu_bp.route('/cache-stats', methods=['GET'])
+def menu_cache_stats():
+    """Menu cache hit/miss counters"""
+    return jsonify(menu_catalog.stats()), 200
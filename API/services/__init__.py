@@ -1,13 +1,36 @@
+from .menu_catalog import MenuCatalog, menu_catalog
+from .storage_backend import (
+    StorageBackend,
+    SupabaseStorage,
+    SQLiteStorage,
+    get_storage_backend,
+    set_storage_backend,
+)
 from .supabase_service import SupabaseService
+from .async_supabase_service import AsyncSupabaseService
 from .phone_number_service import PhoneNumberService, phone_number_service
+from .llm_backend import LLMBackend, GeminiBackend, FakeBackend, get_llm_backend, set_llm_backend
 from .llm_service import LLMService
 from .geocoding_service import GeocodingService, geocoding_service
 from .whatsapp_service import WhatsAppService, whatsapp_service
 
 __all__ = [
+    "MenuCatalog",
+    "menu_catalog",
+    "StorageBackend",
+    "SupabaseStorage",
+    "SQLiteStorage",
+    "get_storage_backend",
+    "set_storage_backend",
     "SupabaseService",
+    "AsyncSupabaseService",
     "PhoneNumberService",
     "phone_number_service",
+    "LLMBackend",
+    "GeminiBackend",
+    "FakeBackend",
+    "get_llm_backend",
+    "set_llm_backend",
     "LLMService",
     "GeocodingService",
     "geocoding_service",
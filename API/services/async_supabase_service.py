@@ -0,0 +1,173 @@
+import asyncio
+from typing import Optional, Dict, Any, List
+
+from .menu_catalog import MenuSnapshot, menu_catalog
+from .order_writer import is_provisional, order_writer
+from .storage_backend import get_async_storage_backend
+from .turn_trace import span
+from .supabase_service import (
+    DEFAULT_ORDER_HISTORY_LIMIT,
+    _build_order_row,
+    _clamp_limit,
+    _format_order_items,
+    _group_menu,
+    _order_history_page,
+    _pending_orders,
+    _resolve_order_ids,
+    _settle_pending,
+    _status_notifications,
+    _table_ids,
+    _unorderable_items,
+    _with_pending_orders,
+)
+
+
+class AsyncSupabaseService:
+    """Awaitable counterpart of SupabaseService used by the ASGI app.
+
+    Shares the process-wide menu catalog with the sync service so both
+    paths see the same cached snapshot.
+    """
+
+    def __init__(self, storage=None):
+        # Resolved lazily so STORAGE_BACKEND/set_storage_backend apply
+        self._storage = storage
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_async_storage_backend()
+        return self._storage
+
+    async def _fetch_menu_rows(self) -> List[Dict[str, Any]]:
+        with span("db.fetch_menu_rows"):
+            return await self.storage.fetch_menu_rows()
+
+    async def get_menu_catalog(self) -> Optional[MenuSnapshot]:
+        return await menu_catalog.aget(self._fetch_menu_rows)
+
+    async def get_menu_items(
+        self, category: Optional[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            catalog = await self.get_menu_catalog()
+            if catalog is None:
+                return {}
+            return _group_menu(catalog, category)
+
+        except Exception as e:
+            print(f"Error fetching menu items: {e}")
+            return {}
+
+    async def get_unorderable_items(self, item_names: List[str]) -> Dict[str, str]:
+        catalog = await self.get_menu_catalog()
+        if catalog is None:
+            return {}
+        return _unorderable_items(catalog, item_names)
+
+    async def format_order_items(self, items: Dict[str, int]) -> str:
+        return _format_order_items(await self.get_menu_catalog(), items)
+
+    async def get_order(self, order_id: Any) -> Optional[Dict[str, Any]]:
+        lookup, pending = _resolve_order_ids([order_id])
+        if pending:
+            return pending[0]
+        if is_provisional(lookup[order_id]):
+            return None
+        try:
+            with span("db.get_order"):
+                return await self.storage.get_order(lookup[order_id])
+        except Exception as e:
+            print(f"Error fetching order {order_id}: {e}")
+            return None
+
+    async def get_status_notifications(self, order_ids: List[Any]) -> Optional[List[Dict[str, Any]]]:
+        lookup, pending = _resolve_order_ids(order_ids)
+        try:
+            table_ids = _table_ids(lookup)
+            with span("db.get_orders"):
+                rows = await self.storage.get_orders(table_ids) if table_ids else []
+            return _status_notifications(await self.get_menu_catalog(), rows + pending, order_ids, lookup)
+        except Exception as e:
+            print(f"Error fetching orders {order_ids}: {e}")
+            return None
+
+    async def place_order(
+        self,
+        items: Dict[str, int],
+        delivery_address: str,
+        customer_phone_number: str,
+        special_requests: Optional[str] = None,
+    ) -> Optional[int]:
+        order = await self.create_order(
+            items, delivery_address, customer_phone_number, special_requests
+        )
+        return order["order_id"] if order else None
+
+    async def create_order(
+        self,
+        items: Dict[str, int],
+        delivery_address: str,
+        customer_phone_number: str,
+        special_requests: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            catalog = await self.get_menu_catalog()
+            if catalog is None:
+                return None
+
+            order_data = _build_order_row(
+                catalog, items, delivery_address, customer_phone_number, special_requests
+            )
+            if order_data is None:
+                return None
+
+            if order_writer is not None:
+                # The journal append may fsync, keep it off the event loop
+                provisional_id = await asyncio.to_thread(order_writer.submit, order_data)
+                return dict(order_data, order_id=provisional_id)
+
+            with span("db.insert_orders"):
+                inserted = await self.storage.insert_orders([order_data])
+
+            if inserted:
+                return inserted[0]
+            else:
+                return None
+
+        except Exception as e:
+            print(f"Error placing order: {e}")
+            return None
+
+    async def get_order_history(
+        self,
+        phone_number: str,
+        limit: int = DEFAULT_ORDER_HISTORY_LIMIT,
+        cursor: Optional[int] = None,
+        statuses: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        limit = _clamp_limit(limit)
+
+        try:
+            pending = _pending_orders(phone_number, cursor, statuses)
+            # Fetch one extra row to know whether another page exists
+            with span("db.fetch_orders"):
+                rows = await self.storage.fetch_orders(phone_number, limit + 1, cursor, statuses)
+            catalog = await self.get_menu_catalog()
+            page = _order_history_page(catalog, rows, limit)
+            # settle() may wait for a batch insert: keep it off the event loop
+            settled = await asyncio.to_thread(_settle_pending, pending)
+            return _with_pending_orders(catalog, page, pending, settled, limit)
+
+        except Exception as e:
+            print(f"Error fetching order status: {e}")
+            return {"orders": [], "next_cursor": None}
+
+    async def get_order_status(
+        self,
+        phone_number: str,
+        limit: int = DEFAULT_ORDER_HISTORY_LIMIT,
+        statuses: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        page = await self.get_order_history(phone_number, limit=limit, statuses=statuses)
+        return page["orders"]
@@ -0,0 +1,184 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+DAY_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+ALL_DAYS = frozenset(range(7))
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+_DAY_LOOKUP = {}
+for _index, _name in enumerate(DAY_NAMES):
+    _DAY_LOOKUP[_name.lower()] = _index
+    _DAY_LOOKUP[_name[:3].lower()] = _index
+
+_LEGACY_PATTERN = re.compile(r"Available on\s+(.+)", re.IGNORECASE)
+
+
+def _parse_days(value: Any) -> FrozenSet[int]:
+    if value is None or value == "":
+        return ALL_DAYS
+    if isinstance(value, str):
+        value = re.split(r"[,/&]|\band\b", value)
+    days = set()
+    for day in value:
+        key = str(day).strip().strip(".").lower()
+        if key in _DAY_LOOKUP:
+            days.add(_DAY_LOOKUP[key])
+    # An unrecognised day never matches, same as the old string comparison
+    return frozenset(days)
+
+
+def _parse_minutes(value: Any) -> Optional[int]:
+    """Accept 7, "7", "07:30" or "07:30:00" and return minutes after midnight"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) * 60
+    parts = str(value).strip().split(":")
+    hours = int(parts[0])
+    minutes = int(parts[1]) if len(parts) > 1 else 0
+    return hours * 60 + minutes
+
+
+class Schedule:
+    """When a menu item can be ordered: days of week plus an optional time window"""
+
+    def __init__(
+        self,
+        days: FrozenSet[int] = ALL_DAYS,
+        start_minute: Optional[int] = None,
+        end_minute: Optional[int] = None,
+    ):
+        self.days = days
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+
+    @property
+    def is_restricted(self) -> bool:
+        return self.days != ALL_DAYS or self.start_minute is not None
+
+    def covers(self, weekday: int, minute: int) -> bool:
+        if self.start_minute is None:
+            return weekday in self.days
+        start, end = self.start_minute, self.end_minute
+        if start <= end:
+            return weekday in self.days and start <= minute < end
+        # Window wraps past midnight, e.g. 22:00-02:00; the early hours
+        # belong to the previous day's window
+        if minute >= start:
+            return weekday in self.days
+        return minute < end and (weekday - 1) % 7 in self.days
+
+    def describe(self) -> str:
+        if not self.days:
+            return "Not available currently"
+        text = "Available"
+        if self.days != ALL_DAYS:
+            text += " on " + ", ".join(DAY_NAMES[d] for d in sorted(self.days))
+        if self.start_minute is not None:
+            text += " {:02d}:{:02d}-{:02d}:{:02d}".format(
+                *divmod(self.start_minute, 60), *divmod(self.end_minute, 60)
+            )
+        return text
+
+    @classmethod
+    def from_menu_row(cls, item: Dict[str, Any]) -> "Schedule":
+        """Read available_days/available_from/available_until, falling back to
+        the legacy "Available on <Day>" description convention"""
+        days_value = item.get("available_days")
+        if days_value is None and item.get("description"):
+            match = _LEGACY_PATTERN.search(item["description"])
+            if match:
+                days_value = match.group(1)
+
+        start = _parse_minutes(item.get("available_from"))
+        end = _parse_minutes(item.get("available_until"))
+        if start is None or end is None:
+            start = end = None
+
+        return cls(_parse_days(days_value), start, end)
+
+
+class AvailabilityIndex:
+    """Precompiled (weekday, time slot) -> orderable item_ids lookup.
+
+    Built once per menu snapshot so checking what can be ordered right now
+    is a table lookup instead of a parse of every menu row. Time windows are
+    resolved to SLOT_MINUTES granularity.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self.schedules: Dict[int, Schedule] = {}
+        disabled = set()
+
+        for item in items:
+            item_id = int(item["item_id"])
+            try:
+                self.schedules[item_id] = Schedule.from_menu_row(item)
+            except (TypeError, ValueError) as e:
+                print(f"Error parsing availability for {item.get('name')}: {e}")
+                self.schedules[item_id] = Schedule()
+            if item.get("is_available") is False:
+                disabled.add(item_id)
+        self._disabled = frozenset(disabled)
+
+        # Items without restrictions share one set; only restricted items
+        # need to be tested against each slot
+        always = frozenset(
+            item_id
+            for item_id, schedule in self.schedules.items()
+            if not schedule.is_restricted and item_id not in disabled
+        )
+        restricted = [
+            (item_id, schedule)
+            for item_id, schedule in self.schedules.items()
+            if schedule.is_restricted and item_id not in disabled
+        ]
+
+        cache: Dict[FrozenSet[int], FrozenSet[int]] = {}
+        self._slots: List[List[FrozenSet[int]]] = []
+        for weekday in range(7):
+            day_slots = []
+            for slot in range(SLOTS_PER_DAY):
+                minute = slot * SLOT_MINUTES
+                extra = frozenset(
+                    item_id
+                    for item_id, schedule in restricted
+                    if schedule.covers(weekday, minute)
+                )
+                # Reuse identical sets so 672 slots cost a handful of objects
+                day_slots.append(cache.setdefault(extra, always | extra))
+            self._slots.append(day_slots)
+
+    @staticmethod
+    def _slot_for(when: datetime) -> Tuple[int, int]:
+        return when.weekday(), (when.hour * 60 + when.minute) // SLOT_MINUTES
+
+    def orderable_ids(self, when: datetime) -> FrozenSet[int]:
+        weekday, slot = self._slot_for(when)
+        return self._slots[weekday][slot]
+
+    def is_orderable(self, item_id: int, when: datetime) -> bool:
+        return int(item_id) in self.orderable_ids(when)
+
+    def schedule_for(self, item_id: int) -> Schedule:
+        return self.schedules.get(int(item_id), Schedule())
+
+    def day_specials(self, weekday: int) -> List[int]:
+        """item_ids limited to certain days that are offered on this weekday"""
+        return [
+            item_id
+            for item_id, schedule in self.schedules.items()
+            if schedule.days != ALL_DAYS
+            and weekday in schedule.days
+            and item_id not in self._disabled
+        ]
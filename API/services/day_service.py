@@ -1,10 +1,15 @@
 from datetime import datetime
 import pytz
 
+# Building a pytz timezone is not free; resolve it once per process
+UAE_TZ = pytz.timezone('Asia/Dubai')
+
 
 class DayService:
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now(UAE_TZ)
+
     @staticmethod
     def get_current_day() -> str:
-        uae_tz = pytz.timezone('Asia/Dubai')
-        uae_time = datetime.now(uae_tz)
-        return uae_time.strftime("%A")
+        return DayService.now().strftime("%A")
@@ -0,0 +1,328 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from .reply_stream import percentile
+from .turn_trace import span
+
+load_dotenv()
+
+GRAPH_API_VERSION = os.getenv("GRAPH_API_VERSION", "v20.0")
+GRAPH_TIMEOUT_SECONDS = float(os.getenv("GRAPH_TIMEOUT_SECONDS", "10"))
+GRAPH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GRAPH_CONNECT_TIMEOUT_SECONDS", "3"))
+# Keep-alive connections to graph.facebook.com, and sends in flight at once
+GRAPH_MAX_CONNECTIONS = int(os.getenv("GRAPH_MAX_CONNECTIONS", "20"))
+# Retries after a 429 / 5xx / failed connect, with full-jitter backoff
+GRAPH_MAX_RETRIES = int(os.getenv("GRAPH_MAX_RETRIES", "3"))
+GRAPH_RETRY_BASE_SECONDS = float(os.getenv("GRAPH_RETRY_BASE_SECONDS", "0.25"))
+GRAPH_RETRY_MAX_SECONDS = float(os.getenv("GRAPH_RETRY_MAX_SECONDS", "4"))
+SEND_TIMINGS_KEPT = 1000
+
+
+def messages_url(phone_number_id: Optional[str]) -> str:
+    return f"https://graph.facebook.com/{GRAPH_API_VERSION}/{phone_number_id}/messages"
+
+
+def text_payload(to: str, text: str) -> Dict[str, Any]:
+    return {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "text",
+        "text": {"body": text},
+    }
+
+
+def is_retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class GraphResult:
+    """Outcome of a send: HTTP status (None when no response came back),
+    the response body, whether trying again later is safe, and any
+    Retry-After Meta asked for (seconds)"""
+
+    def __init__(
+        self,
+        status: Optional[int],
+        body: Dict[str, Any],
+        retryable: bool,
+        retry_after: Optional[float] = None,
+    ):
+        self.status = status
+        self.body = body
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and self.status < 400
+
+
+class _GraphSender:
+    """Retry policy and counters shared by the sync and async clients.
+
+    Only outcomes where Meta cannot have taken the message are retried:
+    429, 5xx and connections that never opened (refused or timed out). A
+    read timeout is reported as a failure instead, since the message may
+    already be on its way.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        access_token: Optional[str],
+        max_connections: int,
+        timeout: float,
+        connect_timeout: float,
+        max_retries: int,
+        retry_base: float,
+        retry_max: float,
+    ):
+        self.url = url
+        self.access_token = access_token
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self._lock = threading.Lock()
+        self._timings = deque(maxlen=SEND_TIMINGS_KEPT)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.statuses: Dict[str, int] = {}
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+        }
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+
+    def _timeouts(self) -> httpx.Timeout:
+        # The send semaphore already bounds use of the pool
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout, pool=None)
+
+    @staticmethod
+    def _retry_after(response: Optional[httpx.Response]) -> Optional[float]:
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full jitter, or Meta's Retry-After when it sends one"""
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.retry_max)
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    def _count(self, key: str):
+        with self._lock:
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def _finish(self, started: float, ok: bool, attempts: int):
+        with self._lock:
+            self._timings.append((time.perf_counter() - started) * 1000)
+            self.retries += attempts - 1
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def _outcome(
+        self, response: Optional[httpx.Response], error: Optional[Exception], retryable: bool
+    ) -> GraphResult:
+        if response is None:
+            return GraphResult(None, {"error": str(error) or type(error).__name__}, retryable)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"error": f"HTTP {response.status_code}", "body": response.text[:200]}
+        return GraphResult(response.status_code, body, retryable, self._retry_after(response))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            timings = list(self._timings)
+            return {
+                "max_connections": self.max_connections,
+                "in_flight": self.in_flight,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "statuses": dict(self.statuses),
+                "send_p50_ms": percentile(timings, 50),
+                "send_p95_ms": percentile(timings, 95),
+            }
+
+
+class GraphClient(_GraphSender):
+    """Sends WhatsApp messages over a pooled keep-alive HTTP client.
+
+    Connections are reused across sends and threads, so a reply no longer
+    pays for a new TCP and TLS handshake. At most max_connections sends
+    run at once; callers beyond that wait for a slot.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        access_token: Optional[str],
+        max_connections: int = GRAPH_MAX_CONNECTIONS,
+        timeout: float = GRAPH_TIMEOUT_SECONDS,
+        connect_timeout: float = GRAPH_CONNECT_TIMEOUT_SECONDS,
+        max_retries: int = GRAPH_MAX_RETRIES,
+        retry_base: float = GRAPH_RETRY_BASE_SECONDS,
+        retry_max: float = GRAPH_RETRY_MAX_SECONDS,
+    ):
+        super().__init__(
+            url, access_token, max_connections, timeout, connect_timeout,
+            max_retries, retry_base, retry_max,
+        )
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._http: Optional[httpx.Client] = None
+        self._http_lock = threading.Lock()
+
+    def _client(self) -> httpx.Client:
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    self._http = httpx.Client(limits=self._limits(), timeout=self._timeouts())
+        return self._http
+
+    def send(self, to: str, text: str) -> Dict[str, Any]:
+        """Send a text message; returns the Graph API response body, or a
+        dict with "error" once retries are used up"""
+        return self.deliver(text_payload(to, text)).body
+
+    def post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.deliver(payload).body
+
+    def deliver(self, payload: Dict[str, Any]) -> GraphResult:
+        started = time.perf_counter()
+        attempt = 0
+        with span("graph.send") as attrs, self._slots:
+            with self._lock:
+                self.in_flight += 1
+            try:
+                while True:
+                    response = error = None
+                    try:
+                        response = self._client().post(self.url, headers=self._headers(), json=payload)
+                        self._count(str(response.status_code))
+                        retry = is_retryable(response.status_code)
+                    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                        self._count("connect_error")
+                        retry, error = True, e
+                    except httpx.HTTPError as e:
+                        self._count(type(e).__name__)
+                        retry, error = False, e
+
+                    if not retry or attempt >= self.max_retries:
+                        break
+                    time.sleep(self._backoff(attempt, response))
+                    attempt += 1
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+            attrs["attempts"] = attempt + 1
+            result = self._outcome(response, error, retry)
+            self._finish(started, result.ok, attempt + 1)
+            attrs["status"] = result.status or type(error).__name__
+            return result
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+
+class AsyncGraphClient(_GraphSender):
+    """Event-loop counterpart of GraphClient for the ASGI app"""
+
+    def __init__(
+        self,
+        url: str,
+        access_token: Optional[str],
+        max_connections: int = GRAPH_MAX_CONNECTIONS,
+        timeout: float = GRAPH_TIMEOUT_SECONDS,
+        connect_timeout: float = GRAPH_CONNECT_TIMEOUT_SECONDS,
+        max_retries: int = GRAPH_MAX_RETRIES,
+        retry_base: float = GRAPH_RETRY_BASE_SECONDS,
+        retry_max: float = GRAPH_RETRY_MAX_SECONDS,
+    ):
+        super().__init__(
+            url, access_token, max_connections, timeout, connect_timeout,
+            max_retries, retry_base, retry_max,
+        )
+        # Created inside the running loop on first use
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    async def send(self, to: str, text: str) -> Dict[str, Any]:
+        return (await self.deliver(text_payload(to, text))).body
+
+    async def post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.deliver(payload)).body
+
+    async def deliver(self, payload: Dict[str, Any]) -> GraphResult:
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=self._limits(), timeout=self._timeouts())
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+        started = time.perf_counter()
+        attempt = 0
+        with span("graph.send") as attrs:
+            async with self._slots:
+                with self._lock:
+                    self.in_flight += 1
+                try:
+                    while True:
+                        response = error = None
+                        try:
+                            response = await self._http.post(self.url, headers=self._headers(), json=payload)
+                            self._count(str(response.status_code))
+                            retry = is_retryable(response.status_code)
+                        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                            self._count("connect_error")
+                            retry, error = True, e
+                        except httpx.HTTPError as e:
+                            self._count(type(e).__name__)
+                            retry, error = False, e
+
+                        if not retry or attempt >= self.max_retries:
+                            break
+                        await asyncio.sleep(self._backoff(attempt, response))
+                        attempt += 1
+                finally:
+                    with self._lock:
+                        self.in_flight -= 1
+
+            attrs["attempts"] = attempt + 1
+            result = self._outcome(response, error, retry)
+            self._finish(started, result.ok, attempt + 1)
+            attrs["status"] = result.status or type(error).__name__
+            return result
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
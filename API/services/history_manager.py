@@ -0,0 +1,222 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import google.generativeai as genai
+
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "12"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+CHARS_PER_TOKEN = 4
+SUMMARY_PREFIX = "[Conversation summary]"
+SUMMARY_ACK = "Noted, I'll continue from this summary."
+MAX_NOTES = 6
+MAX_ORDERS = 5
+NOTE_CHARS = 160
+REPLY_CHARS = 600
+
+
+def _content_chars(content) -> int:
+    chars = 0
+    for part in content.parts:
+        if part.text:
+            chars += len(part.text)
+        if part.function_call.name:
+            chars += len(part.function_call.name) + len(str(dict(part.function_call.args)))
+        if part.function_response.name:
+            chars += len(str(dict(part.function_response.response)))
+    return chars
+
+
+def estimate_tokens(history) -> int:
+    """Rough token count (about four characters per token)"""
+    return sum(_content_chars(content) for content in history) // CHARS_PER_TOKEN
+
+
+def _is_turn_start(content) -> bool:
+    """A turn starts with a customer text message (not a function response)"""
+    return content.role == "user" and any(part.text for part in content.parts)
+
+
+def _is_summary(content) -> bool:
+    """The summary message or the model's acknowledgement of it"""
+    return any(
+        part.text.startswith(SUMMARY_PREFIX) or part.text == SUMMARY_ACK
+        for part in content.parts
+        if part.text
+    )
+
+
+def split_turns(history) -> List[List[Any]]:
+    """Group history into turns: a customer message plus every model reply,
+    function call and function response that followed it"""
+    turns: List[List[Any]] = []
+    for content in history:
+        if _is_turn_start(content) or not turns:
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+def _plain(value):
+    """Convert proto MapComposite/RepeatedComposite values to dict/list"""
+    if hasattr(value, "items"):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (str, bytes)):
+        return value
+    if hasattr(value, "__iter__"):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class ConversationSummary:
+    """Facts carried forward from turns that were folded out of the history"""
+
+    def __init__(self):
+        self.cart: Dict[str, Any] = {}
+        self.delivery_address: Optional[str] = None
+        self.special_requests: Optional[str] = None
+        self.orders: List[str] = []
+        self.notes: List[str] = []
+        self.tool_results: Dict[str, str] = {}
+        self.last_reply: Optional[str] = None
+        self.turns_folded = 0
+
+    def fold(self, turn: List[Any]):
+        for content in turn:
+            for part in content.parts:
+                if part.function_call.name:
+                    self._fold_call(part.function_call.name, _plain(part.function_call.args))
+                elif part.function_response.name:
+                    response = _plain(part.function_response.response)
+                    result = str(response.get("result", response))
+                    # Latest result per tool is kept verbatim
+                    self.tool_results[part.function_response.name] = result
+                    if part.function_response.name == "place_order" and result.startswith("Order placed"):
+                        self.orders = (self.orders + [self._describe_cart()])[-MAX_ORDERS:]
+                elif part.text and not part.text.startswith(SUMMARY_PREFIX):
+                    if content.role == "user":
+                        self.notes = (self.notes + [_clip(part.text, NOTE_CHARS)])[-MAX_NOTES:]
+                    else:
+                        self.last_reply = _clip(part.text, REPLY_CHARS)
+        self.turns_folded += 1
+
+    def _fold_call(self, name: str, args: Dict[str, Any]):
+        if name != "place_order":
+            return
+        if args.get("items"):
+            self.cart = dict(args["items"])
+        if args.get("delivery_address"):
+            self.delivery_address = args["delivery_address"]
+        if args.get("special_requests"):
+            self.special_requests = args["special_requests"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "ConversationSummary":
+        summary = cls()
+        for key, value in state.items():
+            if hasattr(summary, key):
+                setattr(summary, key, value)
+        return summary
+
+    def _describe_cart(self) -> str:
+        return ", ".join(f"{name} x{qty}" for name, qty in self.cart.items())
+
+    def render(self) -> str:
+        lines = [
+            SUMMARY_PREFIX,
+            f"Earlier part of this conversation ({self.turns_folded} turns), condensed:",
+        ]
+        if self.cart:
+            lines.append(f"- Last order items: {self._describe_cart()}")
+        if self.delivery_address:
+            lines.append(f"- Delivery address: {self.delivery_address}")
+        if self.special_requests:
+            lines.append(f"- Preferences / special requests: {self.special_requests}")
+        if self.orders:
+            lines.append(f"- Orders placed: {'; '.join(self.orders)}")
+        if self.notes:
+            lines.append("- Customer said: " + " | ".join(self.notes))
+        if self.last_reply:
+            lines.append(f"- Your last reply: {self.last_reply}")
+        for name, result in self.tool_results.items():
+            lines.append(f"- Latest {name} result:\n{result}")
+        return "\n".join(lines)
+
+
+class HistoryManager:
+    """Keeps a chat history within a turn and token budget.
+
+    Once the history exceeds max_turns or max_tokens, older turns are folded
+    into a ConversationSummary that is sent as the first exchange, and only
+    the last keep_turns turns stay verbatim. Turns are never split, so
+    function calls stay paired with their responses.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = HISTORY_MAX_TURNS,
+        keep_turns: int = HISTORY_KEEP_TURNS,
+        max_tokens: int = HISTORY_MAX_TOKENS,
+    ):
+        self.max_turns = max_turns
+        self.keep_turns = max(1, min(keep_turns, max_turns))
+        self.max_tokens = max_tokens
+        self.summary = ConversationSummary()
+        self.compactions = 0
+
+    def _summary_contents(self):
+        return [
+            genai.protos.Content(role="user", parts=[genai.protos.Part(text=self.summary.render())]),
+            genai.protos.Content(role="model", parts=[genai.protos.Part(text=SUMMARY_ACK)]),
+        ]
+
+    def compact(self, history, force: bool = False) -> Optional[List[Any]]:
+        """Compacted history, or None when it is still within budget.
+
+        force folds everything but the last keep_turns turns even when the
+        history is within budget (used once a session nears its token budget).
+        """
+        history = [content for content in history if not _is_summary(content)]
+        turns = split_turns(history)
+        within_budget = len(turns) <= self.max_turns and estimate_tokens(history) <= self.max_tokens
+        if within_budget and not (force and len(turns) > self.keep_turns):
+            return None
+
+        keep = self.keep_turns
+        while keep > 1 and estimate_tokens(
+            [content for turn in turns[-keep:] for content in turn]
+        ) > self.max_tokens:
+            keep -= 1
+        if keep >= len(turns):
+            # A single oversized turn; nothing older to fold
+            return None
+
+        for turn in turns[:-keep]:
+            self.summary.fold(turn)
+        self.compactions += 1
+
+        kept = [content for turn in turns[-keep:] for content in turn]
+        return self._summary_contents() + kept
+
+    def state(self) -> Dict[str, Any]:
+        """What a hibernated session needs to keep compacting where it left off"""
+        return {"summary": self.summary.to_dict(), "compactions": self.compactions}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.summary = ConversationSummary.from_dict(state.get("summary", {}))
+        self.compactions = state.get("compactions", 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "compactions": self.compactions,
+            "turns_folded": self.summary.turns_folded,
+        }
@@ -0,0 +1,280 @@
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .day_service import DayService
+from .supabase_service import ACTIVE_ORDER_STATUSES
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+INTENT_MIN_MARGIN = 0.3
+INTENT_MAX_WORDS = 12
+NEGATIVE_PENALTY = 0.6
+LONG_MESSAGE_PENALTY = 0.3
+MENU_LINK = "https://ritaj-restaurant.vercel.app/"
+# Active orders described in a fast-path status reply
+STATUS_REPLY_MAX_ORDERS = 3
+
+# Per-language rules: intent -> [(pattern, weight)]. Weights of matching
+# patterns add up (capped at 1.0); strong phrases clear the threshold on
+# their own, loose keywords only count together. Strong phrases are
+# anchored to the whole message (greetings and "please" aside): anything
+# else in it, an item, a price, a second clause, needs the model.
+_HI = r"^\W*((hi|hello|hey|salam)\W+)?(please\s+|pls\s+)?"
+_END = r"(\s+(please|pls|thanks|thank you))?\W*$"
+
+INTENT_RULES: Dict[str, Dict[str, List[Tuple[str, float]]]] = {
+    "en": {
+        "order_status": [
+            (_HI + r"where('?s| is| are)? my (order|food|delivery)( now)?" + _END, 0.9),
+            (_HI + r"(my )?(order|delivery) status" + _END, 0.9),
+            (_HI + r"((can|could) you\s+)?(please\s+)?(track|check|status of) (on )?(my )?(order|delivery)" + _END, 0.9),
+            (r"\bmy (recent |last )?orders?\b", 0.4),
+            (r"\b(status|track|where)\b", 0.3),
+        ],
+        "menu": [
+            (_HI + r"(the )?menu" + _END, 1.0),
+            (
+                _HI + r"((can|could|may) (i|we|you)\s+)?(please\s+)?(send|share|show|see|have|get|view)"
+                r"( me| us)?( the| your| ur)? menu( link)?" + _END,
+                0.9,
+            ),
+            (_HI + r"(the )?menu (please|pls|link)" + _END, 0.9),
+            (_HI + r"what do you (have|serve|sell)" + _END, 0.8),
+            (r"\bmenu\b", 0.4),
+        ],
+        "today_specials": [
+            (_HI + r"((what|which)( are| is|'?s)?( the| your)? |any )?(today'?s?|daily|day'?s?) specials?( today)?" + _END, 0.9),
+            (
+                _HI + r"((what|which)( are| is|'?s)?( the| your)? |any )?specials?( do you have| are there)?"
+                r"( for)? (today|tonight)" + _END,
+                0.9,
+            ),
+            (_HI + r"what day is (it|today)( today)?" + _END, 0.9),
+            (r"\bspecials?\b", 0.4),
+            (r"\btoday\b", 0.2),
+        ],
+    },
+    "ar": {
+        "order_status": [
+            (r"^\W*(وين|أين|اين) (طلبي|طلبيتي|الطلب)\W*$", 0.9),
+            (r"^\W*حالة (طلبي|الطلب)\W*$", 0.9),
+            (r"^\W*(تتبع|متابعة) (طلبي|الطلب)\W*$", 0.9),
+            (r"طلبي", 0.4),
+        ],
+        "menu": [
+            (r"^\W*(المنيو|القائمة|المينيو)\W*$", 1.0),
+            (r"^\W*(أرسل|ارسل|ابغى|أبغى|ابي|أبي|شوف|عرض)( لي| لنا)? (المنيو|القائمة|المينيو)\W*$", 0.9),
+            (r"(المنيو|القائمة|المينيو)", 0.4),
+        ],
+        "today_specials": [
+            (r"^\W*((ايش|إيش|شو|ما) (هي )?)?(عروض|طبق|أطباق|اطباق|عرض) اليوم\W*$", 0.9),
+            (r"^\W*(ايش|إيش|شو|ما) (هو )?اليوم\W*$", 0.8),
+            (r"اليوم", 0.2),
+        ],
+    },
+}
+
+# Anything that changes an order or complains needs the model
+NEGATIVE_RULES: Dict[str, List[str]] = {
+    "en": [
+        r"\b(cancel|change|modify|update|add|remove|instead|wrong|missing|complain|refund|late|cold)\b",
+        r"\b(i want|i'd like|i would like|can i (get|have|order)|order (a|an|some|\d))\b",
+        r"\b\d+\s*x?\s+[a-z]",
+    ],
+    "ar": [
+        r"(إلغاء|الغاء|الغي|ألغي|تغيير|غير|أضف|اضف|إضافة|اضافة|شيل|متأخر|تأخر)",
+        r"(ابغى|أبغى|ابي|أبي|اريد|أريد) (اطلب|أطلب)",
+    ],
+}
+
+RESPONSES: Dict[str, Dict[str, str]] = {
+    "en": {
+        "menu": f"Here's our complete menu: {MENU_LINK}\nJust tell me what you'd like to order!",
+        "specials": "Today is {day}. Today's specials: {items}.",
+        "no_specials": "Today is {day}. There are no day specials today, but our full menu is available: " + MENU_LINK,
+        "order_status": "Your order of {items} {state}.",
+        "no_active_orders": "You have no orders in progress right now. Just tell me what you'd like to order!",
+        "PREPARING": "is being prepared",
+        "ON_ROUTE": "is on its way to you",
+        "items_fallback": "your items",
+    },
+    "ar": {
+        "menu": f"هذه قائمتنا الكاملة: {MENU_LINK}\nأخبرني ماذا تريد أن تطلب!",
+        "specials": "اليوم {day}. أطباق اليوم: {items}.",
+        "no_specials": "اليوم {day}. لا توجد أطباق خاصة اليوم، لكن قائمتنا الكاملة متاحة: " + MENU_LINK,
+        "order_status": "طلبك ({items}) {state}.",
+        "no_active_orders": "لا توجد لديك طلبات قيد التنفيذ حالياً. أخبرني ماذا تريد أن تطلب!",
+        "PREPARING": "قيد التحضير",
+        "ON_ROUTE": "في الطريق إليك",
+        "items_fallback": "طلبك",
+    },
+}
+
+_ARABIC = re.compile(r"[؀-ۿ]")
+
+
+def detect_language(text: str) -> str:
+    return "ar" if _ARABIC.search(text) else "en"
+
+
+class IntentMatch:
+    def __init__(self, intent: Optional[str], confidence: float, language: str):
+        self.intent = intent
+        self.confidence = confidence
+        self.language = language
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, {self.confidence:.2f}, {self.language!r})"
+
+
+class IntentRouter:
+    """Answers simple messages from local data instead of a Gemini round trip.
+
+    Messages are scored against the rule table for their language; only an
+    intent that clears the confidence threshold by a clear margin is
+    answered here, everything else goes to the LLM.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, Dict[str, List[Tuple[str, float]]]] = INTENT_RULES,
+        negative_rules: Dict[str, List[str]] = NEGATIVE_RULES,
+        threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+        enabled: bool = INTENT_ROUTER_ENABLED,
+    ):
+        self.threshold = threshold
+        self.enabled = enabled
+        self._rules = {
+            language: {
+                intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+                for intent, patterns in intents.items()
+            }
+            for language, intents in rules.items()
+        }
+        self._negative = {
+            language: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for language, patterns in negative_rules.items()
+        }
+
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.routed: Dict[str, int] = {}
+        self.fast_path_ms = 0.0
+        self.llm_turns = 0
+        self.llm_ms = 0.0
+
+    def classify(self, text: str) -> IntentMatch:
+        language = detect_language(text)
+        rules = self._rules.get(language, self._rules["en"])
+        text = text.strip()
+
+        scores = []
+        for intent, patterns in rules.items():
+            score = sum(weight for pattern, weight in patterns if pattern.search(text))
+            scores.append((min(1.0, score), intent))
+        scores.sort(reverse=True)
+        (best, intent), (runner_up, _) = scores[0], scores[1]
+
+        penalty = 0.0
+        if any(pattern.search(text) for pattern in self._negative.get(language, [])):
+            penalty += NEGATIVE_PENALTY
+        if len(text.split()) > INTENT_MAX_WORDS:
+            penalty += LONG_MESSAGE_PENALTY
+
+        confidence = max(0.0, best - penalty)
+        if best - runner_up < INTENT_MIN_MARGIN:
+            confidence = min(confidence, best - INTENT_MIN_MARGIN)
+        return IntentMatch(intent if best > 0 else None, max(0.0, confidence), language)
+
+    def route(self, text: str, tool_handler) -> Optional[str]:
+        """Reply for a confidently recognised intent, or None to use the LLM"""
+        with self._lock:
+            self.messages += 1
+        if not self.enabled or not text:
+            return None
+
+        start = time.perf_counter()
+        match = self.classify(text)
+        if match.intent is None or match.confidence < self.threshold:
+            return None
+
+        try:
+            reply = self._answer(match, tool_handler)
+        except Exception as e:
+            print(f"Intent fast path failed, using LLM: {e}")
+            return None
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.routed[match.intent] = self.routed.get(match.intent, 0) + 1
+            self.fast_path_ms += elapsed
+        print(f"[Fast path: {match.intent} ({match.confidence:.2f})]")
+        return reply
+
+    def _answer(self, match: IntentMatch, tool_handler) -> str:
+        responses = RESPONSES[match.language]
+        if match.intent == "order_status":
+            return self._order_status(responses, tool_handler)
+        if match.intent == "menu":
+            return responses["menu"]
+
+        now = DayService.now()
+        day = now.strftime("%A")
+        catalog = tool_handler.db_service.get_menu_catalog()
+        specials = []
+        if catalog is not None:
+            specials = [
+                catalog.name_for(item_id)
+                for item_id in catalog.availability.day_specials(now.weekday())
+            ]
+        if not specials:
+            return responses["no_specials"].format(day=day)
+        return responses["specials"].format(day=day, items=", ".join(specials))
+
+    @staticmethod
+    def _order_status(responses: Dict[str, str], tool_handler) -> str:
+        """Customer's in-progress orders in their language: items and where
+        the order is, no ids or raw status codes"""
+        orders = tool_handler.db_service.get_order_status(
+            tool_handler.phone_number, limit=STATUS_REPLY_MAX_ORDERS, statuses=ACTIVE_ORDER_STATUSES
+        )
+        if not orders:
+            return responses["no_active_orders"]
+        lines = []
+        for order in orders:
+            items = ", ".join(
+                name if quantity == 1 else f"{name} x{quantity}"
+                for name, quantity in (order.get("items") or {}).items()
+            )
+            lines.append(responses["order_status"].format(
+                items=items or responses["items_fallback"], state=responses[order["status"]]
+            ))
+        return "\n".join(lines)
+
+    def record_llm_turn(self, elapsed_ms: float):
+        with self._lock:
+            self.llm_turns += 1
+            self.llm_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = sum(self.routed.values())
+            llm_avg = self.llm_ms / self.llm_turns if self.llm_turns else None
+            fast_avg = self.fast_path_ms / routed if routed else None
+            saved = (llm_avg - fast_avg) * routed if llm_avg is not None and fast_avg is not None else None
+            return {
+                "enabled": self.enabled,
+                "messages": self.messages,
+                "skipped_llm": routed,
+                "skipped_fraction": round(routed / self.messages, 3) if self.messages else 0.0,
+                "by_intent": dict(self.routed),
+                "fast_path_avg_ms": round(fast_avg, 2) if fast_avg is not None else None,
+                "llm_turn_avg_ms": round(llm_avg, 1) if llm_avg is not None else None,
+                "estimated_saved_ms": round(saved) if saved is not None else None,
+            }
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,128 @@
+import glob
+import json
+import os
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so one process per journal
+    fcntl = None
+
+
+def _lock(f: IO) -> bool:
+    """Take an exclusive lock without waiting; False when another process holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _read(f: IO) -> List[Dict[str, Any]]:
+    f.seek(0)
+    records = []
+    for line in f:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # Torn final line from a crash mid-write
+            continue
+    return records
+
+
+class ProcessJournal:
+    """Append-only JSON-lines journal written by one process.
+
+    Worker processes share a journal path, so each writes its own file,
+    <path>.<owner> (the pid by default), and holds an exclusive flock on it
+    while it runs. open() also adopts the files of processes that are gone
+    (nobody holds their lock) and the plain <path> file older versions
+    wrote; files of live workers are left alone, so nothing is replayed
+    twice or truncated by another process.
+    """
+
+    def __init__(self, path: str, fsync: bool = False, owner: Optional[str] = None):
+        self.base_path = path
+        self.owner = owner or str(os.getpid())
+        self.path = f"{path}.{self.owner}"
+        self.fsync = fsync
+        self._file: Optional[IO] = None
+        self._adopted: List[Tuple[str, IO]] = []
+
+    def _siblings(self) -> List[str]:
+        prefix = self.base_path + "."
+        paths = [self.base_path] if os.path.exists(self.base_path) else []
+        for path in sorted(glob.glob(glob.escape(self.base_path) + ".*")):
+            suffix = path[len(prefix):]
+            if path != self.path and suffix.isdigit():
+                paths.append(path)
+        return paths
+
+    def open(self) -> List[Dict[str, Any]]:
+        """Lock this process's file and return the records left in it and in
+        the adopted files, oldest file first. Call rewrite() next."""
+        directory = os.path.dirname(self.base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(self.path, "a+", encoding="utf-8")
+        if not _lock(self._file):
+            self._file.close()
+            self._file = None
+            raise RuntimeError(f"Journal {self.path} is in use by another writer")
+        records = []
+        for path in self._siblings():
+            try:
+                f = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            if not _lock(f):
+                # A live worker's journal
+                f.close()
+                continue
+            records.extend(_read(f))
+            self._adopted.append((path, f))
+        records.extend(_read(self._file))
+        return records
+
+    def rewrite(self, records: List[Dict[str, Any]]):
+        """Replace this process's file with `records` (what is still
+        pending), then delete the adopted files"""
+        self._file.seek(0)
+        self._file.truncate()
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._flush()
+        for path, f in self._adopted:
+            os.remove(path)
+            f.close()
+        self._adopted = []
+
+    def _flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, record: Dict[str, Any]):
+        if self._file is None:
+            # Closed mid-write: the record's entry stays pending for the next start
+            return
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._flush()
+
+    def truncate(self):
+        """Empty this process's file once everything in it is settled"""
+        if self._file is not None:
+            self._file.truncate(0)
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def close(self):
+        if self._file is not None:
+            # Closing the file releases the lock
+            self._file.close()
+            self._file = None
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+from google.generativeai.types import content_types
+
+from .history_manager import CHARS_PER_TOKEN, estimate_tokens
+
+load_dotenv()
+
+# "gemini" (default) or "fake" for offline load tests
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-2.5-flash"
+# "fixed:<ms>", "uniform:<min_ms>:<max_ms>" or "lognormal:<median_ms>:<p95_ms>"
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "lognormal:700:1800")
+LLM_FAKE_CHARS_PER_SECOND = float(os.getenv("LLM_FAKE_CHARS_PER_SECOND", "600"))
+LLM_FAKE_SCRIPT = os.getenv("LLM_FAKE_SCRIPT")
+FAKE_STREAM_CHUNK_CHARS = 24
+
+
+class LLMBackend:
+    """Builds the chat model used by LLMService.
+
+    build_model() returns an object with start_chat(history=None); the chat
+    session exposes send_message / send_message_async (both accepting
+    stream=True) and a settable history of genai.protos.Content, the same
+    surface as google.generativeai.
+    """
+
+    name = "base"
+
+    def build_model(self, system_prompt: str, tools):
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = GEMINI_API_KEY, model_name: str = GEMINI_MODEL):
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found")
+        self.model_name = model_name
+        genai.configure(api_key=api_key)
+
+    def build_model(self, system_prompt: str, tools):
+        return genai.GenerativeModel(
+            model_name=self.model_name,
+            system_instruction=system_prompt,
+            tools=tools,
+        )
+
+
+class LatencyModel:
+    """Samples simulated model latency in seconds"""
+
+    def __init__(self, spec: str = LLM_FAKE_LATENCY, seed: Optional[int] = None):
+        self.spec = spec
+        kind, *values = spec.split(":")
+        self.kind = kind
+        self.values = [float(v) / 1000 for v in values]
+        self._random = random.Random(seed)
+        if kind == "lognormal":
+            median, p95 = self.values
+            self._mu = math.log(median)
+            # 1.645 standard deviations separate the median from the p95
+            self._sigma = math.log(p95 / median) / 1.645
+        elif kind not in ("fixed", "uniform"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.values[0]
+        if self.kind == "uniform":
+            return self._random.uniform(*self.values)
+        return self._random.lognormvariate(self._mu, self._sigma)
+
+
+# Each rule matches the customer's message and scripts the model's turn:
+# zero or more rounds of tool calls (calls in one round are issued together),
+# then a final text reply.
+DEFAULT_SCRIPT = [
+    {
+        "match": r"\b(where|status|track)\b",
+        "rounds": [[{"name": "get_order_status", "args": {}}]],
+        "reply": "Here's the latest on your orders. Anything else I can help with?",
+    },
+    {
+        "match": r"\b(special|today)\b",
+        "rounds": [[{"name": "get_current_day", "args": {}}, {"name": "get_order_status", "args": {}}]],
+        "reply": "Today's specials are on the menu above. Would you like to order one?",
+    },
+    {
+        "match": r"\b(yes|confirm)\b",
+        "rounds": [[{
+            "name": "place_order",
+            "args": {"items": {"French Fries": 1, "Karak Tea": 2}, "delivery_address": "Marina Walk, Dubai"},
+        }]],
+        "reply": "Your order has been placed successfully! We'll keep you updated on WhatsApp.",
+    },
+    {
+        "match": r".",
+        "rounds": [],
+        "reply": (
+            "Let me confirm your order:\n- French Fries x1 - $12\n- Karak Tea x2 - $10\n"
+            "Total: $22\nDelivery to: Marina Walk, Dubai\n\nWould you like to confirm this order?"
+        ),
+    },
+]
+
+
+def load_script(path: Optional[str] = LLM_FAKE_SCRIPT) -> List[Dict[str, Any]]:
+    """Tool-call script from a JSON file in the DEFAULT_SCRIPT format"""
+    if not path:
+        return DEFAULT_SCRIPT
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _Candidate:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeResponse:
+    """Minimal GenerateContentResponse: candidates[0].content and
+    usage_metadata, iterable when streamed"""
+
+    def __init__(self, content, chunks=None, chunk_delay: float = 0.0, usage_metadata=None):
+        self.candidates = [_Candidate(content)]
+        self.usage_metadata = usage_metadata
+        self._chunks = chunks or [content]
+        self._chunk_delay = chunk_delay
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield FakeResponse(chunk)
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            if self._chunk_delay:
+                await asyncio.sleep(self._chunk_delay)
+            yield FakeResponse(chunk)
+
+
+class FakeChatSession:
+    def __init__(self, model: "FakeModel", history=None):
+        self.model = model
+        self._history = list(history or [])
+        self._pending_rounds: List[List[Dict[str, Any]]] = []
+        self._reply = ""
+
+    @property
+    def history(self):
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        self._history = content_types.to_contents(history)
+
+    def _next_turn(self, content):
+        """Reply content for the message, following the script"""
+        text = "".join(part.text for part in content.parts if part.text)
+        if text:
+            for rule in self.model.script:
+                if re.search(rule["match"], text, re.IGNORECASE):
+                    self._pending_rounds = [list(calls) for calls in rule.get("rounds", [])]
+                    self._reply = rule.get("reply", "")
+                    break
+
+        if self._pending_rounds:
+            calls = self._pending_rounds.pop(0)
+            parts = [
+                genai.protos.Part(
+                    function_call=genai.protos.FunctionCall(name=call["name"], args=call.get("args", {}))
+                )
+                for call in calls
+            ]
+        else:
+            parts = [genai.protos.Part(text=self._reply)]
+        return genai.protos.Content(role="model", parts=parts)
+
+    def _prepare(self, content, stream: bool):
+        content = content_types.to_content(content)
+        if not content.role:
+            content.role = "user"
+        reply = self._next_turn(content)
+        # Estimated the way HistoryManager budgets history: the system
+        # prompt and the whole history are sent on every round trip
+        prompt_tokens = len(self.model.system_prompt) // CHARS_PER_TOKEN + estimate_tokens(
+            self._history + [content]
+        )
+        output_tokens = estimate_tokens([reply])
+        usage = genai.protos.GenerateContentResponse.UsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        self._history.extend([content, reply])
+        self.model.calls += 1
+
+        text = reply.parts[0].text
+        delay = self.model.latency.sample()
+        if not stream or not text:
+            # Without streaming the whole reply is generated before returning
+            return delay + len(text) / self.model.chars_per_second, FakeResponse(reply, usage_metadata=usage)
+
+        chunks = [
+            genai.protos.Content(role="model", parts=[genai.protos.Part(text=text[i : i + FAKE_STREAM_CHUNK_CHARS])])
+            for i in range(0, len(text), FAKE_STREAM_CHUNK_CHARS)
+        ]
+        chunk_delay = FAKE_STREAM_CHUNK_CHARS / self.model.chars_per_second
+        return delay, FakeResponse(reply, chunks, chunk_delay, usage)
+
+    def send_message(self, content, stream: bool = False, **kwargs):
+        delay, response = self._prepare(content, stream)
+        time.sleep(delay)
+        return response
+
+    async def send_message_async(self, content, stream: bool = False, **kwargs):
+        delay, response = self._prepare(content, stream)
+        await asyncio.sleep(delay)
+        return response
+
+
+class FakeModel:
+    def __init__(self, system_prompt: str, latency: LatencyModel, script, chars_per_second: float):
+        self.system_prompt = system_prompt
+        self.latency = latency
+        self.script = script
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self, history)
+
+
+class FakeBackend(LLMBackend):
+    """Offline model following a tool-call script with sampled latency.
+
+    Latency is sampled per model round trip (time to first token); streamed
+    replies then arrive at chars_per_second.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        script: Optional[List[Dict[str, Any]]] = None,
+        chars_per_second: float = LLM_FAKE_CHARS_PER_SECOND,
+    ):
+        self.latency = latency or LatencyModel()
+        self.script = script if script is not None else load_script()
+        self.chars_per_second = chars_per_second
+
+    def build_model(self, system_prompt: str, tools):
+        return FakeModel(system_prompt, self.latency, self.script, self.chars_per_second)
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def build_llm_backend(kind: str = LLM_BACKEND) -> LLMBackend:
+    if kind == "gemini":
+        return GeminiBackend()
+    if kind == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM_BACKEND: {kind}")
+
+
+def get_llm_backend() -> LLMBackend:
+    """Process-wide LLM backend selected by LLM_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_llm_backend()
+    return _backend
+
+
+def set_llm_backend(backend: Optional[LLMBackend]):
+    """Swap the process-wide backend (benchmarks, local runs)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
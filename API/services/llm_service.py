@@ -1,35 +1,51 @@
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
 from .supabase_service import SupabaseService
-from .geocoding_service import GeocodingService
+from .geocoding_service import GeocodingService, geocoding_service
 from .day_service import DayService
+from .history_manager import HistoryManager
+from .intent_router import intent_router
+from .llm_backend import LLMBackend, get_llm_backend
+from .turn_trace import in_current_trace, record_span, span
+from .session_store import decode_session_state, encode_session_state
+from .token_usage import (
+    BUDGET_EXHAUSTED_REPLY,
+    SessionBudget,
+    TokenUsage,
+    token_usage,
+    usage_from_response,
+)
 
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 RESTAURANT_NAME = "Ritaj Restaurant"
 MENU_LINK = "https://ritaj-restaurant.vercel.app/"
+MAX_MODEL_ROUND_TRIPS = 5  # Prevent infinite function-calling loops
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+
+# Shared by every session so concurrent tool calls stay bounded process-wide
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
 
 
 def generate_system_prompt(menu_data: Dict[str, Any]) -> str:
-    
-    menu_text = "MENU:\n\n"
+    lines = ["MENU:", ""]
     for category, items in menu_data.items():
-        menu_text += f"{category.upper()}:\n"
+        lines.append(f"{category.upper()}:")
         for item in items:
-            menu_text += f"  - {item['name']} ${item['price']}"
-            if not item.get('is_available', True):
-                description = item.get('description')
-                if description and "Available on" in description:
-                    menu_text += f" ({description})"
-                else:
-                    menu_text += " (Not available currently)"
-            menu_text += "\n"
-        menu_text += "\n"
-    
+            line = f"  - {item['name']} ${item['price']}"
+            if item.get('schedule'):
+                line += f" ({item['schedule']})"
+            elif not item.get('is_available', True):
+                line += " (Not available currently)"
+            lines.append(line)
+        lines.append("")
+    menu_text = "\n".join(lines) + "\n"
 
-    
     return f"""You are Emma, a friendly assistant for {RESTAURANT_NAME}. Help customers browse menu, place orders, and check order status.
 
 GREETING: Always start the first conversation with: "Hello, I am Emma from {RESTAURANT_NAME}, what would you like to order today?"
@@ -168,6 +184,27 @@ class ToolHandler:
             except (ValueError, TypeError):
                 return f"Error: Invalid quantity for {item_name}: {quantity}"
 
+        # Map the model's item names onto menu names locally instead of
+        # failing the insert and sending the model around the loop again
+        resolved, unknown = self.db_service.resolve_menu_items(list(cleaned_items))
+        if unknown:
+            details = "; ".join(
+                f"'{name}'" + (f" (did you mean: {', '.join(suggestions)}?)" if suggestions else "")
+                for name, suggestions in unknown.items()
+            )
+            return f"Error: These items are not on the menu: {details}. Ask the customer which menu item they meant."
+
+        menu_items = {}
+        for item_name, quantity in cleaned_items.items():
+            menu_name = resolved[item_name]
+            menu_items[menu_name] = menu_items.get(menu_name, 0) + quantity
+        cleaned_items = menu_items
+
+        unavailable = self.db_service.get_unorderable_items(list(cleaned_items))
+        if unavailable:
+            details = "; ".join(f"{name}: {reason}" for name, reason in unavailable.items())
+            return f"Error: Some items cannot be ordered right now ({details})"
+
         # Place order using database service
         order_id = self.db_service.place_order(
             items=cleaned_items,
@@ -187,7 +224,7 @@ class ToolHandler:
         if not orders:
             return "No orders found"
 
-        result = f"Your Orders ({len(orders)}):\n\n"
+        result = f"Your Recent Orders ({len(orders)}):\n\n"
         for order in orders:
             result += f"Order #{order['order_id']} - {order['status']}\n"
             result += f"Items: {order['items']}\n"
@@ -199,162 +236,488 @@ class ToolHandler:
         return self.day_service.get_current_day()
 
 
-class LLMService:
-    def __init__(self, phone_number: str):
-        if not GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY not found")
-
-        genai.configure(api_key=GEMINI_API_KEY)
-
-        # Initialize services
-        self.db_service = SupabaseService()
-        self.geocoding_service = GeocodingService()
-        
-        # Fetch menu once at initialization
-        menu_data = self.db_service.get_menu_items()
-        system_prompt = generate_system_prompt(menu_data)
-
-        # Define tools for Gemini (removed get_menu tool)
-        tools = [
-            genai.protos.Tool(
-                function_declarations=[
-                    genai.protos.FunctionDeclaration(
-                        name="place_order",
-                        description="Places a food order for the customer. Items should be a dictionary mapping exact menu item names to their quantities as integers.",
-                        parameters=genai.protos.Schema(
-                            type=genai.protos.Type.OBJECT,
-                            properties={
-                                "items": genai.protos.Schema(
-                                    type=genai.protos.Type.OBJECT,
-                                    description="Dictionary mapping exact menu item names (strings) to quantities (integers). Example: {'French Fries': 1, 'Burger': 2}",
-                                ),
-                                "delivery_address": genai.protos.Schema(
-                                    type=genai.protos.Type.STRING,
-                                    description="Full delivery address",
-                                ),
-                                "special_requests": genai.protos.Schema(
-                                    type=genai.protos.Type.STRING,
-                                    description="Optional special instructions",
-                                ),
-                            },
-                            required=["items", "delivery_address"],
-                        ),
+def build_tools():
+    """Gemini tool declarations (get_menu is not exposed; the menu is in the prompt)"""
+    return [
+        genai.protos.Tool(
+            function_declarations=[
+                genai.protos.FunctionDeclaration(
+                    name="place_order",
+                    description="Places a food order for the customer. Items should be a dictionary mapping exact menu item names to their quantities as integers.",
+                    parameters=genai.protos.Schema(
+                        type=genai.protos.Type.OBJECT,
+                        properties={
+                            "items": genai.protos.Schema(
+                                type=genai.protos.Type.OBJECT,
+                                description="Dictionary mapping exact menu item names (strings) to quantities (integers). Example: {'French Fries': 1, 'Burger': 2}",
+                            ),
+                            "delivery_address": genai.protos.Schema(
+                                type=genai.protos.Type.STRING,
+                                description="Full delivery address",
+                            ),
+                            "special_requests": genai.protos.Schema(
+                                type=genai.protos.Type.STRING,
+                                description="Optional special instructions",
+                            ),
+                        },
+                        required=["items", "delivery_address"],
                     ),
-                    genai.protos.FunctionDeclaration(
-                        name="get_order_status",
-                        description="Gets order status for the customer",
-                        parameters=genai.protos.Schema(
-                            type=genai.protos.Type.OBJECT, properties={}
-                        ),
+                ),
+                genai.protos.FunctionDeclaration(
+                    name="get_order_status",
+                    description="Gets order status for the customer",
+                    parameters=genai.protos.Schema(
+                        type=genai.protos.Type.OBJECT, properties={}
                     ),
-                    genai.protos.FunctionDeclaration(
-                        name="get_current_day",
-                        description="Gets the current day of the week (e.g., Monday, Tuesday) to check which daily specials are available",
-                        parameters=genai.protos.Schema(
-                            type=genai.protos.Type.OBJECT, properties={}
-                        ),
+                ),
+                genai.protos.FunctionDeclaration(
+                    name="get_current_day",
+                    description="Gets the current day of the week (e.g., Monday, Tuesday) to check which daily specials are available",
+                    parameters=genai.protos.Schema(
+                        type=genai.protos.Type.OBJECT, properties={}
                     ),
-                ]
-            )
-        ]
+                ),
+            ]
+        )
+    ]
+
 
-        # Initialize model with dynamic system prompt
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            system_instruction=system_prompt,
-            tools=tools,
+class CompiledModel:
+    """System prompt and chat model compiled for one menu version"""
+
+    def __init__(
+        self, menu_version: Optional[int], system_prompt: str, model, backend: LLMBackend
+    ):
+        self.menu_version = menu_version
+        self.system_prompt = system_prompt
+        self.model = model
+        self.backend = backend
+
+
+class ModelCache:
+    """One compiled prompt and chat model shared by every chat session.
+
+    Rebuilt only when the menu catalog version (or the LLM backend) changes;
+    sessions keep just their own chat history.
+    """
+
+    def __init__(self):
+        self._compiled: Optional[CompiledModel] = None
+        self._tools = None
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    @staticmethod
+    def _is_current(compiled, version, backend) -> bool:
+        return (
+            compiled is not None
+            and compiled.menu_version == version
+            and compiled.backend is backend
         )
 
-        # Initialize tool handler
+    def get(self, db_service: SupabaseService) -> CompiledModel:
+        catalog = db_service.get_menu_catalog()
+        version = catalog.version if catalog else None
+        backend = get_llm_backend()
+
+        compiled = self._compiled
+        if self._is_current(compiled, version, backend):
+            return compiled
+
+        with self._lock:
+            compiled = self._compiled
+            if self._is_current(compiled, version, backend):
+                return compiled
+
+            system_prompt = generate_system_prompt(db_service.get_menu_items())
+            if (
+                compiled is not None
+                and compiled.backend is backend
+                and compiled.system_prompt == system_prompt
+            ):
+                # TTL refresh with an unchanged menu; keep the existing model
+                self._compiled = CompiledModel(version, system_prompt, compiled.model, backend)
+                return self._compiled
+
+            if self._tools is None:
+                self._tools = build_tools()
+
+            model = backend.build_model(system_prompt, self._tools)
+            self._compiled = CompiledModel(version, system_prompt, model, backend)
+            self.builds += 1
+            return self._compiled
+
+    def clear(self):
+        with self._lock:
+            self._compiled = None
+
+    def stats(self) -> Dict[str, Any]:
+        compiled = self._compiled
+        return {
+            "backend": compiled.backend.name if compiled else None,
+            "builds": self.builds,
+            "menu_version": compiled.menu_version if compiled else None,
+            "prompt_chars": len(compiled.system_prompt) if compiled else 0,
+        }
+
+
+model_cache = ModelCache()
+
+
+class LLMService:
+    def __init__(
+        self,
+        phone_number: str,
+        db_service: Optional[SupabaseService] = None,
+        geocoding: Optional[GeocodingService] = None,
+    ):
+        self.db_service = db_service or SupabaseService()
+        self.geocoding_service = geocoding or geocoding_service
+
+        # Shared prompt and model for the current menu version
+        compiled = model_cache.get(self.db_service)
+        self.model = compiled.model
+        self.menu_version = compiled.menu_version
+
         self.tool_handler = ToolHandler(
             phone_number, self.db_service, self.geocoding_service
         )
-        self.chat_session = self.model.start_chat(
-            enable_automatic_function_calling=True
+        self.chat_session = self._start_chat()
+        self.history = HistoryManager()
+        self.usage = TokenUsage()
+        self.budget = SessionBudget()
+
+    def hibernate(self) -> bytes:
+        """Compact serialized conversation for SessionStore: the history plus
+        compaction and token counters. The model, clients and tool handler
+        are rebuilt by restore()."""
+        return encode_session_state(self.chat_session.history, self.session_meta())
+
+    def session_meta(self) -> Dict[str, Any]:
+        """Conversation state kept alongside the history: the compaction
+        summary (cart, address, past orders) and token counters"""
+        return {
+            "history": self.history.state(),
+            "usage": self.usage.to_dict(),
+            "budget": self.budget.state(),
+        }
+
+    def load_session_meta(self, meta: Dict[str, Any]):
+        self.history.load_state(meta.get("history", {}))
+        self.usage = TokenUsage.from_dict(meta.get("usage", {}))
+        # Sessions saved before budget windows only kept the cut-off count
+        self.budget.load_state(meta.get("budget", {"cutoffs": meta.get("cutoffs", 0)}))
+
+    @classmethod
+    def restore(
+        cls, phone_number: str, state: bytes, db_service: Optional[SupabaseService] = None
+    ) -> "LLMService":
+        """Rebuild a hibernated session on the current shared model"""
+        history, meta = decode_session_state(state)
+        llm = cls(phone_number, db_service)
+        llm.chat_session = llm._start_chat(history)
+        llm.load_session_meta(meta)
+        return llm
+
+    def _start_chat(self, history=None):
+        # Tools are declarations handled by _run_tools, so the SDK's automatic
+        # function calling never applies; leaving it off allows stream=True
+        return self.model.start_chat(history=history)
+
+    def _sync_model(self):
+        """Move this session onto the current shared model, keeping history"""
+        compiled = model_cache.get(self.db_service)
+        if compiled.model is self.model:
+            self.menu_version = compiled.menu_version
+            return
+
+        self.model = compiled.model
+        self.menu_version = compiled.menu_version
+        self.chat_session = self._start_chat(self.chat_session.history)
+
+    def _begin_turn(self, user_message: str) -> Optional[str]:
+        """Sync with the shared model, then try the local intent fast path.
+
+        Returns a reply when the message was answered without the LLM; the
+        exchange is still added to the chat history so later turns see it.
+        Once the session's token budget for the current window is spent,
+        anything the fast path cannot answer gets a polite cut-off instead of
+        a model call.
+        """
+        self._sync_model()
+        with span("intent.route") as attrs:
+            reply = intent_router.route(user_message, self.tool_handler)
+            attrs["answered"] = reply is not None
+        if reply is not None:
+            self.chat_session.history = self.chat_session.history + [
+                genai.protos.Content(role="user", parts=[genai.protos.Part(text=user_message)]),
+                genai.protos.Content(role="model", parts=[genai.protos.Part(text=reply)]),
+            ]
+        elif self.budget.exhausted():
+            self.budget.cutoffs += 1
+            print(f"[Token budget spent: {self.budget.spent} tokens this window]")
+            reply = BUDGET_EXHAUSTED_REPLY
+        return reply
+
+    def _record_usage(self, response):
+        """Add the tokens reported for a model response to this session, the
+        sender and today's totals"""
+        counts = usage_from_response(response)
+        if counts is None:
+            return
+        self.usage.add(*counts)
+        self.budget.charge(counts[2])
+        token_usage.record(self.tool_handler.phone_number, *counts)
+
+    def usage_stats(self) -> Dict[str, Any]:
+        return {
+            "session": self.usage.to_dict(),
+            "budget": self.budget.to_dict(),
+        }
+
+    def _compact_history(self):
+        """Fold older turns into a summary once the history is over budget"""
+        compacted = self.history.compact(
+            self.chat_session.history, force=self.budget.should_compact()
+        )
+        if compacted is not None:
+            self.chat_session.history = compacted
+
+    @staticmethod
+    def _function_calls(response) -> List[Tuple[str, Dict[str, Any]]]:
+        """Every function call in the response as (name, args), in order"""
+        if not response.candidates or not response.candidates[0].content.parts:
+            return []
+
+        calls = []
+        for part in response.candidates[0].content.parts:
+            if hasattr(part, "function_call") and part.function_call.name:
+                func_call = part.function_call
+                tool_args = dict(func_call.args) if func_call.args else {}
+                calls.append((func_call.name, tool_args))
+        return calls
+
+    def _run_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> str:
+        print(f"[Using: {tool_name}]")
+        if tool_name == "place_order":
+            print(f"[Debug] Order data: {tool_args}")
+
+        # Execute tool
+        with span(f"tool.{tool_name}"):
+            result = self.tool_handler.execute_tool(tool_name, tool_args)
+        print(f"[Debug] Tool result: {result[:200]}...")  # Print first 200 chars
+        return result
+
+    def _run_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Run the calls concurrently on the shared executor; results keep call order"""
+        if len(calls) == 1:
+            return [self._run_tool(*calls[0])]
+        run_tool = in_current_trace(self._run_tool)
+        futures = [tool_executor.submit(run_tool, name, args) for name, args in calls]
+        return [future.result() for future in futures]
+
+    async def _arun_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        loop = asyncio.get_running_loop()
+        run_tool = in_current_trace(self._run_tool)
+        return await asyncio.gather(
+            *(loop.run_in_executor(tool_executor, run_tool, name, args) for name, args in calls)
+        )
+
+    @staticmethod
+    def _function_responses(calls: List[Tuple[str, Dict[str, Any]]], results: List[str]):
+        """One message carrying a function response for every call"""
+        return genai.protos.Content(
+            parts=[
+                genai.protos.Part(
+                    function_response=genai.protos.FunctionResponse(
+                        name=tool_name, response={"result": result}
+                    )
+                )
+                for (tool_name, _), result in zip(calls, results)
+            ]
         )
 
+    @staticmethod
+    def _response_text(response) -> str:
+        if response.candidates and response.candidates[0].content.parts:
+            for part in response.candidates[0].content.parts:
+                if hasattr(part, "text") and part.text:
+                    return part.text
+
+        return "I'm having trouble responding. Please try again."
+
     def chat(self, user_message: str) -> str:
         try:
+            fast_reply = self._begin_turn(user_message)
+            if fast_reply is not None:
+                return fast_reply
+            started = time.perf_counter()
+
             # Manual function calling approach
-            response = self.chat_session.send_message(user_message)
-
-            # Handle function calls manually
-            max_iterations = 5  # Prevent infinite loops
-            iteration = 0
-
-            while iteration < max_iterations:
-                # Check if response has function calls
-                if (
-                    not response.candidates
-                    or not response.candidates[0].content.parts
-                ):
+            with span("gemini.round_trip", round=1):
+                response = self.chat_session.send_message(user_message)
+            self._record_usage(response)
+
+            # Handle function calls manually; the cap counts model round trips
+            round_trips = 1
+
+            while round_trips < MAX_MODEL_ROUND_TRIPS:
+                calls = self._function_calls(response)
+                if not calls:
                     break
 
-                has_function_call = False
-
-                for part in response.candidates[0].content.parts:
-                    if hasattr(part, "function_call") and part.function_call.name:
-                        has_function_call = True
-                        func_call = part.function_call
-                        tool_name = func_call.name
-                        tool_args = dict(func_call.args) if func_call.args else {}
-
-                        print(f"[Using: {tool_name}]")
-                        if tool_name == "place_order":
-                            print(f"[Debug] Order data: {tool_args}")
-
-                        # Execute tool
-                        result = self.tool_handler.execute_tool(tool_name, tool_args)
-                        print(
-                            f"[Debug] Tool result: {result[:200]}..."
-                        )  # Print first 200 chars
-
-                        # Send function response back
-                        response = self.chat_session.send_message(
-                            genai.protos.Content(
-                                parts=[
-                                    genai.protos.Part(
-                                        function_response=genai.protos.FunctionResponse(
-                                            name=tool_name, response={"result": result}
-                                        )
-                                    )
-                                ]
-                            )
-                        )
-                        break  # Process one function at a time
-
-                if not has_function_call:
+                # Run every call from this turn together
+                results = self._run_tools(calls)
+
+                # Send all function responses back in one message
+                round_trips += 1
+                with span("gemini.round_trip", round=round_trips):
+                    response = self.chat_session.send_message(
+                        self._function_responses(calls, results)
+                    )
+                self._record_usage(response)
+
+            self._compact_history()
+            intent_router.record_llm_turn((time.perf_counter() - started) * 1000)
+            return self._response_text(response)
+
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def achat(self, user_message: str) -> str:
+        """chat() for the ASGI app: Gemini calls are awaited and tools run on
+        the tool executor so the event loop keeps serving other webhooks"""
+        try:
+            # May reload the menu or read orders, which are blocking calls
+            fast_reply = await asyncio.to_thread(self._begin_turn, user_message)
+            if fast_reply is not None:
+                return fast_reply
+            started = time.perf_counter()
+
+            with span("gemini.round_trip", round=1):
+                response = await self.chat_session.send_message_async(user_message)
+            self._record_usage(response)
+
+            round_trips = 1
+
+            while round_trips < MAX_MODEL_ROUND_TRIPS:
+                calls = self._function_calls(response)
+                if not calls:
                     break
 
-                iteration += 1
+                results = await self._arun_tools(calls)
 
-            # Extract text response
-            if response.candidates and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if hasattr(part, "text") and part.text:
-                        return part.text
+                round_trips += 1
+                with span("gemini.round_trip", round=round_trips):
+                    response = await self.chat_session.send_message_async(
+                        self._function_responses(calls, results)
+                    )
+                self._record_usage(response)
 
-            return "I'm having trouble responding. Please try again."
+            self._compact_history()
+            intent_router.record_llm_turn((time.perf_counter() - started) * 1000)
+            return self._response_text(response)
 
         except Exception as e:
             return f"Error: {str(e)}"
 
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        if not chunk.candidates or not chunk.candidates[0].content.parts:
+            return ""
+        return "".join(part.text for part in chunk.candidates[0].content.parts if part.text)
+
+    def chat_stream(self, user_message: str) -> Iterator[str]:
+        """chat() that yields reply text as Gemini generates it; tool calls are
+        handled between model round trips exactly as in chat()"""
+        try:
+            fast_reply = self._begin_turn(user_message)
+            if fast_reply is not None:
+                yield fast_reply
+                return
+            started = time.perf_counter()
+
+            message = user_message
+            streamed = False
+            for round_trip in range(1, MAX_MODEL_ROUND_TRIPS + 1):
+                round_started = time.perf_counter()
+                # Time the caller spends sending messages between chunks is
+                # not part of the round trip
+                paused = 0.0
+                response = self.chat_session.send_message(message, stream=True)
+                for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        streamed = True
+                        yielded = time.perf_counter()
+                        yield text
+                        paused += time.perf_counter() - yielded
+                record_span(
+                    "gemini.round_trip", round_started, time.perf_counter() - paused,
+                    round=round_trip, stream=True,
+                )
+                self._record_usage(response)
+
+                calls = self._function_calls(response)
+                if not calls or round_trip == MAX_MODEL_ROUND_TRIPS:
+                    break
+                message = self._function_responses(calls, self._run_tools(calls))
+
+            self._compact_history()
+            intent_router.record_llm_turn((time.perf_counter() - started) * 1000)
+            if not streamed:
+                yield self._response_text(response)
+
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
+    async def achat_stream(self, user_message: str) -> AsyncIterator[str]:
+        """Async counterpart of chat_stream() for the ASGI app"""
+        try:
+            fast_reply = await asyncio.to_thread(self._begin_turn, user_message)
+            if fast_reply is not None:
+                yield fast_reply
+                return
+            started = time.perf_counter()
+
+            message = user_message
+            streamed = False
+            for round_trip in range(1, MAX_MODEL_ROUND_TRIPS + 1):
+                round_started = time.perf_counter()
+                paused = 0.0
+                response = await self.chat_session.send_message_async(message, stream=True)
+                async for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        streamed = True
+                        yielded = time.perf_counter()
+                        yield text
+                        paused += time.perf_counter() - yielded
+                record_span(
+                    "gemini.round_trip", round_started, time.perf_counter() - paused,
+                    round=round_trip, stream=True,
+                )
+                self._record_usage(response)
+
+                calls = self._function_calls(response)
+                if not calls or round_trip == MAX_MODEL_ROUND_TRIPS:
+                    break
+                message = self._function_responses(calls, await self._arun_tools(calls))
+
+            self._compact_history()
+            intent_router.record_llm_turn((time.perf_counter() - started) * 1000)
+            if not streamed:
+                yield self._response_text(response)
+
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
     def reset_conversation(self):
         """Reset chat session (keeps same menu data)"""
-        self.chat_session = self.model.start_chat(
-            enable_automatic_function_calling=True
-        )
+        self.chat_session = self._start_chat()
+        self.history = HistoryManager()
     
     def refresh_menu(self):
-        """Refresh menu data and recreate model (call this when menu updates)"""
-        menu_data = self.db_service.get_menu_items()
-        system_prompt = generate_system_prompt(menu_data)
-        
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            system_instruction=system_prompt,
-            tools=self.model._tools,
-        )
-        self.chat_session = self.model.start_chat(
-            enable_automatic_function_calling=True
-        )
+        """Reload the menu and move to the rebuilt shared model (call this when menu updates)"""
+        self.db_service.invalidate_menu_cache()
+        self._sync_model()
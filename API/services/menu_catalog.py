@@ -0,0 +1,151 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .availability import AvailabilityIndex
+from .menu_resolver import MenuResolver
+
+MENU_CACHE_TTL_SECONDS = float(os.getenv("MENU_CACHE_TTL_SECONDS", "300"))
+
+
+class MenuSnapshot:
+    """Immutable view of the menu table indexed by name and item_id"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: int):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.items: List[Dict[str, Any]] = []
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self._by_lower_name: Dict[str, Dict[str, Any]] = {}
+
+        for row in rows:
+            item = dict(row)
+            self.items.append(item)
+            self.by_id[int(item["item_id"])] = item
+            self.by_name[item["name"]] = item
+            self._by_lower_name.setdefault(item["name"].strip().lower(), item)
+
+        self.availability = AvailabilityIndex(self.items)
+        self.resolver = MenuResolver(self.items)
+
+    def get_by_id(self, item_id) -> Optional[Dict[str, Any]]:
+        try:
+            return self.by_id.get(int(item_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        item = self.by_name.get(name)
+        if item is None and isinstance(name, str):
+            item = self._by_lower_name.get(name.strip().lower())
+        return item
+
+    def name_for(self, item_id) -> str:
+        item = self.get_by_id(item_id)
+        return item["name"] if item else f"Item {item_id}"
+
+
+class MenuCatalog:
+    """Process-wide menu cache refreshed by TTL or explicit invalidation"""
+
+    def __init__(self, ttl_seconds: float = MENU_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _is_fresh(self, snapshot: Optional[MenuSnapshot]) -> bool:
+        if snapshot is None:
+            return False
+        return (time.monotonic() - snapshot.loaded_at) < self.ttl_seconds
+
+    def _install(self, rows: List[Dict[str, Any]]) -> MenuSnapshot:
+        self._version += 1
+        self._snapshot = MenuSnapshot(rows or [], self._version)
+        self.refreshes += 1
+        return self._snapshot
+
+    def get(self, fetch: Callable[[], List[Dict[str, Any]]]) -> Optional[MenuSnapshot]:
+        """Return the cached snapshot, loading it through fetch() when stale"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self.hits += 1
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            try:
+                rows = fetch()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error loading menu catalog: {e}")
+                # Serve the stale copy rather than failing the request
+                return snapshot
+
+            return self._install(rows)
+
+    async def aget(
+        self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]
+    ) -> Optional[MenuSnapshot]:
+        """Async variant of get(); the snapshot is shared with sync callers"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self.hits += 1
+            return snapshot
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            try:
+                rows = await fetch()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error loading menu catalog: {e}")
+                return snapshot
+
+            with self._lock:
+                return self._install(rows)
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next lookup reloads the menu"""
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "version": snapshot.version if snapshot else None,
+            "items": len(snapshot.items) if snapshot else 0,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1)
+            if snapshot
+            else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+menu_catalog = MenuCatalog()
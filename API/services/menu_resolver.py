@@ -0,0 +1,199 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+RESOLVE_THRESHOLD = 0.75
+RESOLVE_MIN_MARGIN = 0.1
+SUGGEST_THRESHOLD = 0.35
+MAX_SUGGESTIONS = 3
+RESOLVE_CACHE_SIZE = 1024
+
+# Customer wording -> the word used on the menu
+SYNONYMS = {
+    "chips": "fries",
+    "shake": "milkshake",
+    "shakes": "milkshake",
+    "coke": "cola",
+    "pepsi": "cola",
+    "chai": "tea",
+    "shwarma": "shawarma",
+    "shawerma": "shawarma",
+    "burgers": "burger",
+}
+STOPWORDS = {"a", "an", "the", "of", "with", "and", "please", "pls", "some", "one", "x"}
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokens(text: str) -> List[str]:
+    result = []
+    for token in _TOKEN.findall(text.lower()):
+        token = SYNONYMS.get(token, token)
+        if token not in STOPWORDS and not token.isdigit():
+            result.append(_stem(token))
+    return result
+
+
+def bigrams(token: str) -> Set[str]:
+    return {token[i : i + 2] for i in range(len(token) - 1)}
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int = 2) -> int:
+    """Edit distance counting a swap of adjacent letters as one edit, giving
+    up early once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _token_matches(query_token: str, item_token: str) -> bool:
+    if query_token == item_token:
+        return True
+    # One typo allowed in short words, two in longer ones
+    limit = 1 if len(item_token) < 7 else 2
+    return len(item_token) >= 4 and edit_distance(query_token, item_token, limit) <= limit
+
+
+class Resolution:
+    def __init__(self, query: str, item: Optional[Dict[str, Any]], score: float, candidates: List[str]):
+        self.query = query
+        self.item = item
+        self.score = score
+        self.candidates = candidates
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.item["name"] if self.item else None
+
+    def __repr__(self):
+        return f"Resolution({self.query!r} -> {self.name!r}, {self.score:.2f}, {self.candidates})"
+
+
+class MenuResolver:
+    """Fuzzy menu-name lookup built once per menu snapshot.
+
+    Exact and alias matches resolve directly; otherwise candidates found
+    through a trigram index are scored on token overlap (allowing typos)
+    and trigram similarity. A clear winner resolves, close calls return
+    suggestions instead.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self._entries: List[Tuple[Dict[str, Any], Set[str], Set[str]]] = []
+        self._exact: Dict[str, Dict[str, Any]] = {}
+        self._trigram_index: Dict[str, Set[int]] = {}
+        # menu word bigram -> menu words, to limit edit-distance checks
+        self._bigram_index: Dict[str, Set[str]] = {}
+        self._cache: Dict[str, Resolution] = {}
+
+        for item in items:
+            names = [item["name"]]
+            aliases = item.get("aliases") or []
+            if isinstance(aliases, str):
+                aliases = aliases.split(",")
+            names.extend(alias.strip() for alias in aliases if alias.strip())
+
+            for name in names:
+                name_tokens = tokens(name)
+                normalized = " ".join(name_tokens)
+                # "cheeseburger" should find "Cheese Burger" too
+                self._exact.setdefault(normalized, item)
+                self._exact.setdefault(normalized.replace(" ", ""), item)
+
+                grams = trigrams(normalized)
+                index = len(self._entries)
+                self._entries.append((item, set(name_tokens), grams))
+                for token in name_tokens:
+                    for gram in bigrams(token):
+                        self._bigram_index.setdefault(gram, set()).add(token)
+                for gram in grams:
+                    self._trigram_index.setdefault(gram, set()).add(index)
+
+    @staticmethod
+    def _score(query_tokens, token_matches, matched_any, query_grams, entry) -> float:
+        _, item_tokens, item_grams = entry
+        if not query_tokens or not item_tokens:
+            return 0.0
+        matched_query = sum(1 for q in query_tokens if token_matches[q] & item_tokens)
+        matched_item = len(item_tokens & matched_any)
+        containment = matched_query / len(query_tokens)
+        coverage = matched_item / len(item_tokens)
+        dice = 2 * len(query_grams & item_grams) / (len(query_grams) + len(item_grams))
+        return 0.6 * containment + 0.2 * coverage + 0.2 * dice
+
+    def _similar_tokens(self, query_token: str) -> Set[str]:
+        """Menu words this query word could be, typos included. Within the
+        allowed edits a word always keeps at least one bigram."""
+        nearby: Set[str] = {query_token}
+        for gram in bigrams(query_token):
+            nearby |= self._bigram_index.get(gram, set())
+        return {token for token in nearby if _token_matches(query_token, token)}
+
+    def resolve(self, query: str) -> Resolution:
+        cached = self._cache.get(query)
+        if cached is None:
+            cached = self._resolve(query)
+            if len(self._cache) >= RESOLVE_CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[query] = cached
+        return cached
+
+    def _resolve(self, query: str) -> Resolution:
+        query_tokens = tokens(query)
+        normalized = " ".join(query_tokens)
+        item = self._exact.get(normalized) or self._exact.get(normalized.replace(" ", ""))
+        if item is not None:
+            return Resolution(query, item, 1.0, [item["name"]])
+
+        token_matches = {q: self._similar_tokens(q) for q in query_tokens}
+        matched_any = set().union(*token_matches.values())
+
+        query_grams = trigrams(normalized)
+        candidates: Set[int] = set()
+        for gram in query_grams:
+            candidates |= self._trigram_index.get(gram, set())
+
+        best: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        for index in candidates:
+            entry = self._entries[index]
+            score = self._score(query_tokens, token_matches, matched_any, query_grams, entry)
+            name = entry[0]["name"]
+            if score > best.get(name, (0.0, None))[0]:
+                best[name] = (score, entry[0])
+
+        ranked = sorted(best.values(), key=lambda pair: pair[0], reverse=True)
+        if not ranked:
+            return Resolution(query, None, 0.0, [])
+        suggestions = [
+            item["name"] for score, item in ranked[:MAX_SUGGESTIONS] if score >= SUGGEST_THRESHOLD
+        ]
+
+        top_score, top_item = ranked[0]
+        runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+        if top_score >= RESOLVE_THRESHOLD and top_score - runner_up >= RESOLVE_MIN_MARGIN:
+            return Resolution(query, top_item, top_score, suggestions)
+        return Resolution(query, None, top_score, suggestions)
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WEBHOOK_DEDUP_ENABLED = os.getenv("WEBHOOK_DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# Meta redelivers unacknowledged webhooks with backoff; ids are remembered
+# this long, and at most WEBHOOK_DEDUP_MAX_IDS of them (oldest dropped first)
+WEBHOOK_DEDUP_WINDOW_SECONDS = float(os.getenv("WEBHOOK_DEDUP_WINDOW_SECONDS", "86400"))
+WEBHOOK_DEDUP_MAX_IDS = int(os.getenv("WEBHOOK_DEDUP_MAX_IDS", "50000"))
+# Journal of seen ids so a restart still recognises redeliveries; unset
+# keeps them in memory only
+WEBHOOK_DEDUP_PATH = os.getenv("WEBHOOK_DEDUP_PATH")
+
+
+class MessageDeduplicator:
+    """Remembers WhatsApp message ids to drop webhook redeliveries.
+
+    check() records an id and reports whether it was already seen within
+    the window. Ids are kept in arrival order, so expiry and the size cap
+    both trim from the front. With a path, ids are also appended to a
+    "<unix time>\\t<id>" journal that is read back on start-up and
+    rewritten once it holds twice as many lines as the cache.
+
+    Worker processes each have their own cache, and WhatsApp may redeliver
+    to any of them. With a store (the shared session backend), ids are
+    also marked seen there, so a redelivery to another worker is caught;
+    the local cache then only saves a round trip for repeats this process
+    saw itself. If the store fails, the message is let through.
+    """
+
+    def __init__(
+        self,
+        window: float = WEBHOOK_DEDUP_WINDOW_SECONDS,
+        max_ids: int = WEBHOOK_DEDUP_MAX_IDS,
+        path: Optional[str] = WEBHOOK_DEDUP_PATH,
+        enabled: bool = WEBHOOK_DEDUP_ENABLED,
+        store=None,
+    ):
+        self.window = window
+        self.max_ids = max_ids
+        self.path = path
+        self.enabled = enabled
+        # SharedSessionBackend (mark_seen / forget_seen) or None
+        self.store = store
+
+        # message id -> unix time first seen, oldest first
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_lines = 0
+
+        self.checked = 0
+        self.duplicates = 0
+        self.expired = 0
+        self.evicted = 0
+        self.released = 0
+        self.journal_errors = 0
+        self.store_errors = 0
+
+        if self.enabled and self.path:
+            self._load()
+
+    def check(self, message_id: Optional[str]) -> bool:
+        """True when message_id was already seen (a duplicate to drop);
+        otherwise records it. Messages without an id are never duplicates."""
+        if not self.enabled or not message_id:
+            return False
+        now = time.time()
+        with self._lock:
+            self.checked += 1
+            self._expire(now)
+            if message_id in self._seen:
+                self.duplicates += 1
+                return True
+        if self.store is not None and not self._mark_shared(message_id):
+            with self._lock:
+                self.duplicates += 1
+            return True
+        with self._lock:
+            self._remember(message_id, now)
+        return False
+
+    def _mark_shared(self, message_id: str) -> bool:
+        """False when another worker already took the id in"""
+        try:
+            return self.store.mark_seen(message_id, self.window)
+        except Exception as e:
+            with self._lock:
+                self.store_errors += 1
+            print(f"Shared dedup store failed, checking {message_id} locally only: {e}")
+            return True
+
+    def release(self, message_id: Optional[str]):
+        """Forget an id whose webhook was not acknowledged, so WhatsApp's
+        redelivery of it is processed rather than dropped"""
+        if not self.enabled or not message_id:
+            return
+        with self._lock:
+            if self._seen.pop(message_id, None) is not None:
+                self.released += 1
+            # The journal entry stays; a restart within the window would
+            # treat the redelivery as a duplicate, which is the safe side
+            # for order placement
+        if self.store is not None:
+            try:
+                self.store.forget_seen(message_id)
+            except Exception as e:
+                with self._lock:
+                    self.store_errors += 1
+                print(f"Shared dedup store failed to release {message_id}: {e}")
+
+    def __contains__(self, message_id: str) -> bool:
+        with self._lock:
+            self._expire(time.time())
+            return message_id in self._seen
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._seen:
+            message_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen.popitem(last=False)
+            self.expired += 1
+
+    def _remember(self, message_id: str, now: float):
+        self._seen[message_id] = now
+        while len(self._seen) > self.max_ids:
+            self._seen.popitem(last=False)
+            self.evicted += 1
+        if self.path:
+            self._append(message_id, now)
+
+    # Journal ---------------------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            self.journal_errors += 1
+            print(f"Dedup journal read failed: {e}")
+            return
+
+        cutoff = time.time() - self.window
+        for line in lines:
+            seen_at, _, message_id = line.rstrip("\n").partition("\t")
+            try:
+                seen_at = float(seen_at)
+            except ValueError:
+                continue
+            if message_id and seen_at >= cutoff:
+                self._seen[message_id] = seen_at
+                self._seen.move_to_end(message_id)
+        while len(self._seen) > self.max_ids:
+            self._seen.popitem(last=False)
+        self._journal_lines = len(lines)
+
+    def _append(self, message_id: str, now: float):
+        try:
+            if self._journal is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._journal = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._journal.write(f"{now:.3f}\t{message_id}\n")
+            self._journal_lines += 1
+            if self._journal_lines > 2 * self.max_ids:
+                self._rewrite()
+        except OSError as e:
+            self.journal_errors += 1
+            print(f"Dedup journal write failed: {e}")
+
+    def _rewrite(self):
+        """Replace the journal with just the ids still remembered"""
+        self._journal.close()
+        self._journal = None
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            for message_id, seen_at in self._seen.items():
+                f.write(f"{seen_at:.3f}\t{message_id}\n")
+        os.replace(temp, self.path)
+        self._journal_lines = len(self._seen)
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "tracked_ids": len(self._seen),
+                "max_ids": self.max_ids,
+                "window_seconds": self.window,
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "duplicate_rate": round(self.duplicates / self.checked, 4) if self.checked else None,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "released": self.released,
+                "journal": self.path,
+                "journal_errors": self.journal_errors,
+                "shared_store": type(self.store).__name__ if self.store is not None else None,
+                "store_errors": self.store_errors,
+            }
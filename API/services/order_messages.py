@@ -0,0 +1,16 @@
+"""Customer-facing WhatsApp texts for order events"""
+
+MENU_MESSAGE = "Here's our complete menu: https://ritaj-restaurant.vercel.app/"
+
+
+def order_confirmation_message(items_text: str, total) -> str:
+    return f"Your order of {items_text} has been placed successfully! Total: {total} AED. We'll notify you when it's on the way."
+
+
+def order_status_message(status: str, items_text: str, delivery_address: str) -> str:
+    if status == 'ON_ROUTE':
+        return f"Your order of {items_text} is on route to {delivery_address}. It will arrive shortly."
+    elif status == 'DELIVERED':
+        return f"Your order of {items_text} has been delivered. Enjoy your food!"
+    else:
+        return f"Your order of {items_text} status has been updated to {status}."
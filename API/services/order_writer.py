@@ -0,0 +1,279 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .journal import ProcessJournal
+
+load_dotenv()
+
+ORDER_WRITE_BEHIND = os.getenv("ORDER_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+ORDER_FLUSH_SIZE = int(os.getenv("ORDER_FLUSH_SIZE", "25"))
+ORDER_FLUSH_INTERVAL_SECONDS = float(os.getenv("ORDER_FLUSH_INTERVAL_SECONDS", "0.5"))
+# Each worker process journals to <path>.<pid>
+ORDER_JOURNAL_PATH = os.getenv("ORDER_JOURNAL_PATH", "data/order_journal.jsonl")
+ORDER_JOURNAL_FSYNC = os.getenv("ORDER_JOURNAL_FSYNC", "true").lower() in ("1", "true", "yes")
+ORDER_MAX_BATCH_ATTEMPTS = int(os.getenv("ORDER_MAX_BATCH_ATTEMPTS", "5"))
+RESOLVED_IDS_KEPT = 10000
+PROVISIONAL_ID_PREFIX = "P-"
+
+
+def is_provisional(order_id: Any) -> bool:
+    return isinstance(order_id, str) and order_id.startswith(PROVISIONAL_ID_PREFIX)
+
+
+def _default_insert(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from .storage_backend import get_storage_backend
+
+    return get_storage_backend().insert_orders(rows)
+
+
+class OrderWriter:
+    """Write-behind pipeline for the orders table.
+
+    submit() journals the priced order to local disk and returns a
+    provisional id straight away; a background thread inserts pending orders
+    in micro-batches (ORDER_FLUSH_SIZE rows or every
+    ORDER_FLUSH_INTERVAL_SECONDS, whichever comes first).
+
+    Delivery is at-least-once: journaled orders that were not acknowledged
+    are replayed on restart, and a failed batch is retried with backoff.
+    Each worker process keeps its own journal file (see ProcessJournal), so
+    one worker never replays or truncates another's pending orders. A
+    batch that keeps failing is split so one bad row cannot block the rest;
+    rows that fail on their own are moved to a dead-letter file.
+    """
+
+    def __init__(
+        self,
+        insert_batch: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]] = _default_insert,
+        journal_path: str = ORDER_JOURNAL_PATH,
+        flush_size: int = ORDER_FLUSH_SIZE,
+        flush_interval: float = ORDER_FLUSH_INTERVAL_SECONDS,
+        fsync: bool = ORDER_JOURNAL_FSYNC,
+        max_batch_attempts: int = ORDER_MAX_BATCH_ATTEMPTS,
+    ):
+        self.insert_batch = insert_batch
+        self.journal_path = journal_path
+        self.dead_letter_path = journal_path + ".dead"
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_batch_attempts = max_batch_attempts
+
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._resolved: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Serialises batch writes between the flusher thread and flush()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._journal = ProcessJournal(journal_path, fsync)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.submitted = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_flush_ms: Optional[float] = None
+
+    # Journal -----------------------------------------------------------
+
+    def _append(self, record: Dict[str, Any]):
+        self._journal.append(record)
+
+    def _open_journal(self):
+        """Replay unacknowledged orders, then rewrite the journal compacted"""
+        for record in self._journal.open():
+            if record["op"] == "submit":
+                self._pending[record["id"]] = record["row"]
+            elif record["op"] == "done":
+                self._pending.pop(record["id"], None)
+
+        if self._pending:
+            print(f"♻️ Replaying {len(self._pending)} journaled orders")
+
+        # Rewrite with only what is still pending so the file stays small
+        self._journal.rewrite([
+            {"op": "submit", "id": provisional_id, "row": row}
+            for provisional_id, row in self._pending.items()
+        ])
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        self._open_journal()
+        self._thread = threading.Thread(
+            target=self._run, name="order-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Public API ----------------------------------------------------------
+
+    def submit(self, row: Dict[str, Any]) -> str:
+        """Journal an order row and return its provisional id"""
+        provisional_id = f"{PROVISIONAL_ID_PREFIX}{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._ensure_started()
+            self._append({"op": "submit", "id": provisional_id, "row": row})
+            self._pending[provisional_id] = row
+            self.submitted += 1
+            if len(self._pending) >= self.flush_size:
+                self._wakeup.notify()
+        return provisional_id
+
+    def resolve(self, provisional_id: str) -> Optional[int]:
+        """Real order_id once this process has written the order, else None"""
+        return self._resolved.get(provisional_id)
+
+    def pending_order(self, provisional_id: str) -> Optional[Dict[str, Any]]:
+        """The order row while it waits to be written, else None"""
+        with self._lock:
+            row = self._pending.get(provisional_id)
+            return dict(row, order_id=provisional_id) if row is not None else None
+
+    def pending_for(self, phone_number: str) -> List[Dict[str, Any]]:
+        """Orders for a customer that are accepted but not yet in the table"""
+        with self._lock:
+            return [
+                dict(row, order_id=provisional_id)
+                for provisional_id, row in self._pending.items()
+                if row.get("customer_phone_number") == phone_number
+            ]
+
+    def settle(self, provisional_ids: List[str]) -> Dict[str, Optional[int]]:
+        """Wait for any batch being written to finish, then map each
+        provisional id to its order_id, or None while it is still pending.
+        Orders that were dead-lettered are left out."""
+        with self._flush_lock, self._lock:
+            settled = {}
+            for provisional_id in provisional_ids:
+                if provisional_id in self._resolved:
+                    settled[provisional_id] = self._resolved[provisional_id]
+                elif provisional_id in self._pending:
+                    settled[provisional_id] = None
+            return settled
+
+    def flush(self):
+        """Write everything pending now (used on shutdown and in benchmarks)"""
+        while True:
+            with self._flush_lock:
+                batch = self._next_batch()
+                if not batch or not self._write(batch):
+                    return
+
+    def close(self):
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 4 + 5)
+            self.flush()
+            self._journal.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "last_flush_ms": self.last_flush_ms,
+            "flush_size": self.flush_size,
+            "flush_interval_seconds": self.flush_interval,
+        }
+
+    # Background flushing ---------------------------------------------------
+
+    def _next_batch(self):
+        with self._lock:
+            return list(self._pending.items())[: self.flush_size]
+
+    def _run(self):
+        attempts = 0
+        while True:
+            with self._lock:
+                if len(self._pending) < self.flush_size and not self._stopping:
+                    self._wakeup.wait(timeout=self.flush_interval)
+                if self._stopping:
+                    return
+
+            with self._flush_lock:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+
+                if self._write(batch):
+                    attempts = 0
+                    continue
+
+                attempts += 1
+                if attempts >= self.max_batch_attempts:
+                    self._write_individually(batch)
+                    attempts = 0
+                    continue
+
+            # Exponential backoff with jitter before retrying the batch
+            time.sleep(min(30, 0.25 * 2 ** attempts) * random.uniform(0.5, 1.5))
+
+    def _write(self, batch) -> bool:
+        start = time.perf_counter()
+        try:
+            inserted = self.insert_batch([row for _, row in batch])
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ Order batch insert failed ({len(batch)} orders): {e}")
+            return False
+
+        # Supabase returns [] when RLS hides the inserted rows; without a
+        # stored order_id for every row the batch counts as failed, so rows
+        # stay pending and go through backoff and dead-lettering
+        inserted = inserted or []
+        if len(inserted) != len(batch) or any(stored.get("order_id") is None for stored in inserted):
+            self.failures += 1
+            print(f"❌ Order batch insert stored {len(inserted)} of {len(batch)} orders")
+            return False
+
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            for (provisional_id, _), stored in zip(batch, inserted):
+                self._resolved[provisional_id] = stored.get("order_id")
+                if len(self._resolved) > RESOLVED_IDS_KEPT:
+                    # dicts keep insertion order, so this drops the oldest
+                    self._resolved.pop(next(iter(self._resolved)))
+                self._pending.pop(provisional_id, None)
+                self._append(
+                    {"op": "done", "id": provisional_id, "order_id": stored.get("order_id")}
+                )
+            self.flushed += len(batch)
+            self.batches += 1
+            if not self._pending:
+                # Everything is acknowledged; start the journal afresh
+                self._journal.truncate()
+        return True
+
+    def _write_individually(self, batch):
+        for item in batch:
+            if self._write([item]):
+                continue
+            provisional_id, row = item
+            print(f"❌ Dead-lettering order {provisional_id}")
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": provisional_id, "row": row}) + "\n")
+            with self._lock:
+                self._pending.pop(provisional_id, None)
+                self._append({"op": "done", "id": provisional_id, "order_id": None})
+                self.dead_lettered += 1
+
+
+order_writer = OrderWriter() if ORDER_WRITE_BEHIND else None
@@ -0,0 +1,403 @@
+import atexit
+import heapq
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .graph_client import GraphClient, GraphResult, text_payload
+from .journal import ProcessJournal
+from .reply_stream import percentile
+
+load_dotenv()
+
+OUTBOUND_QUEUE_ENABLED = os.getenv("OUTBOUND_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Each worker process journals to <path>.<pid>
+OUTBOUND_JOURNAL_PATH = os.getenv("OUTBOUND_JOURNAL_PATH", "data/outbound_journal.jsonl")
+OUTBOUND_JOURNAL_FSYNC = os.getenv("OUTBOUND_JOURNAL_FSYNC", "false").lower() in ("1", "true", "yes")
+# Meta's default throughput for a business number is 80 messages/second
+OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "80"))
+OUTBOUND_BURST = int(os.getenv("OUTBOUND_BURST", "20"))
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "8"))
+OUTBOUND_MAX_ATTEMPTS = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "6"))
+OUTBOUND_RETRY_BASE_SECONDS = float(os.getenv("OUTBOUND_RETRY_BASE_SECONDS", "0.5"))
+OUTBOUND_RETRY_MAX_SECONDS = float(os.getenv("OUTBOUND_RETRY_MAX_SECONDS", "30"))
+SEND_LAGS_KEPT = 1000
+
+# Lower sends first: order confirmations and status updates, then chat replies
+TRANSACTIONAL = "transactional"
+CHAT = "chat"
+PRIORITIES = {TRANSACTIONAL: 0, CHAT: 1}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, `burst` at once.
+
+    pause() empties the bucket for a while, e.g. after Meta answers 429.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    if waited:
+                        self.throttled += 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            waited = True
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return round(self._tokens, 2)
+
+
+class OutboundMessage:
+    def __init__(self, message_id: str, to: str, text: str, priority: str, enqueued_at: float, seq: int):
+        self.message_id = message_id
+        self.to = to
+        self.text = text
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.seq = seq
+        self.attempts = 0
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "op": "enqueue",
+            "id": self.message_id,
+            "to": self.to,
+            "text": self.text,
+            "priority": self.priority,
+            "at": self.enqueued_at,
+        }
+
+
+class OutboundQueue:
+    """Durable, prioritized, rate-limited queue in front of the Graph API.
+
+    enqueue() journals the message to local disk and returns straight
+    away; worker threads send in priority order (transactional before
+    chat, oldest first) at no more than the token bucket's rate. Messages
+    to one recipient are sent one at a time and in order, so a retry never
+    lets a later message overtake an earlier one.
+
+    Delivery is at-least-once across restarts: journaled messages that
+    were not sent are replayed. Each worker process keeps its own journal
+    file (see ProcessJournal), so workers never resend or drop each
+    other's messages. 429 and 5xx responses are retried with
+    backoff (a 429 also pauses the bucket); a message that keeps failing,
+    or that Meta rejects outright, goes to a dead-letter file.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[Dict[str, Any]], GraphResult],
+        journal_path: str = OUTBOUND_JOURNAL_PATH,
+        rate: float = OUTBOUND_RATE_PER_SECOND,
+        burst: int = OUTBOUND_BURST,
+        workers: int = OUTBOUND_WORKERS,
+        max_attempts: int = OUTBOUND_MAX_ATTEMPTS,
+        retry_base: float = OUTBOUND_RETRY_BASE_SECONDS,
+        retry_max: float = OUTBOUND_RETRY_MAX_SECONDS,
+        fsync: bool = OUTBOUND_JOURNAL_FSYNC,
+    ):
+        self.deliver = deliver
+        self.journal_path = journal_path
+        self.dead_letter_path = journal_path + ".dead"
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.fsync = fsync
+
+        # Per-recipient FIFOs; a recipient is "ready" (in the heap, keyed by
+        # its head message) unless a worker is sending to it or it waits to
+        # retry
+        self._queues: Dict[str, Deque[OutboundMessage]] = {}
+        self._ready: List[Tuple[int, int, str]] = []
+        self._retrying: List[Tuple[float, str]] = []
+        self._sending: set = set()
+        self._depth = {priority: 0 for priority in PRIORITIES}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._journal = ProcessJournal(journal_path, fsync)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._lags = {priority: deque(maxlen=SEND_LAGS_KEPT) for priority in PRIORITIES}
+
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.replayed = 0
+
+    # Journal ---------------------------------------------------------------
+
+    def _append(self, record: Dict[str, Any]):
+        # Closed mid-send: the message stays journaled for the next start
+        self._journal.append(record)
+
+    def _open_journal(self):
+        """Replay unsent messages, then rewrite the journal compacted"""
+        pending: Dict[str, Dict[str, Any]] = {}
+        for record in self._journal.open():
+            if record["op"] == "enqueue":
+                pending[record["id"]] = record
+            elif record["op"] == "done":
+                pending.pop(record["id"], None)
+        self._journal.rewrite(list(pending.values()))
+
+        if pending:
+            print(f"♻️ Replaying {len(pending)} journaled outbound messages")
+        for record in pending.values():
+            self._push(OutboundMessage(
+                record["id"], record["to"], record["text"],
+                record.get("priority", CHAT), record.get("at", time.time()), self._next_seq(),
+            ))
+            self.replayed += 1
+
+    def start(self):
+        """Replay the journal and start the sending threads"""
+        with self._lock:
+            if self._threads:
+                return
+            self._open_journal()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"outbound-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.close)
+
+    # Public API --------------------------------------------------------------
+
+    def enqueue(self, to: str, text: str, priority: str = CHAT) -> str:
+        """Journal a message for sending and return its queue id"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown outbound priority: {priority}")
+        self.start()
+        message_id = f"O-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            message = OutboundMessage(message_id, to, text, priority, time.time(), self._next_seq())
+            self._append(message.record())
+            self._push(message)
+            self.enqueued += 1
+            self._wakeup.notify()
+        return message_id
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message has been sent or dead-lettered"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while self._queues:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Send what can be sent within the timeout, then stop; anything
+        left stays in the journal for the next start"""
+        self.join(timeout)
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        with self._lock:
+            self._journal.close()
+
+    def use_graph_url(self, url: str, access_token: Optional[str]):
+        self.deliver = graph_sender(url, access_token).deliver
+
+    def depth(self) -> int:
+        return sum(self._depth.values())
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            oldest = {priority: None for priority in PRIORITIES}
+            for queue in self._queues.values():
+                for message in queue:
+                    age = now - message.enqueued_at
+                    if oldest[message.priority] is None or age > oldest[message.priority]:
+                        oldest[message.priority] = age
+            lags = {priority: list(values) for priority, values in self._lags.items()}
+            return {
+                "enabled": True,
+                "depth": dict(self._depth),
+                "recipients": len(self._queues),
+                "retrying": len(self._retrying),
+                "oldest_age_seconds": {
+                    priority: round(age, 3) if age is not None else None
+                    for priority, age in oldest.items()
+                },
+                "send_lag_ms": {
+                    priority: {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+                    for priority, values in lags.items()
+                },
+                "enqueued": self.enqueued,
+                "sent": self.sent,
+                "retried": self.retried,
+                "dead_lettered": self.dead_lettered,
+                "replayed": self.replayed,
+                "rate_per_second": self.bucket.rate,
+                "burst": self.bucket.burst,
+                "tokens": self.bucket.tokens(),
+                "throttled": self.bucket.throttled,
+            }
+
+    # Scheduling (lock held) ----------------------------------------------------
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _push(self, message: OutboundMessage):
+        queue = self._queues.get(message.to)
+        if queue is None:
+            queue = self._queues[message.to] = deque()
+        queue.append(message)
+        self._depth[message.priority] += 1
+        if len(queue) == 1 and message.to not in self._sending:
+            self._make_ready(message.to)
+
+    def _make_ready(self, to: str):
+        head = self._queues[to][0]
+        heapq.heappush(self._ready, (PRIORITIES[head.priority], head.seq, to))
+
+    def _release_retries(self, now: float):
+        while self._retrying and self._retrying[0][0] <= now:
+            _, to = heapq.heappop(self._retrying)
+            self._make_ready(to)
+
+    def _pop_head(self, to: str) -> OutboundMessage:
+        queue = self._queues[to]
+        message = queue.popleft()
+        self._depth[message.priority] -= 1
+        if queue:
+            self._make_ready(to)
+        else:
+            del self._queues[to]
+            if not self._queues:
+                self._idle.notify_all()
+        return message
+
+    # Sending -------------------------------------------------------------------
+
+    def _next(self) -> Optional[OutboundMessage]:
+        with self._lock:
+            while True:
+                if self._stopping:
+                    return None
+                self._release_retries(time.monotonic())
+                if self._ready:
+                    _, _, to = heapq.heappop(self._ready)
+                    self._sending.add(to)
+                    if self._ready:
+                        self._wakeup.notify()
+                    return self._queues[to][0]
+                timeout = self._retrying[0][0] - time.monotonic() if self._retrying else None
+                self._wakeup.wait(timeout)
+
+    def _run(self):
+        while True:
+            message = self._next()
+            if message is None:
+                return
+            self.bucket.acquire()
+            try:
+                result = self.deliver(text_payload(message.to, message.text))
+            except Exception as e:
+                result = GraphResult(None, {"error": str(e)}, retryable=False)
+            self._settle(message, result)
+
+    def _backoff(self, message: OutboundMessage, result: GraphResult) -> float:
+        if result.retry_after is not None:
+            return min(result.retry_after, self.retry_max)
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** message.attempts))
+
+    def _settle(self, message: OutboundMessage, result: GraphResult):
+        message.attempts += 1
+        if not result.ok and result.retryable and message.attempts < self.max_attempts:
+            delay = self._backoff(message, result)
+            if result.status == 429:
+                # Meta says we are over the number's limit; slow everyone
+                self.bucket.pause(delay)
+            with self._lock:
+                self._sending.discard(message.to)
+                heapq.heappush(self._retrying, (time.monotonic() + delay, message.to))
+                self.retried += 1
+                self._wakeup.notify()
+            return
+
+        with self._lock:
+            self._sending.discard(message.to)
+            self._pop_head(message.to)
+            self._wakeup.notify()
+            if result.ok:
+                self.sent += 1
+                self._lags[message.priority].append((time.time() - message.enqueued_at) * 1000)
+                self._append({"op": "done", "id": message.message_id})
+            else:
+                self.dead_lettered += 1
+                self._dead_letter(message, result)
+                self._append({"op": "done", "id": message.message_id, "dead": True})
+            if not self._queues:
+                # Everything is settled; start the journal afresh
+                self._journal.truncate()
+
+    def _dead_letter(self, message: OutboundMessage, result: GraphResult):
+        print(f"❌ Dead-lettering outbound message {message.message_id} to {message.to}: {result.body}")
+        record = dict(message.record(), attempts=message.attempts, status=result.status, error=result.body)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def graph_sender(url: str, access_token: Optional[str]) -> GraphClient:
+    # The queue schedules its own retries, so the client must not block a
+    # worker retrying in place
+    return GraphClient(url, access_token, max_connections=OUTBOUND_WORKERS, max_retries=0)
+
+
+def build_outbound_queue(url: str, access_token: Optional[str]) -> Optional[OutboundQueue]:
+    """Started outbound queue when OUTBOUND_QUEUE_ENABLED, else None"""
+    if not OUTBOUND_QUEUE_ENABLED:
+        return None
+    queue = OutboundQueue(graph_sender(url, access_token).deliver)
+    # Replays messages a previous process journaled but never sent
+    queue.start()
+    return queue
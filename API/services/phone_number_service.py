@@ -1,24 +1,291 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .shared_sessions import REDIS_URL, LocalRedis, _text
+
+load_dotenv()
+
+# "local" (this process only, default), "redis" (REDIS_URL, shared by every
+# worker) or "local-redis" (in-process Redis stand-in, for tests)
+CALL_SESSION_STORE = os.getenv("CALL_SESSION_STORE", "local").lower()
+# A call's phone number is forgotten this long after the call registered,
+# even if the call never reports its end
+CALL_SESSION_TTL_SECONDS = float(os.getenv("CALL_SESSION_TTL_SECONDS", "3600"))
+CALL_SESSION_MAX = int(os.getenv("CALL_SESSION_MAX", "10000"))
+CALL_SESSION_SWEEP_SECONDS = float(os.getenv("CALL_SESSION_SWEEP_SECONDS", "60"))
+REDIS_CALL_PREFIX = "ritaj:call:"
+
+
+class CallSessionRegistry:
+    """call_id -> caller phone number, with every entry expiring ttl
+    seconds after it was set and at most max_size entries kept"""
+
+    def set(self, call_id: str, phone_number: str):
+        raise NotImplementedError
+
+    def get(self, call_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def delete(self, call_id: str) -> bool:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Calls registered and not yet expired"""
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Drop expired entries; returns how many went"""
+        raise NotImplementedError
+
+
+class LocalCallRegistry(CallSessionRegistry):
+    """Registry for a single process. Every entry gets the same ttl, so
+    insertion order is expiry order: sweeps stop at the first live entry
+    and the cap evicts the oldest call first."""
+
+    def __init__(self, ttl: float = CALL_SESSION_TTL_SECONDS, max_size: int = CALL_SESSION_MAX):
+        self.ttl = ttl
+        self.max_size = max_size
+        # call_id -> (phone number, expires at monotonic time), oldest first
+        self._calls: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def set(self, call_id: str, phone_number: str):
+        with self._lock:
+            self._calls[call_id] = (phone_number, time.monotonic() + self.ttl)
+            self._calls.move_to_end(call_id)
+            while len(self._calls) > self.max_size:
+                self._calls.popitem(last=False)
+                self.evicted += 1
+
+    def get(self, call_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._calls.get(call_id)
+            if entry is None:
+                return None
+            phone_number, expires = entry
+            if expires <= time.monotonic():
+                del self._calls[call_id]
+                return None
+            return phone_number
+
+    def delete(self, call_id: str) -> bool:
+        with self._lock:
+            return self._calls.pop(call_id, None) is not None
+
+    def count(self) -> int:
+        with self._lock:
+            self._sweep(time.monotonic())
+            return len(self._calls)
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def _sweep(self, now: float) -> int:
+        swept = 0
+        for call_id, (_, expires) in list(self._calls.items()):
+            if expires > now:
+                break
+            del self._calls[call_id]
+            swept += 1
+        return swept
+
+
+class RedisCallRegistry(CallSessionRegistry):
+    """Registry on a redis-py compatible client (redis.Redis or LocalRedis)
+    shared by every worker process. Each call is a key that Redis expires
+    itself; a sorted set of call ids scored by expiry time lets the
+    registry count live calls and trim the oldest past max_size."""
+
+    def __init__(
+        self,
+        client,
+        ttl: float = CALL_SESSION_TTL_SECONDS,
+        max_size: int = CALL_SESSION_MAX,
+        prefix: str = REDIS_CALL_PREFIX,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.prefix = prefix
+        self.index_key = f"{prefix}index"
+        self.evicted = 0
+
+    def _key(self, call_id: str) -> str:
+        return f"{self.prefix}{call_id}"
+
+    def set(self, call_id: str, phone_number: str):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(call_id), phone_number, px=int(self.ttl * 1000))
+        pipe.zadd(self.index_key, {call_id: time.time() + self.ttl})
+        pipe.zcard(self.index_key)
+        size = pipe.execute()[-1]
+        if size > self.max_size:
+            self._trim(size - self.max_size)
+
+    def _trim(self, excess: int):
+        oldest = [_text(call_id) for call_id in self.client.zrange(self.index_key, 0, excess - 1)]
+        if oldest:
+            pipe = self.client.pipeline()
+            pipe.delete(*(self._key(call_id) for call_id in oldest))
+            pipe.zrem(self.index_key, *oldest)
+            pipe.execute()
+            self.evicted += len(oldest)
+
+    def get(self, call_id: str) -> Optional[str]:
+        phone_number = self.client.get(self._key(call_id))
+        return _text(phone_number) if phone_number is not None else None
+
+    def delete(self, call_id: str) -> bool:
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(call_id))
+        pipe.zrem(self.index_key, call_id)
+        return pipe.execute()[0] > 0
+
+    def count(self) -> int:
+        self.sweep()
+        return self.client.zcard(self.index_key)
+
+    def sweep(self) -> int:
+        # Redis expires the call keys itself; deleting them here as well
+        # keeps stores without active expiry (LocalRedis) from holding them
+        expired = [_text(call_id) for call_id in self.client.zrangebyscore(self.index_key, "-inf", time.time())]
+        if not expired:
+            return 0
+        pipe = self.client.pipeline()
+        pipe.delete(*(self._key(call_id) for call_id in expired))
+        pipe.zrem(self.index_key, *expired)
+        return pipe.execute()[-1]
+
+
+def build_call_registry(kind: str = CALL_SESSION_STORE) -> CallSessionRegistry:
+    if kind in ("local", "", "memory"):
+        return LocalCallRegistry()
+    if kind == "redis":
+        import redis  # optional: pip install redis
+
+        return RedisCallRegistry(redis.Redis.from_url(REDIS_URL))
+    if kind == "local-redis":
+        return RedisCallRegistry(LocalRedis())
+    raise ValueError(f"Unknown CALL_SESSION_STORE: {kind}")
+
+
 class PhoneNumberService:
-    def __init__(self):
-        self._phone_by_call_id = {}
+    """Maps voice call ids to the caller's phone number for the call's
+    tool requests (place order, order status, send menu).
+
+    Entries expire after the registry's ttl, so calls that never report
+    their end cannot pile up, and a background thread sweeps expired ones
+    every sweep_interval. With CALL_SESSION_STORE=redis every worker
+    process sees the same calls, so a tool request can land on a different
+    worker than the call's webhook.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[CallSessionRegistry] = None,
+        sweep_interval: float = CALL_SESSION_SWEEP_SECONDS,
+    ):
+        self.registry = registry or build_call_registry()
+        self.sweep_interval = sweep_interval
+        self._sweeper: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.registered = 0
+        self.cleared = 0
+        self.lookups = 0
+        self.misses = 0
+        self.swept = 0
+        self.errors = 0
+
+    def _ensure_sweeping(self):
+        if self._sweeper is None:
+            with self._lock:
+                if self._sweeper is None:
+                    self._sweeper = threading.Thread(target=self._sweep_forever, name="call-sweeper", daemon=True)
+                    self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                swept = self.registry.sweep()
+            except Exception as e:
+                print(f"❌ Call session sweep failed: {e}")
+                with self._lock:
+                    self.errors += 1
+                continue
+            with self._lock:
+                self.swept += swept
 
     def set_phone(self, call_id: str, phone_number: str) -> bool:
         if not call_id:
             return False
-        self._phone_by_call_id[call_id] = phone_number
+        self._ensure_sweeping()
+        try:
+            self.registry.set(call_id, phone_number)
+        except Exception as e:
+            print(f"❌ Could not register call {call_id}: {e}")
+            with self._lock:
+                self.errors += 1
+            return False
+        with self._lock:
+            self.registered += 1
         return True
 
-    def get_phone(self, call_id: str) -> str:
-        return self._phone_by_call_id.get(call_id)
+    def get_phone(self, call_id: str) -> Optional[str]:
+        try:
+            phone_number = self.registry.get(call_id)
+        except Exception as e:
+            print(f"❌ Could not look up call {call_id}: {e}")
+            phone_number = None
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            self.lookups += 1
+            self.misses += phone_number is None
+        return phone_number
 
     def clear_phone(self, call_id: str) -> bool:
-        if call_id in self._phone_by_call_id:
-            del self._phone_by_call_id[call_id]
-            return True
-        return False
+        try:
+            cleared = self.registry.delete(call_id)
+        except Exception as e:
+            print(f"❌ Could not clear call {call_id}: {e}")
+            with self._lock:
+                self.errors += 1
+            return False
+        with self._lock:
+            self.cleared += cleared
+        return cleared
 
     def get_active_sessions_count(self) -> int:
-        return len(self._phone_by_call_id)
+        try:
+            return self.registry.count()
+        except Exception as e:
+            print(f"❌ Could not count call sessions: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self.registry).__name__,
+                "ttl_seconds": getattr(self.registry, "ttl", None),
+                "max_size": getattr(self.registry, "max_size", None),
+                "registered": self.registered,
+                "cleared": self.cleared,
+                "lookups": self.lookups,
+                "misses": self.misses,
+                "swept": self.swept,
+                "evicted": getattr(self.registry, "evicted", 0),
+                "errors": self.errors,
+            }
 
 
 phone_number_service = PhoneNumberService()
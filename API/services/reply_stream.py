@@ -0,0 +1,109 @@
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+# Streamed replies are split into an early first message and the rest only
+# once they run past this many characters; typical replies (an order
+# summary, a menu answer) stay well under it and arrive as one message
+STREAM_FIRST_MESSAGE_CHARS = int(os.getenv("STREAM_FIRST_MESSAGE_CHARS", "400"))
+WHATSAPP_MAX_MESSAGE_CHARS = 4096
+REPLY_TIMINGS_KEPT = 1000
+
+# End of a sentence (punctuation then whitespace, so "$5.99" is not split) or a blank line
+_BOUNDARY = re.compile(r"(?<=[.!?…])\s+(?=\S)|\n\s*\n")
+
+
+class SentenceChunker:
+    """Turns streamed reply text into WhatsApp-sized messages.
+
+    The first message goes out as soon as a sentence boundary is reached
+    past first_message_chars; the rest is held back and sent together at
+    the end (split only when it would exceed the WhatsApp length limit), so
+    a reply arrives as one early message plus the remainder. Replies that
+    end before first_message_chars are sent whole.
+    """
+
+    def __init__(
+        self,
+        first_message_chars: int = STREAM_FIRST_MESSAGE_CHARS,
+        max_message_chars: int = WHATSAPP_MAX_MESSAGE_CHARS,
+    ):
+        self.first_message_chars = first_message_chars
+        self.max_message_chars = max_message_chars
+        self.messages_sent = 0
+        self._buffer = ""
+
+    def _cut(self, at: int) -> str:
+        message, self._buffer = self._buffer[:at].strip(), self._buffer[at:].lstrip()
+        if message:
+            self.messages_sent += 1
+        return message
+
+    def _last_boundary(self, limit: int) -> Optional[int]:
+        cut = None
+        for match in _BOUNDARY.finditer(self._buffer, 0, limit):
+            cut = match.start()
+        return cut
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns messages that are ready to send"""
+        self._buffer += text
+        ready = []
+
+        if self.messages_sent == 0 and len(self._buffer) >= self.first_message_chars:
+            for match in _BOUNDARY.finditer(self._buffer, self.first_message_chars):
+                ready.append(self._cut(match.start()))
+                break
+
+        while len(self._buffer) > self.max_message_chars:
+            cut = self._last_boundary(self.max_message_chars) or self.max_message_chars
+            ready.append(self._cut(cut))
+
+        return [message for message in ready if message]
+
+    def flush(self) -> List[str]:
+        """Whatever is left once the stream has finished"""
+        ready = []
+        while self._buffer:
+            if len(self._buffer) <= self.max_message_chars:
+                ready.append(self._cut(len(self._buffer)))
+            else:
+                cut = self._last_boundary(self.max_message_chars) or self.max_message_chars
+                ready.append(self._cut(cut))
+        return [message for message in ready if message]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return round(values[index], 1)
+
+
+class ReplyTimings:
+    """Recent time-to-first-message and total turn times, in milliseconds"""
+
+    def __init__(self, kept: int = REPLY_TIMINGS_KEPT):
+        self._first = deque(maxlen=kept)
+        self._total = deque(maxlen=kept)
+        self._lock = threading.Lock()
+
+    def record(self, first_message_ms: Optional[float], total_ms: float):
+        with self._lock:
+            if first_message_ms is not None:
+                self._first.append(first_message_ms)
+            self._total.append(total_ms)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            first, total = list(self._first), list(self._total)
+        return {
+            "turns": len(total),
+            "first_message_p50_ms": percentile(first, 50),
+            "first_message_p95_ms": percentile(first, 95),
+            "total_p50_ms": percentile(total, 50),
+            "total_p95_ms": percentile(total, 95),
+        }
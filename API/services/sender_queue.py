@@ -0,0 +1,351 @@
+import asyncio
+import atexit
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from .reply_stream import percentile
+
+load_dotenv()
+
+# Ack the webhook straight away and process the turn on a worker
+WEBHOOK_ASYNC_ACK = os.getenv("WEBHOOK_ASYNC_ACK", "true").lower() in ("1", "true", "yes")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+WEBHOOK_QUEUE_MAX_DEPTH = int(os.getenv("WEBHOOK_QUEUE_MAX_DEPTH", "1000"))
+WEBHOOK_SENDER_MAX_DEPTH = int(os.getenv("WEBHOOK_SENDER_MAX_DEPTH", "20"))
+# A sender's turn waits until they have been quiet this long (but no longer
+# than the max wait after their first message), and every message queued by
+# then goes into one turn; 0 disables coalescing
+WEBHOOK_COALESCE_WINDOW_MS = float(os.getenv("WEBHOOK_COALESCE_WINDOW_MS", "800"))
+WEBHOOK_COALESCE_MAX_WAIT_MS = float(os.getenv("WEBHOOK_COALESCE_MAX_WAIT_MS", "3000"))
+WEBHOOK_COALESCE_MAX_MESSAGES = int(os.getenv("WEBHOOK_COALESCE_MAX_MESSAGES", "10"))
+QUEUE_WAITS_KEPT = 1000
+BUSIEST_SENDERS = 5
+
+
+class _QueueState:
+    """Per-sender FIFOs plus the counters shared by both queue flavours.
+
+    A sender is "scheduled" while a worker owns it or it is waiting for
+    one, so at most one of its messages is ever in progress.
+
+    With a merge function and a coalesce window, a newly scheduled sender
+    is held back until no message has arrived from them for the window
+    (capped at max_wait after the first), and a worker then takes up to
+    max_batch queued jobs at once and runs merge(jobs) as a single job.
+    Messages that arrive while the sender's turn runs are taken together
+    as soon as it finishes.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_depth: int,
+        sender_max_depth: int,
+        merge: Optional[Callable[[List[Any]], Any]] = None,
+        coalesce_window: float = WEBHOOK_COALESCE_WINDOW_MS / 1000,
+        coalesce_max_wait: float = WEBHOOK_COALESCE_MAX_WAIT_MS / 1000,
+        max_batch: int = WEBHOOK_COALESCE_MAX_MESSAGES,
+    ):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.sender_max_depth = sender_max_depth
+        self.merge = merge
+        self.coalesce_window = coalesce_window if merge else 0.0
+        self.coalesce_max_wait = coalesce_max_wait
+        self.max_batch = max(1, max_batch) if merge else 1
+
+        self._queues: Dict[str, Deque] = {}
+        self._scheduled: Set[str] = set()
+        # Scheduled senders still inside their coalesce window:
+        # sender -> (first message time, time the wait ends)
+        self._holding: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._waits = deque(maxlen=QUEUE_WAITS_KEPT)
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy = 0
+        self.peak_depth = 0
+        self.coalesced = 0
+
+    def _offer(self, sender: str, job) -> Optional[bool]:
+        """Queue a job. Returns None when full, otherwise whether the sender
+        needs scheduling (it was idle)"""
+        now = time.perf_counter()
+        with self._lock:
+            queue = self._queues.get(sender)
+            if self._depth >= self.max_depth or (
+                queue is not None and len(queue) >= self.sender_max_depth
+            ):
+                self.rejected += 1
+                return None
+            if queue is None:
+                queue = self._queues[sender] = deque()
+            queue.append((now, job))
+            self._depth += 1
+            self.enqueued += 1
+            self.peak_depth = max(self.peak_depth, self._depth)
+            if sender in self._scheduled:
+                holding = self._holding.get(sender)
+                if holding is not None:
+                    # Another message inside the window: wait for quiet again
+                    self._holding[sender] = (holding[0], self._hold_until(holding[0], now))
+                return False
+            self._scheduled.add(sender)
+            self._holding[sender] = (now, self._hold_until(now, now))
+            return True
+
+    def _hold_until(self, first: float, now: float) -> float:
+        if not self.coalesce_window:
+            return now
+        return min(now + self.coalesce_window, first + self.coalesce_max_wait)
+
+    def _release(self, sender: str, now: float) -> Optional[float]:
+        """Stop holding the sender once its window has passed; returns the
+        time it is held until otherwise (called with the lock held)"""
+        holding = self._holding.get(sender)
+        if holding is None:
+            return None
+        if holding[1] > now:
+            return holding[1]
+        del self._holding[sender]
+        return None
+
+    def _take(self, sender: str):
+        """Next job for a scheduled sender: the oldest one, or every queued
+        job up to max_batch merged into one"""
+        with self._lock:
+            queue = self._queues[sender]
+            batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch))]
+            self._depth -= len(batch)
+            self.busy += 1
+            self._waits.append((time.perf_counter() - batch[0][0]) * 1000)
+            if len(batch) == 1:
+                return batch[0][1]
+            self.coalesced += len(batch) - 1
+        return self.merge([job for _, job in batch])
+
+    def _done(self, sender: str, ok: bool) -> bool:
+        """Record a finished job; returns whether the sender has more queued"""
+        with self._lock:
+            self.busy -= 1
+            self.processed += 1
+            if not ok:
+                self.failed += 1
+            if self._queues[sender]:
+                return True
+            del self._queues[sender]
+            self._scheduled.discard(sender)
+            return False
+
+    def depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._waits)
+            busiest = sorted(self._queues.items(), key=lambda pair: len(pair[1]), reverse=True)
+            return {
+                "workers": self.workers,
+                "busy_workers": self.busy,
+                "depth": self._depth,
+                "peak_depth": self.peak_depth,
+                "max_depth": self.max_depth,
+                "sender_max_depth": self.sender_max_depth,
+                "active_senders": len(self._queues),
+                "holding_senders": len(self._holding),
+                "busiest_senders": {
+                    sender: len(queue) for sender, queue in busiest[:BUSIEST_SENDERS] if queue
+                },
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "coalesced": self.coalesced,
+                "coalesce_window_ms": round(self.coalesce_window * 1000),
+                "wait_p50_ms": percentile(waits, 50),
+                "wait_p95_ms": percentile(waits, 95),
+            }
+
+
+class SenderQueues(_QueueState):
+    """Worker threads that run jobs in order per sender, in parallel across
+    senders.
+
+    submit() returns immediately; it refuses the job (returns False) when
+    the total depth or the sender's own queue is at its limit, so the caller
+    can push back (WhatsApp redelivers a webhook that was not acknowledged).
+    Senders with work wait in a FIFO for a free worker, and a worker hands
+    its sender back to the end of that FIFO after each job, so one chatty
+    sender cannot starve the others. Senders inside their coalesce window
+    wait in a heap ordered by when the window ends.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Any], None],
+        workers: int = WEBHOOK_WORKERS,
+        max_depth: int = WEBHOOK_QUEUE_MAX_DEPTH,
+        sender_max_depth: int = WEBHOOK_SENDER_MAX_DEPTH,
+        **coalesce,
+    ):
+        super().__init__(workers, max_depth, sender_max_depth, **coalesce)
+        self.handler = handler
+        self._ready: Deque[str] = deque()
+        # (window end, sender); entries superseded by a later end are skipped
+        self._held: List[Tuple[float, str]] = []
+        self._wakeup = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._threads = []
+        self._stopping = False
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"webhook-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.close)
+
+    def submit(self, sender: str, job) -> bool:
+        self._ensure_started()
+        needs_worker = self._offer(sender, job)
+        if needs_worker is None:
+            return False
+        with self._lock:
+            holding = self._holding.get(sender)
+            if holding is not None:
+                heapq.heappush(self._held, (holding[1], sender))
+                self._wakeup.notify()
+        return True
+
+    def _release_held(self, now: float):
+        while self._held and self._held[0][0] <= now:
+            _, sender = heapq.heappop(self._held)
+            if sender in self._holding and self._release(sender, now) is None:
+                self._ready.append(sender)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while True:
+                    if self._stopping:
+                        return
+                    self._release_held(time.perf_counter())
+                    if self._ready:
+                        break
+                    timeout = self._held[0][0] - time.perf_counter() if self._held else None
+                    self._wakeup.wait(timeout)
+                sender = self._ready.popleft()
+                if self._ready:
+                    # Several senders came due at once; wake another worker
+                    self._wakeup.notify()
+
+            job = self._take(sender)
+            ok = True
+            try:
+                self.handler(sender, job)
+            except Exception as e:
+                ok = False
+                print(f"❌ Webhook worker error for {sender}: {e}")
+
+            more = self._done(sender, ok)
+            with self._lock:
+                if more:
+                    self._ready.append(sender)
+                    self._wakeup.notify()
+                elif not self._queues:
+                    self._idle.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has been processed"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while self._queues:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Finish queued work, then stop the workers"""
+        self.join(timeout)
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+
+
+class AsyncSenderQueues(_QueueState):
+    """Event-loop counterpart of SenderQueues for the ASGI app.
+
+    Each sender with queued work gets one drain task, so its messages run
+    in order; a semaphore caps how many turns run at once across senders.
+    The drain task sleeps out the sender's coalesce window before taking a
+    slot.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Any], Awaitable[None]],
+        workers: int = WEBHOOK_WORKERS,
+        max_depth: int = WEBHOOK_QUEUE_MAX_DEPTH,
+        sender_max_depth: int = WEBHOOK_SENDER_MAX_DEPTH,
+        **coalesce,
+    ):
+        super().__init__(workers, max_depth, sender_max_depth, **coalesce)
+        self.handler = handler
+        # Created inside the running loop on first use
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, sender: str, job) -> bool:
+        """Queue a job from inside the event loop"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        needs_worker = self._offer(sender, job)
+        if needs_worker is None:
+            return False
+        if needs_worker:
+            task = asyncio.get_running_loop().create_task(self._drain(sender))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _drain(self, sender: str):
+        while True:
+            with self._lock:
+                held_until = self._release(sender, time.perf_counter())
+            if held_until is None:
+                break
+            await asyncio.sleep(held_until - time.perf_counter())
+
+        more = True
+        while more:
+            async with self._slots:
+                job = self._take(sender)
+                ok = True
+                try:
+                    await self.handler(sender, job)
+                except Exception as e:
+                    ok = False
+                    print(f"❌ Webhook worker error for {sender}: {e}")
+            more = self._done(sender, ok)
+
+    async def join(self):
+        """Wait until every queued job has been processed"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Live LLMService objects kept in memory; the least recently used beyond
+# this are hibernated
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "500"))
+# Sessions idle this long are hibernated even when under the cap
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "900"))
+# Hibernated conversations kept; the oldest beyond either limit are forgotten
+SESSION_MAX_HIBERNATED = int(os.getenv("SESSION_MAX_HIBERNATED", "100000"))
+SESSION_MAX_HIBERNATED_BYTES = int(os.getenv("SESSION_MAX_HIBERNATED_BYTES", str(64 * 1024 * 1024)))
+IDLE_SWEEP_INTERVAL_SECONDS = 5.0
+
+
+def encode_session_state(history, meta: Dict[str, Any]) -> bytes:
+    """Compress a chat history (genai Content list) and a JSON-able dict.
+
+    The history is stored as one serialized proto message and the dict as
+    a JSON line in front of it (json.dumps never emits a raw newline).
+    """
+    contents = genai.protos.GenerateContentRequest(contents=list(history))
+    payload = json.dumps(meta, separators=(",", ":")).encode("utf-8") + b"\n"
+    payload += type(contents).serialize(contents)
+    return zlib.compress(payload)
+
+
+def decode_session_state(state: bytes) -> Tuple[List[Any], Dict[str, Any]]:
+    header, _, body = zlib.decompress(state).partition(b"\n")
+    contents = genai.protos.GenerateContentRequest.deserialize(body)
+    return list(contents.contents), json.loads(header)
+
+
+class SessionStore:
+    """Bounded home for per-sender chat sessions.
+
+    At most max_active sessions stay live, in least-recently-used order.
+    Sessions past the cap or idle longer than idle_ttl are hibernated: the
+    session's hibernate() bytes (history and a few counters) replace the
+    object, and the next message from that sender rebuilds it through
+    restore(sender, state). Hibernated state is itself capped by count and
+    bytes, oldest forgotten first.
+
+    Sessions pinned by an in-progress turn are never hibernated, so a turn
+    cannot lose its history halfway through.
+
+    With keep_hibernated=False evicted sessions are simply released: used
+    when a shared store already holds every conversation, so the next turn
+    reloads it from there instead.
+    """
+
+    def __init__(
+        self,
+        restore: Callable[[str, bytes], Any],
+        max_active: int = SESSION_MAX_ACTIVE,
+        idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+        max_hibernated: int = SESSION_MAX_HIBERNATED,
+        max_hibernated_bytes: int = SESSION_MAX_HIBERNATED_BYTES,
+        keep_hibernated: bool = True,
+    ):
+        self.restore = restore
+        self.keep_hibernated = keep_hibernated
+        self.max_active = max_active
+        self.idle_ttl = idle_ttl
+        self.max_hibernated = max_hibernated
+        self.max_hibernated_bytes = max_hibernated_bytes
+
+        # sender -> (session, last used monotonic time), least recent first
+        self._live: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._hibernated: "OrderedDict[str, bytes]" = OrderedDict()
+        self._hibernated_bytes = 0
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+        self.hits = 0
+        self.created = 0
+        self.rehydrated = 0
+        self.hibernated_idle = 0
+        self.hibernated_lru = 0
+        self.forgotten = 0
+        self.released = 0
+        self.hibernate_errors = 0
+
+    # Lookup ----------------------------------------------------------------
+
+    def __contains__(self, sender: str) -> bool:
+        with self._lock:
+            return sender in self._live or sender in self._hibernated
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def peek(self, sender: str) -> Optional[Any]:
+        """The live session, without rehydrating or counting as a use"""
+        entry = self._live.get(sender)
+        return entry[0] if entry else None
+
+    def get(self, sender: str) -> Optional[Any]:
+        session, _ = self.lookup(sender)
+        return session
+
+    def __getitem__(self, sender: str) -> Any:
+        session = self.get(sender)
+        if session is None:
+            raise KeyError(sender)
+        return session
+
+    def lookup(self, sender: str) -> Tuple[Optional[Any], Optional[str]]:
+        """(session, "live" | "rehydrated"), or (None, None) for a new sender"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live.get(sender)
+            if entry is not None:
+                self._live[sender] = (entry[0], now)
+                self._live.move_to_end(sender)
+                self.hits += 1
+                self._maintain(now)
+                return entry[0], "live"
+
+            state = self._hibernated.pop(sender, None)
+            if state is None:
+                return None, None
+            self._hibernated_bytes -= len(state)
+
+        # Rebuilding may load the menu; keep other senders' lookups moving
+        try:
+            session = self.restore(sender, state)
+        except Exception as e:
+            # Better a fresh conversation than a stuck sender
+            print(f"❌ Could not rehydrate session for {sender}: {e}")
+            with self._lock:
+                self.forgotten += 1
+            return None, None
+        with self._lock:
+            self.rehydrated += 1
+            return self._put_if_absent(sender, session), "rehydrated"
+
+    def get_or_create(self, sender: str, create: Callable[[], Any]) -> Tuple[Any, str]:
+        """(session, "live" | "rehydrated" | "created")"""
+        session, source = self.lookup(sender)
+        if session is not None:
+            return session, source
+        session = create()
+        with self._lock:
+            self.created += 1
+            return self._put_if_absent(sender, session), "created"
+
+    def __setitem__(self, sender: str, session: Any):
+        with self._lock:
+            state = self._hibernated.pop(sender, None)
+            if state is not None:
+                self._hibernated_bytes -= len(state)
+            self._put(sender, session, time.monotonic())
+
+    @contextmanager
+    def pinned(self, sender: str):
+        """Keep the sender's session live for the duration of a turn"""
+        with self._lock:
+            self._pins[sender] = self._pins.get(sender, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._pins[sender] == 1:
+                    del self._pins[sender]
+                else:
+                    self._pins[sender] -= 1
+
+    def clear(self):
+        with self._lock:
+            self._live.clear()
+            self._hibernated.clear()
+            self._hibernated_bytes = 0
+
+    # Eviction --------------------------------------------------------------
+
+    def _put_if_absent(self, sender: str, session: Any) -> Any:
+        """Keep whichever session for the sender was stored first (two
+        threads may have built one at the same time)"""
+        entry = self._live.get(sender)
+        if entry is not None:
+            return entry[0]
+        self._put(sender, session, time.monotonic())
+        return session
+
+    def _put(self, sender: str, session: Any, now: float):
+        self._live[sender] = (session, now)
+        self._live.move_to_end(sender)
+        self._maintain(now)
+
+    def _maintain(self, now: float):
+        # Least recently used first; pinned sessions are skipped over
+        if len(self._live) > self.max_active:
+            for sender in list(self._live):
+                if len(self._live) <= self.max_active:
+                    break
+                if sender not in self._pins and self._hibernate(sender):
+                    self.hibernated_lru += 1
+
+        if now - self._last_sweep >= IDLE_SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self._hibernate_idle(now)
+
+    def hibernate_idle(self) -> int:
+        """Hibernate every unpinned session idle for longer than idle_ttl"""
+        with self._lock:
+            return self._hibernate_idle(time.monotonic())
+
+    def _hibernate_idle(self, now: float) -> int:
+        count = 0
+        for sender, (_, last_used) in list(self._live.items()):
+            if now - last_used < self.idle_ttl:
+                # Ordered by last use, so everything after is fresher
+                break
+            if sender not in self._pins and self._hibernate(sender):
+                count += 1
+        self.hibernated_idle += count
+        return count
+
+    def _hibernate(self, sender: str) -> bool:
+        """Move a live session out of memory; False when it had to stay"""
+        session, _ = self._live.pop(sender)
+        if not self.keep_hibernated:
+            self.released += 1
+            return True
+        hibernate = getattr(session, "hibernate", None)
+        if hibernate is None:
+            self.forgotten += 1
+            return True
+        try:
+            state = hibernate()
+        except Exception as e:
+            # Dropping it would lose the conversation: keep it live, as the
+            # most recently used, and try again once it is idle or LRU again
+            self.hibernate_errors += 1
+            self._live[sender] = (session, time.monotonic())
+            print(f"❌ Could not hibernate session for {sender}, keeping it in memory: {e}")
+            return False
+
+        self._hibernated[sender] = state
+        self._hibernated_bytes += len(state)
+        while self._hibernated and (
+            len(self._hibernated) > self.max_hibernated
+            or self._hibernated_bytes > self.max_hibernated_bytes
+        ):
+            _, dropped = self._hibernated.popitem(last=False)
+            self._hibernated_bytes -= len(dropped)
+            self.forgotten += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hibernated = len(self._hibernated)
+            return {
+                "live": len(self._live),
+                "max_active": self.max_active,
+                "pinned": len(self._pins),
+                "hibernated": hibernated,
+                "hibernated_bytes": self._hibernated_bytes,
+                "avg_hibernated_bytes": round(self._hibernated_bytes / hibernated) if hibernated else None,
+                "idle_ttl_seconds": self.idle_ttl,
+                "hits": self.hits,
+                "created": self.created,
+                "rehydrated": self.rehydrated,
+                "hibernated_idle": self.hibernated_idle,
+                "hibernated_lru": self.hibernated_lru,
+                "forgotten": self.forgotten,
+                "released": self.released,
+                "hibernate_errors": self.hibernate_errors,
+            }
@@ -0,0 +1,759 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from .reply_stream import percentile
+from .turn_trace import span
+
+load_dotenv()
+
+# Where chat history and conversation state live so any worker process can
+# serve any sender: "none" (default, each process keeps its own sessions),
+# "sqlite" (file shared by the processes on one host), "redis" (REDIS_URL,
+# needs the redis package) or "local-redis" (in-process stand-in)
+SESSION_SHARED_STORE = os.getenv("SESSION_SHARED_STORE", "none").lower()
+SESSION_SHARED_SQLITE_PATH = os.getenv("SESSION_SHARED_SQLITE_PATH", "data/sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Conversations untouched this long are dropped from the shared store
+SESSION_SHARED_TTL_SECONDS = int(os.getenv("SESSION_SHARED_TTL_SECONDS", str(7 * 24 * 3600)))
+# A sender's turn holds a lease for at most this long; keep it above the
+# slowest turn so a crashed worker never blocks the sender for good
+SESSION_LOCK_TTL_SECONDS = float(os.getenv("SESSION_LOCK_TTL_SECONDS", "60"))
+SESSION_LOCK_WAIT_SECONDS = float(os.getenv("SESSION_LOCK_WAIT_SECONDS", "30"))
+REDIS_KEY_PREFIX = "ritaj:session:"
+LOCK_POLL_SECONDS = 0.02
+LOCK_WAITS_KEPT = 1000
+SQLITE_PRUNE_EVERY = 500
+
+
+def encode_content(content) -> bytes:
+    return genai.protos.Content.serialize(content)
+
+
+def decode_content(data: bytes):
+    return genai.protos.Content.deserialize(data)
+
+
+class SessionUnavailable(Exception):
+    """The sender's session could not be locked or loaded, so the turn
+    never started"""
+
+
+class SessionLockTimeout(SessionUnavailable):
+    """Another worker held the sender's lease for longer than lock_wait"""
+
+
+class SharedHead:
+    """Version information and conversation state of a stored session.
+
+    version goes up on every write and generation whenever the history is
+    rewritten (compaction, reset) rather than appended to; length is the
+    number of stored history entries.
+    """
+
+    def __init__(self, version: int, generation: int, length: int, meta: Dict[str, Any]):
+        self.version = version
+        self.generation = generation
+        self.length = length
+        self.meta = meta
+
+
+class SharedSessionBackend:
+    """Storage for per-sender chat history and state shared by workers.
+
+    The history is an append-only list of serialized Content entries per
+    sender, so a turn writes only the entries it added. Callers hold the
+    sender's lease (acquire/release) around a read-modify-write.
+    """
+
+    def head(self, sender: str) -> Optional[SharedHead]:
+        raise NotImplementedError
+
+    def read(self, sender: str, start: int = 0) -> List[bytes]:
+        """Stored history entries from position `start` on"""
+        raise NotImplementedError
+
+    def append(self, sender: str, head: SharedHead, entries: List[bytes]):
+        """Store `entries` after the first head.length - len(entries) ones
+        and replace the head"""
+        raise NotImplementedError
+
+    def replace(self, sender: str, head: SharedHead, entries: List[bytes]):
+        """Swap the whole history for `entries` and replace the head"""
+        raise NotImplementedError
+
+    def acquire(self, sender: str, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def release(self, sender: str, owner: str):
+        raise NotImplementedError
+
+    def delete(self, sender: str):
+        raise NotImplementedError
+
+    def mark_seen(self, message_id: str, ttl: float) -> bool:
+        """Record a webhook message id for `ttl` seconds; False when some
+        worker already recorded it within that time"""
+        raise NotImplementedError
+
+    def forget_seen(self, message_id: str):
+        raise NotImplementedError
+
+
+class SQLiteSessionBackend(SharedSessionBackend):
+    """Shared store in one SQLite file (WAL mode), for worker processes on
+    the same host. Use ":memory:" for a throwaway single-process store."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            sender TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            generation INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            meta TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS chat_history (
+            sender TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            content BLOB NOT NULL,
+            PRIMARY KEY (sender, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS chat_locks (
+            sender TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS seen_messages (
+            message_id TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = ":memory:", ttl: int = SESSION_SHARED_TTL_SECONDS):
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        # One connection per process, serialised by a lock; other processes
+        # wait on SQLite's own file lock (busy timeout)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def head(self, sender: str) -> Optional[SharedHead]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, generation, length, meta FROM chat_sessions"
+                " WHERE sender = ? AND updated_at >= ?",
+                (sender, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        return SharedHead(row[0], row[1], row[2], json.loads(row[3]))
+
+    def read(self, sender: str, start: int = 0) -> List[bytes]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT content FROM chat_history WHERE sender = ? AND position >= ? ORDER BY position",
+                (sender, start),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _write_head(self, conn, sender: str, head: SharedHead):
+        conn.execute(
+            "INSERT OR REPLACE INTO chat_sessions (sender, version, generation, length, meta, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (sender, head.version, head.generation, head.length,
+             json.dumps(head.meta, separators=(",", ":")), time.time()),
+        )
+
+    def append(self, sender: str, head: SharedHead, entries: List[bytes]):
+        start = head.length - len(entries)
+        with self._transaction() as conn:
+            # Entries past `start` belong to a turn that never finished saving
+            conn.execute("DELETE FROM chat_history WHERE sender = ? AND position >= ?", (sender, start))
+            conn.executemany(
+                "INSERT INTO chat_history (sender, position, content) VALUES (?, ?, ?)",
+                [(sender, start + i, entry) for i, entry in enumerate(entries)],
+            )
+            self._write_head(conn, sender, head)
+        self._maybe_prune()
+
+    def replace(self, sender: str, head: SharedHead, entries: List[bytes]):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM chat_history WHERE sender = ?", (sender,))
+            conn.executemany(
+                "INSERT INTO chat_history (sender, position, content) VALUES (?, ?, ?)",
+                [(sender, i, entry) for i, entry in enumerate(entries)],
+            )
+            self._write_head(conn, sender, head)
+        self._maybe_prune()
+
+    def acquire(self, sender: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO chat_locks (sender, owner, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (sender) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+                " WHERE chat_locks.expires_at < ? OR chat_locks.owner = excluded.owner",
+                (sender, owner, now + ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, sender: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_locks WHERE sender = ? AND owner = ?", (sender, owner))
+
+    def delete(self, sender: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM chat_history WHERE sender = ?", (sender,))
+            conn.execute("DELETE FROM chat_sessions WHERE sender = ?", (sender,))
+
+    def mark_seen(self, message_id: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO seen_messages (message_id, expires_at) VALUES (?, ?)"
+                " ON CONFLICT (message_id) DO UPDATE SET expires_at = excluded.expires_at"
+                " WHERE seen_messages.expires_at < ?",
+                (message_id, now + ttl, now),
+            )
+            marked = cursor.rowcount == 1
+        self._maybe_prune()
+        return marked
+
+    def forget_seen(self, message_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_messages WHERE message_id = ?", (message_id,))
+
+    def _maybe_prune(self):
+        self._writes += 1
+        if self._writes % SQLITE_PRUNE_EVERY:
+            return
+        cutoff = time.time() - self.ttl
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM chat_history WHERE sender IN"
+                " (SELECT sender FROM chat_sessions WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,))
+            conn.execute("DELETE FROM chat_locks WHERE expires_at < ?", (time.time(),))
+            conn.execute("DELETE FROM seen_messages WHERE expires_at < ?", (time.time(),))
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisSessionBackend(SharedSessionBackend):
+    """Shared store on a redis-py compatible client (redis.Redis or
+    LocalRedis): a list of history entries and a head hash per sender, plus
+    a SET NX lease key. Writes go through one transactional pipeline."""
+
+    def __init__(self, client, ttl: int = SESSION_SHARED_TTL_SECONDS, prefix: str = REDIS_KEY_PREFIX):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _keys(self, sender: str) -> Tuple[str, str]:
+        return f"{self.prefix}{sender}:head", f"{self.prefix}{sender}:history"
+
+    def head(self, sender: str) -> Optional[SharedHead]:
+        head_key, _ = self._keys(sender)
+        fields = {_text(k): _text(v) for k, v in self.client.hgetall(head_key).items()}
+        if not fields:
+            return None
+        return SharedHead(
+            int(fields["version"]), int(fields["generation"]), int(fields["length"]), json.loads(fields["meta"])
+        )
+
+    def read(self, sender: str, start: int = 0) -> List[bytes]:
+        _, history_key = self._keys(sender)
+        return list(self.client.lrange(history_key, start, -1))
+
+    def _write(self, sender: str, head: SharedHead, entries: List[bytes], keep: Optional[int]):
+        head_key, history_key = self._keys(sender)
+        pipe = self.client.pipeline()
+        if keep:
+            # Drop entries from a turn that never finished saving
+            pipe.ltrim(history_key, 0, keep - 1)
+        else:
+            pipe.delete(history_key)
+        if entries:
+            pipe.rpush(history_key, *entries)
+        pipe.hset(head_key, mapping={
+            "version": head.version,
+            "generation": head.generation,
+            "length": head.length,
+            "meta": json.dumps(head.meta, separators=(",", ":")),
+        })
+        pipe.expire(head_key, self.ttl)
+        pipe.expire(history_key, self.ttl)
+        pipe.execute()
+
+    def append(self, sender: str, head: SharedHead, entries: List[bytes]):
+        self._write(sender, head, entries, keep=head.length - len(entries))
+
+    def replace(self, sender: str, head: SharedHead, entries: List[bytes]):
+        self._write(sender, head, entries, keep=None)
+
+    def acquire(self, sender: str, owner: str, ttl: float) -> bool:
+        return bool(self.client.set(f"{self.prefix}{sender}:lock", owner, nx=True, px=int(ttl * 1000)))
+
+    def release(self, sender: str, owner: str):
+        # Only remove our own lease; one that expired and was taken over
+        # belongs to the other worker now
+        key = f"{self.prefix}{sender}:lock"
+        if _text(self.client.get(key)) == owner:
+            self.client.delete(key)
+
+    def delete(self, sender: str):
+        self.client.delete(*self._keys(sender))
+
+    def mark_seen(self, message_id: str, ttl: float) -> bool:
+        return bool(self.client.set(f"{self.prefix}seen:{message_id}", 1, nx=True, px=int(ttl * 1000)))
+
+    def forget_seen(self, message_id: str):
+        self.client.delete(f"{self.prefix}seen:{message_id}")
+
+
+class LocalRedis:
+    """In-process stand-in for the handful of Redis commands the session
+    store and call registry use, with Redis's bytes-in/bytes-out behaviour and key expiry.
+    State is per process, so it only stands in for a real server in
+    single-process runs and benchmarks."""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _bytes(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode("utf-8")
+
+    def _live(self, key: str):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value, nx: bool = False, px: Optional[int] = None) -> Optional[bool]:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._data[key] = self._bytes(value)
+            self._expires.pop(key, None)
+            if px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                removed += self._live(key) is not None
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if self._live(key) is None:
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def rpush(self, key: str, *values) -> int:
+        with self._lock:
+            items = self._live(key)
+            if items is None:
+                items = self._data[key] = []
+            items.extend(self._bytes(value) for value in values)
+            return len(items)
+
+    def lrange(self, key: str, start: int, end: int) -> List[bytes]:
+        with self._lock:
+            items = self._live(key) or []
+            end = len(items) if end == -1 else end + 1
+            return items[start:end]
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        with self._lock:
+            items = self._live(key)
+            if items is not None:
+                end = len(items) if end == -1 else end + 1
+                items[:] = items[start:end]
+            return True
+
+    def hset(self, key: str, mapping: Dict[str, Any]) -> int:
+        with self._lock:
+            fields = self._live(key)
+            if fields is None:
+                fields = self._data[key] = {}
+            added = sum(self._bytes(field) not in fields for field in mapping)
+            fields.update({self._bytes(k): self._bytes(v) for k, v in mapping.items()})
+            return added
+
+    def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        with self._lock:
+            return dict(self._live(key) or {})
+
+    def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            scores = self._live(key)
+            if scores is None:
+                scores = self._data[key] = {}
+            added = sum(self._bytes(member) not in scores for member in mapping)
+            scores.update({self._bytes(member): float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, key: str, *members) -> int:
+        with self._lock:
+            scores = self._live(key) or {}
+            return sum(scores.pop(self._bytes(member), None) is not None for member in members)
+
+    def zcard(self, key: str) -> int:
+        with self._lock:
+            return len(self._live(key) or {})
+
+    def zrange(self, key: str, start: int, end: int) -> List[bytes]:
+        with self._lock:
+            members = sorted((self._live(key) or {}).items(), key=lambda item: (item[1], item[0]))
+            end = len(members) if end == -1 else end + 1
+            return [member for member, _ in members[start:end]]
+
+    def zrangebyscore(self, key: str, low, high) -> List[bytes]:
+        with self._lock:
+            low = float("-inf") if low == "-inf" else float(low)
+            high = float("inf") if high == "+inf" else float(high)
+            members = sorted((self._live(key) or {}).items(), key=lambda item: (item[1], item[0]))
+            return [member for member, score in members if low <= score <= high]
+
+    def pipeline(self) -> "_LocalPipeline":
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """Queues commands and runs them atomically on execute()"""
+
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        with self._client._lock:
+            results = [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class _Synced:
+    """What a live session last read from or wrote to the shared store"""
+
+    def __init__(self, version: int, generation: int, length: int, compactions: int, meta: str):
+        self.version = version
+        self.generation = generation
+        self.length = length
+        self.compactions = compactions
+        self.meta = meta
+
+
+class SharedSessions:
+    """Keeps live chat sessions in step with a SharedSessionBackend.
+
+    Around each turn, turn() takes the sender's lease so no other worker
+    process runs a turn for them at the same time, pulls what other workers
+    added since this process last saw the conversation, and afterwards
+    pushes only the history entries the turn added plus the small
+    conversation state (cart summary, token counters). A compaction or
+    reset rewrites the stored history in one go.
+
+    Sessions are anything with chat_session.history, history.compactions
+    and session_meta() / load_session_meta() (LLMService).
+    """
+
+    def __init__(
+        self,
+        backend: SharedSessionBackend,
+        lock_ttl: float = SESSION_LOCK_TTL_SECONDS,
+        lock_wait: float = SESSION_LOCK_WAIT_SECONDS,
+    ):
+        self.backend = backend
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._synced: "weakref.WeakKeyDictionary[Any, _Synced]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._lock_waits = deque(maxlen=LOCK_WAITS_KEPT)
+
+        self.pulls = {"current": 0, "delta": 0, "full": 0, "new": 0}
+        self.entries_read = 0
+        self.bytes_read = 0
+        self.pushes = 0
+        self.rewrites = 0
+        self.entries_written = 0
+        self.bytes_written = 0
+        self.lock_timeouts = 0
+        self.errors = 0
+
+    # Leases ----------------------------------------------------------------
+
+    def acquire(self, sender: str):
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.lock_wait
+        with span("session.lock") as attrs:
+            while not self.backend.acquire(sender, self.owner, self.lock_ttl):
+                if time.monotonic() >= deadline:
+                    with self._lock:
+                        self.lock_timeouts += 1
+                    raise SessionLockTimeout(f"session lock for {sender} still held after {self.lock_wait:.0f}s")
+                time.sleep(LOCK_POLL_SECONDS)
+            waited = (time.perf_counter() - started) * 1000
+            attrs["waited_ms"] = round(waited, 1)
+        with self._lock:
+            self._lock_waits.append(waited)
+
+    def release(self, sender: str):
+        try:
+            self.backend.release(sender, self.owner)
+        except Exception as e:
+            # The lease expires by itself after lock_ttl
+            print(f"❌ Could not release session lock for {sender}: {e}")
+
+    # Sync ------------------------------------------------------------------
+
+    def pull(self, sender: str, session) -> str:
+        """Bring the session up to date with the store: "current", "delta"
+        (only newer entries read), "full" or "new" (nothing stored yet)"""
+        with span("session.pull") as attrs:
+            head = self.backend.head(sender)
+            synced = self._synced.get(session)
+            if head is None:
+                history = session.chat_session.history
+                if history:
+                    # Stored copy expired or never written; the next push
+                    # stores this process's history in full
+                    self._synced.pop(session, None)
+                else:
+                    self._synced[session] = _Synced(0, 0, 0, session.history.compactions, "")
+                mode = "new"
+            elif synced is not None and synced.version == head.version:
+                mode = "current"
+            else:
+                if (
+                    synced is not None
+                    and synced.generation == head.generation
+                    and synced.length <= head.length
+                    and len(session.chat_session.history) == synced.length
+                ):
+                    entries = self.backend.read(sender, synced.length)
+                    session.chat_session.history = session.chat_session.history + [
+                        decode_content(entry) for entry in entries
+                    ]
+                    mode = "delta"
+                else:
+                    entries = self.backend.read(sender)
+                    session.chat_session.history = [decode_content(entry) for entry in entries]
+                    mode = "full"
+                session.load_session_meta(head.meta)
+                self._synced[session] = _Synced(
+                    head.version, head.generation, head.length,
+                    session.history.compactions, json.dumps(head.meta, separators=(",", ":")),
+                )
+                with self._lock:
+                    self.entries_read += len(entries)
+                    self.bytes_read += sum(len(entry) for entry in entries)
+            attrs["mode"] = mode
+        with self._lock:
+            self.pulls[mode] += 1
+        return mode
+
+    def push(self, sender: str, session) -> int:
+        """Store what the turn changed; returns the history entries written"""
+        with span("session.push") as attrs:
+            history = list(session.chat_session.history)
+            meta = session.session_meta()
+            meta_json = json.dumps(meta, separators=(",", ":"))
+            compactions = session.history.compactions
+            synced = self._synced.get(session)
+
+            appended = (
+                synced is not None
+                and synced.compactions == compactions
+                and len(history) >= synced.length
+            )
+            if appended:
+                added = history[synced.length:]
+                if not added and meta_json == synced.meta:
+                    attrs["entries"] = 0
+                    return 0
+                entries = [encode_content(content) for content in added]
+                head = SharedHead(synced.version + 1, synced.generation, len(history), meta)
+                self.backend.append(sender, head, entries)
+            else:
+                entries = [encode_content(content) for content in history]
+                version = synced.version if synced else 0
+                generation = synced.generation if synced else 0
+                head = SharedHead(version + 1, generation + 1, len(history), meta)
+                self.backend.replace(sender, head, entries)
+            self._synced[session] = _Synced(
+                head.version, head.generation, head.length, compactions, meta_json
+            )
+            attrs["entries"] = len(entries)
+            attrs["rewrite"] = not appended
+
+        with self._lock:
+            self.pushes += 1
+            self.rewrites += not appended
+            self.entries_written += len(entries)
+            self.bytes_written += sum(len(entry) for entry in entries) + len(meta_json)
+        return len(entries)
+
+    def forget(self, session):
+        """Make the next pull reload the session in full (after a failed turn)"""
+        self._synced.pop(session, None)
+
+    def _guarded(self, call, sender: str, session):
+        try:
+            return call(sender, session)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            self.forget(session)
+            raise
+
+    def _begin(self, sender: str, session):
+        """Take the sender's lease and pull; raises SessionUnavailable, with
+        no lease held, when either fails"""
+        try:
+            self.acquire(sender)
+        except SessionUnavailable:
+            raise
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            raise SessionUnavailable(f"session lock for {sender} unavailable: {e}") from e
+        try:
+            self._guarded(self.pull, sender, session)
+        except Exception as e:
+            self.release(sender)
+            raise SessionUnavailable(f"could not load the session for {sender}: {e}") from e
+
+    @contextmanager
+    def turn(self, sender: str, session):
+        """Hold the sender's lease and sync the session around one turn"""
+        self._begin(sender, session)
+        try:
+            try:
+                yield session
+            except BaseException:
+                self.forget(session)
+                raise
+            self._guarded(self.push, sender, session)
+        finally:
+            self.release(sender)
+
+    @asynccontextmanager
+    async def aturn(self, sender: str, session):
+        """turn() for the event loop; store calls run on worker threads"""
+        await asyncio.to_thread(self._begin, sender, session)
+        try:
+            try:
+                yield session
+            except BaseException:
+                self.forget(session)
+                raise
+            await asyncio.to_thread(self._guarded, self.push, sender, session)
+        finally:
+            await asyncio.to_thread(self.release, sender)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._lock_waits)
+            return {
+                "backend": type(self.backend).__name__,
+                "owner": self.owner,
+                "pulls": dict(self.pulls),
+                "entries_read": self.entries_read,
+                "bytes_read": self.bytes_read,
+                "pushes": self.pushes,
+                "rewrites": self.rewrites,
+                "entries_written": self.entries_written,
+                "bytes_written": self.bytes_written,
+                "avg_bytes_per_push": round(self.bytes_written / self.pushes) if self.pushes else None,
+                "lock_wait_p50_ms": percentile(waits, 50),
+                "lock_wait_p95_ms": percentile(waits, 95),
+                "lock_timeouts": self.lock_timeouts,
+                "errors": self.errors,
+            }
+
+
+def build_shared_session_backend(kind: str = SESSION_SHARED_STORE) -> Optional[SharedSessionBackend]:
+    if kind in ("none", "", "memory"):
+        return None
+    if kind == "sqlite":
+        return SQLiteSessionBackend(SESSION_SHARED_SQLITE_PATH)
+    if kind == "redis":
+        import redis  # optional: pip install redis
+
+        return RedisSessionBackend(redis.Redis.from_url(REDIS_URL))
+    if kind == "local-redis":
+        return RedisSessionBackend(LocalRedis())
+    raise ValueError(f"Unknown SESSION_SHARED_STORE: {kind}")
+
+
+def build_shared_sessions(kind: str = SESSION_SHARED_STORE) -> Optional[SharedSessions]:
+    """Shared session sync selected by SESSION_SHARED_STORE, or None when
+    sessions stay local to the process"""
+    backend = build_shared_session_backend(kind)
+    return SharedSessions(backend) if backend is not None else None
@@ -0,0 +1,362 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "supabase" (default), "sqlite" (file at SQLITE_PATH) or "memory"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/ritaj.db")
+ORDER_STATUS_COLUMNS = "order_id, items, total_amount, special_requests, order_date, delivery_address, status, courier_name, courier_phone_number"
+ORDER_NOTIFY_COLUMNS = "order_id, items, delivery_address, customer_phone_number, status"
+
+
+class StorageBackend:
+    """Menu and order persistence used by SupabaseService.
+
+    Rows use the Supabase `menu` / `orders` column names; `items` is a
+    {item_id: quantity} dict.
+    """
+
+    def fetch_menu_rows(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def insert_orders(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert orders in one round trip and return the stored rows in order"""
+        raise NotImplementedError
+
+    def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_orders(self, order_ids: List[int]) -> List[Dict[str, Any]]:
+        """Status notification columns of the given orders in one round
+        trip; ids with no order are left out"""
+        raise NotImplementedError
+
+    def fetch_orders(
+        self,
+        phone_number: str,
+        limit: int,
+        cursor: Optional[int] = None,
+        statuses: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Up to `limit` orders for a phone number, newest (highest order_id)
+        first, optionally below `cursor` and restricted to `statuses`"""
+        raise NotImplementedError
+
+
+def _supabase_orders_query(client, phone_number, limit, cursor, statuses):
+    query = (
+        client.table("orders")
+        .select(ORDER_STATUS_COLUMNS)
+        .eq("customer_phone_number", phone_number)
+    )
+
+    if statuses:
+        if len(statuses) == 1:
+            query = query.eq("status", statuses[0])
+        else:
+            query = query.in_("status", statuses)
+
+    if cursor is not None:
+        query = query.lt("order_id", int(cursor))
+
+    return query.order("order_id", desc=True).limit(limit)
+
+
+class SupabaseStorage(StorageBackend):
+    def __init__(self, client=None):
+        if client is None:
+            from .supabase_client import get_supabase_client
+
+            client = get_supabase_client()
+        self.supabase = client
+
+    def fetch_menu_rows(self) -> List[Dict[str, Any]]:
+        # "*" so optional schedule columns (available_days, available_from,
+        # available_until) are picked up when present
+        return self.supabase.table("menu").select("*").execute().data
+
+    def insert_orders(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.supabase.table("orders").insert(rows).execute().data
+
+    def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        response = (
+            self.supabase.table("orders")
+            .select("*")
+            .eq("order_id", order_id)
+            .single()
+            .execute()
+        )
+        return response.data
+
+    def get_orders(self, order_ids: List[int]) -> List[Dict[str, Any]]:
+        return (
+            self.supabase.table("orders")
+            .select(ORDER_NOTIFY_COLUMNS)
+            .in_("order_id", order_ids)
+            .execute()
+            .data
+        )
+
+    def fetch_orders(self, phone_number, limit, cursor=None, statuses=None):
+        return _supabase_orders_query(
+            self.supabase, phone_number, limit, cursor, statuses
+        ).execute().data
+
+
+class SQLiteStorage(StorageBackend):
+    """Local stand-in with the same menu/orders schema as the Supabase project.
+
+    Use ":memory:" for a throwaway database (tests, offline benchmarks).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS menu (
+            item_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            category TEXT NOT NULL,
+            description TEXT,
+            price REAL NOT NULL,
+            is_available INTEGER NOT NULL DEFAULT 1,
+            available_days TEXT,
+            available_from TEXT,
+            available_until TEXT
+        );
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            items TEXT NOT NULL,
+            total_amount REAL NOT NULL,
+            special_requests TEXT,
+            order_date TEXT,
+            delivery_address TEXT,
+            customer_phone_number TEXT,
+            status TEXT,
+            courier_name TEXT,
+            courier_phone_number TEXT
+        );
+        CREATE INDEX IF NOT EXISTS orders_phone_idx
+            ON orders (customer_phone_number, order_id);
+    """
+    ORDER_INSERT_COLUMNS = [
+        "items",
+        "total_amount",
+        "special_requests",
+        "order_date",
+        "delivery_address",
+        "customer_phone_number",
+        "status",
+        "courier_name",
+        "courier_phone_number",
+    ]
+
+    def __init__(self, path: str = ":memory:"):
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # One connection shared across threads, serialised by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _menu_row(row: sqlite3.Row) -> Dict[str, Any]:
+        item = dict(row)
+        item["is_available"] = bool(item["is_available"])
+        for key in ("available_days", "available_from", "available_until"):
+            if item[key] is None:
+                del item[key]
+        return item
+
+    @staticmethod
+    def _order_row(row: sqlite3.Row) -> Dict[str, Any]:
+        order = dict(row)
+        order["items"] = json.loads(order["items"]) if order["items"] else {}
+        return order
+
+    def load_menu(self, rows: List[Dict[str, Any]]):
+        """Replace the menu table, e.g. with a copy of the live menu"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM menu")
+            self._conn.executemany(
+                "INSERT INTO menu (item_id, name, category, description, price, is_available,"
+                " available_days, available_from, available_until)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        row.get("item_id"),
+                        row["name"],
+                        row["category"],
+                        row.get("description"),
+                        float(row["price"]),
+                        0 if row.get("is_available") is False else 1,
+                        ",".join(row["available_days"])
+                        if isinstance(row.get("available_days"), list)
+                        else row.get("available_days"),
+                        row.get("available_from"),
+                        row.get("available_until"),
+                    )
+                    for row in rows
+                ],
+            )
+
+    def fetch_menu_rows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM menu ORDER BY item_id").fetchall()
+        return [self._menu_row(row) for row in rows]
+
+    def insert_orders(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        stored = []
+        with self._lock, self._conn:
+            for row in rows:
+                values = dict(row, items=json.dumps(row.get("items", {})))
+                columns = [c for c in self.ORDER_INSERT_COLUMNS if c in values]
+                cursor = self._conn.execute(
+                    f"INSERT INTO orders ({', '.join(columns)})"
+                    f" VALUES ({', '.join('?' for _ in columns)})",
+                    [values[c] for c in columns],
+                )
+                stored.append(dict(row, order_id=cursor.lastrowid))
+        return stored
+
+    def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM orders WHERE order_id = ?", (order_id,)
+            ).fetchone()
+        return self._order_row(row) if row else None
+
+    def get_orders(self, order_ids: List[int]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {ORDER_NOTIFY_COLUMNS} FROM orders"
+                f" WHERE order_id IN ({', '.join('?' for _ in order_ids)})",
+                list(order_ids),
+            ).fetchall()
+        return [self._order_row(row) for row in rows]
+
+    def fetch_orders(self, phone_number, limit, cursor=None, statuses=None):
+        sql = f"SELECT {ORDER_STATUS_COLUMNS} FROM orders WHERE customer_phone_number = ?"
+        params: List[Any] = [phone_number]
+        if statuses:
+            sql += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        if cursor is not None:
+            sql += " AND order_id < ?"
+            params.append(int(cursor))
+        sql += " ORDER BY order_id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._order_row(row) for row in rows]
+
+
+class AsyncSupabaseStorage:
+    """Awaitable StorageBackend on the async Supabase client"""
+
+    def __init__(self, client=None):
+        self._supabase = client
+
+    async def _client(self):
+        if self._supabase is None:
+            from .supabase_client import get_async_supabase_client
+
+            self._supabase = await get_async_supabase_client()
+        return self._supabase
+
+    async def fetch_menu_rows(self) -> List[Dict[str, Any]]:
+        client = await self._client()
+        return (await client.table("menu").select("*").execute()).data
+
+    async def insert_orders(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        client = await self._client()
+        return (await client.table("orders").insert(rows).execute()).data
+
+    async def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        client = await self._client()
+        response = await (
+            client.table("orders").select("*").eq("order_id", order_id).single().execute()
+        )
+        return response.data
+
+    async def get_orders(self, order_ids: List[int]) -> List[Dict[str, Any]]:
+        client = await self._client()
+        query = client.table("orders").select(ORDER_NOTIFY_COLUMNS).in_("order_id", order_ids)
+        return (await query.execute()).data
+
+    async def fetch_orders(self, phone_number, limit, cursor=None, statuses=None):
+        client = await self._client()
+        query = _supabase_orders_query(client, phone_number, limit, cursor, statuses)
+        return (await query.execute()).data
+
+
+class ThreadedStorage:
+    """Awaitable wrapper running a sync StorageBackend in worker threads"""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+
+    async def fetch_menu_rows(self):
+        return await asyncio.to_thread(self.backend.fetch_menu_rows)
+
+    async def insert_orders(self, rows):
+        return await asyncio.to_thread(self.backend.insert_orders, rows)
+
+    async def get_order(self, order_id):
+        return await asyncio.to_thread(self.backend.get_order, order_id)
+
+    async def get_orders(self, order_ids):
+        return await asyncio.to_thread(self.backend.get_orders, order_ids)
+
+    async def fetch_orders(self, phone_number, limit, cursor=None, statuses=None):
+        return await asyncio.to_thread(
+            self.backend.fetch_orders, phone_number, limit, cursor, statuses
+        )
+
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def build_storage_backend(kind: str = STORAGE_BACKEND) -> StorageBackend:
+    if kind == "supabase":
+        return SupabaseStorage()
+    if kind == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+    if kind == "memory":
+        return SQLiteStorage(":memory:")
+    raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
+
+
+def get_storage_backend() -> StorageBackend:
+    """Process-wide storage backend selected by STORAGE_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_storage_backend()
+    return _backend
+
+
+def set_storage_backend(backend: Optional[StorageBackend]):
+    """Swap the process-wide backend (benchmarks, local runs)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def get_async_storage_backend():
+    backend = get_storage_backend()
+    if isinstance(backend, SupabaseStorage):
+        return AsyncSupabaseStorage()
+    return ThreadedStorage(backend)
@@ -0,0 +1,100 @@
+import os
+import threading
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from supabase import (
+    AsyncClient,
+    AsyncClientOptions,
+    Client,
+    ClientOptions,
+    acreate_client,
+    create_client,
+)
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "15"))
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+_async_client: Optional[AsyncClient] = None
+
+
+def build_supabase_client(
+    url: str = SUPABASE_URL,
+    key: str = SUPABASE_KEY,
+    pool_size: int = SUPABASE_POOL_SIZE,
+    connect_timeout: float = SUPABASE_CONNECT_TIMEOUT,
+    timeout: float = SUPABASE_TIMEOUT,
+) -> Client:
+    """Create a Supabase client backed by a pooled keep-alive HTTP client"""
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set")
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    options = ClientOptions(
+        postgrest_client_timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        httpx_client=http_client,
+    )
+    return create_client(url, key, options=options)
+
+
+def get_supabase_client() -> Client:
+    """Process-wide Supabase client shared by every service"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_supabase_client()
+    return _client
+
+
+def reset_supabase_client():
+    """Drop the shared client (e.g. after a fork) so the next call rebuilds it"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+async def build_async_supabase_client(
+    url: str = SUPABASE_URL,
+    key: str = SUPABASE_KEY,
+    pool_size: int = SUPABASE_POOL_SIZE,
+    connect_timeout: float = SUPABASE_CONNECT_TIMEOUT,
+    timeout: float = SUPABASE_TIMEOUT,
+) -> AsyncClient:
+    """Async counterpart of build_supabase_client for the ASGI app"""
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set")
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    options = AsyncClientOptions(
+        postgrest_client_timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        httpx_client=http_client,
+    )
+    return await acreate_client(url, key, options=options)
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """Process-wide async Supabase client; bound to the serving event loop"""
+    global _async_client
+    if _async_client is None:
+        client = await build_async_supabase_client()
+        # Another task may have finished building first while we awaited
+        if _async_client is None:
+            _async_client = client
+    return _async_client
@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .day_service import DayService
+from .intent_router import MENU_LINK
+
+# Total (prompt + output) tokens one chat session may use per window; 0
+# disables the budget. The window starts with the first model call after the
+# previous one ran out, so a customer who hits the limit can chat again later.
+TOKEN_BUDGET_PER_SESSION = int(os.getenv("TOKEN_BUDGET_PER_SESSION", "250000"))
+TOKEN_BUDGET_WINDOW_HOURS = float(os.getenv("TOKEN_BUDGET_WINDOW_HOURS", "6"))
+# Share of the budget after which history is compacted on every turn
+TOKEN_BUDGET_COMPACT_FRACTION = float(os.getenv("TOKEN_BUDGET_COMPACT_FRACTION", "0.6"))
+TOKEN_USAGE_DAYS_KEPT = int(os.getenv("TOKEN_USAGE_DAYS_KEPT", "31"))
+TOP_SENDERS = 10
+
+BUDGET_EXHAUSTED_REPLY = (
+    "We've covered a lot in this chat, so I can't take more requests here right now. "
+    f"You can still ask about your order status or see our menu at {MENU_LINK}. "
+    "For anything else, please message us again in a few hours. Thank you!"
+)
+
+
+def usage_from_response(response) -> Optional[Tuple[int, int, int]]:
+    """(prompt, output, total) tokens reported for a model response, or None.
+
+    Streamed responses only carry usage once they have been fully read.
+    Output includes any thinking tokens (total minus prompt) when the
+    model reports a larger total than prompt + candidates.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None or not usage.total_token_count:
+        return None
+    prompt = usage.prompt_token_count
+    total = usage.total_token_count
+    return prompt, max(usage.candidates_token_count, total - prompt), total
+
+
+class TokenUsage:
+    """Running token totals"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self.calls = 0
+
+    def add(self, prompt: int, output: int, total: int):
+        self.prompt_tokens += prompt
+        self.output_tokens += output
+        self.total_tokens += total
+        self.calls += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "model_calls": self.calls,
+        }
+
+    @classmethod
+    def from_dict(cls, counts: Dict[str, int]) -> "TokenUsage":
+        usage = cls()
+        usage.prompt_tokens = counts.get("prompt_tokens", 0)
+        usage.output_tokens = counts.get("output_tokens", 0)
+        usage.total_tokens = counts.get("total_tokens", 0)
+        usage.calls = counts.get("model_calls", 0)
+        return usage
+
+
+class SessionBudget:
+    """Token budget for one chat session, over a rolling window.
+
+    Tokens are counted from the start of the current window; once
+    window_hours have passed the count starts again from zero. Past
+    compact_fraction of the limit the history is compacted every turn to
+    slow the growth of prompt tokens; once the limit is reached the session
+    stops calling the model and answers with a polite cut-off until the
+    window ends.
+    """
+
+    def __init__(
+        self,
+        limit: int = TOKEN_BUDGET_PER_SESSION,
+        compact_fraction: float = TOKEN_BUDGET_COMPACT_FRACTION,
+        window_hours: float = TOKEN_BUDGET_WINDOW_HOURS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.limit = limit
+        self.compact_fraction = compact_fraction
+        self.window = window_hours * 3600
+        self.clock = clock
+        self.window_started: Optional[float] = None
+        self.spent = 0
+        self.cutoffs = 0
+
+    def _roll(self):
+        if self.window_started is not None and self.clock() - self.window_started >= self.window:
+            self.window_started = None
+            self.spent = 0
+
+    def charge(self, total: int):
+        """Count a model call's tokens against the current window"""
+        self._roll()
+        if self.window_started is None:
+            self.window_started = self.clock()
+        self.spent += total
+
+    def should_compact(self) -> bool:
+        self._roll()
+        return bool(self.limit) and self.spent >= self.limit * self.compact_fraction
+
+    def exhausted(self) -> bool:
+        self._roll()
+        return bool(self.limit) and self.spent >= self.limit
+
+    def resets_in(self) -> Optional[float]:
+        """Seconds until the current window ends, or None with no window open"""
+        self._roll()
+        if self.window_started is None:
+            return None
+        return max(0.0, self.window_started + self.window - self.clock())
+
+    def state(self) -> Dict[str, Any]:
+        """Kept in the session meta so hibernation and the shared store
+        carry the window over"""
+        return {"window_started": self.window_started, "spent": self.spent, "cutoffs": self.cutoffs}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.window_started = state.get("window_started")
+        self.spent = state.get("spent", 0)
+        self.cutoffs = state.get("cutoffs", 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        resets_in = self.resets_in()
+        return {
+            "limit": self.limit or None,
+            "window_hours": self.window / 3600,
+            "spent": self.spent,
+            "remaining": max(0, self.limit - self.spent) if self.limit else None,
+            "resets_in_seconds": round(resets_in) if resets_in is not None else None,
+            "compacting": self.should_compact(),
+            "exhausted": self.exhausted(),
+            "cutoffs": self.cutoffs,
+        }
+
+
+class TokenUsageLedger:
+    """Process-wide token totals per sender and per day (UAE time).
+
+    Days older than days_kept are dropped; per-sender totals are kept for
+    the life of the process.
+    """
+
+    def __init__(self, days_kept: int = TOKEN_USAGE_DAYS_KEPT):
+        self.days_kept = days_kept
+        self._lock = threading.Lock()
+        self._total = TokenUsage()
+        self._senders: Dict[str, TokenUsage] = {}
+        # day -> sender -> usage
+        self._days: Dict[str, Dict[str, TokenUsage]] = {}
+
+    @staticmethod
+    def today() -> str:
+        return DayService.now().date().isoformat()
+
+    def record(self, sender: str, prompt: int, output: int, total: int, day: Optional[str] = None):
+        day = day or self.today()
+        with self._lock:
+            self._total.add(prompt, output, total)
+            self._senders.setdefault(sender, TokenUsage()).add(prompt, output, total)
+            if day not in self._days:
+                self._days[day] = {}
+                for old in sorted(self._days)[: -self.days_kept]:
+                    del self._days[old]
+            self._days[day].setdefault(sender, TokenUsage()).add(prompt, output, total)
+
+    @staticmethod
+    def _sum(usages) -> TokenUsage:
+        combined = TokenUsage()
+        for usage in usages:
+            combined.prompt_tokens += usage.prompt_tokens
+            combined.output_tokens += usage.output_tokens
+            combined.total_tokens += usage.total_tokens
+            combined.calls += usage.calls
+        return combined
+
+    def for_sender(self, sender: str) -> Dict[str, Any]:
+        with self._lock:
+            usage = self._senders.get(sender) or TokenUsage()
+            days = {
+                day: senders[sender].to_dict()
+                for day, senders in sorted(self._days.items())
+                if sender in senders
+            }
+            return {"sender": sender, "total": usage.to_dict(), "days": days}
+
+    def for_day(self, day: Optional[str] = None) -> Dict[str, Any]:
+        day = day or self.today()
+        with self._lock:
+            senders = self._days.get(day, {})
+            ranked = sorted(senders.items(), key=lambda pair: pair[1].total_tokens, reverse=True)
+            return {
+                "day": day,
+                "total": self._sum(senders.values()).to_dict(),
+                "senders": {sender: usage.to_dict() for sender, usage in ranked},
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        today = self.today()
+        with self._lock:
+            ranked = sorted(self._senders.items(), key=lambda pair: pair[1].total_tokens, reverse=True)
+            return {
+                "total": self._total.to_dict(),
+                "today": self._sum(self._days.get(today, {}).values()).to_dict(),
+                "days": {
+                    day: self._sum(senders.values()).total_tokens
+                    for day, senders in sorted(self._days.items())
+                },
+                "senders": len(self._senders),
+                "top_senders": {
+                    sender: usage.total_tokens for sender, usage in ranked[:TOP_SENDERS]
+                },
+                "session_budget": TOKEN_BUDGET_PER_SESSION or None,
+                "session_budget_window_hours": TOKEN_BUDGET_WINDOW_HOURS,
+            }
+
+
+token_usage = TokenUsageLedger()
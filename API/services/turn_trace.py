@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .reply_stream import percentile
+
+TURN_TRACE_ENABLED = os.getenv("TURN_TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TURN_TRACE_BUFFER_SIZE = int(os.getenv("TURN_TRACE_BUFFER_SIZE", "500"))
+# JSONL sink, one trace per line; unset keeps traces in the ring buffer only
+TURN_TRACE_PATH = os.getenv("TURN_TRACE_PATH")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("turn_trace", default=None)
+
+
+class Trace:
+    """Timed spans for one conversation turn.
+
+    Span offsets and durations are in milliseconds from the start of the
+    turn. Spans may be recorded from worker threads (tool calls run
+    concurrently), so the list is only appended to.
+    """
+
+    def __init__(self, sender: Optional[str] = None, started: Optional[float] = None):
+        now = time.perf_counter()
+        self._started = started if started is not None else now
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.sender = sender
+        self.timestamp = time.time() - (now - self._started)
+        self.attrs: Dict[str, Any] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self.total_ms: Optional[float] = None
+
+    def record(self, name: str, started: float, ended: float, attrs: Optional[Dict[str, Any]] = None):
+        span = {
+            "name": name,
+            "start_ms": round((started - self._started) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+        }
+        if attrs:
+            span["attrs"] = attrs
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": self.timestamp,
+            "sender": self.sender,
+            "total_ms": self.total_ms,
+            "attrs": self.attrs,
+            "spans": list(self.spans),
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a span of the current turn; a no-op outside a turn.
+
+    The yielded dict can be filled with attributes while the block runs.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        trace.record(name, started, time.perf_counter(), attrs)
+
+
+def record_span(name: str, started: float, ended: Optional[float] = None, **attrs):
+    """Record a span timed by the caller (perf_counter values), for work that
+    cannot sit inside a with block, e.g. across a generator's yields"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, started, ended if ended is not None else time.perf_counter(), attrs)
+
+
+def in_current_trace(fn: Callable) -> Callable:
+    """Bind fn to the caller's trace so spans it records in an executor thread
+    land in the same turn (ThreadPoolExecutor does not copy context)"""
+    return lambda *args, **kwargs: copy_context().run(fn, *args, **kwargs)
+
+
+def summarize(traces: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Count, total time and p50/p95/p99/max duration per span name, plus
+    "turn" for whole turns. A span repeated in one turn counts each time."""
+    durations: Dict[str, List[float]] = {}
+    for trace in traces:
+        if trace.get("total_ms") is not None:
+            durations.setdefault("turn", []).append(trace["total_ms"])
+        for item in trace.get("spans", []):
+            durations.setdefault(item["name"], []).append(item["duration_ms"])
+
+    return {
+        name: {
+            "count": len(values),
+            "total_ms": round(sum(values), 1),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": round(max(values), 1),
+        }
+        for name, values in sorted(durations.items())
+    }
+
+
+class TurnTracer:
+    """Collects one Trace per conversation turn.
+
+    Finished traces go to an in-memory ring buffer (for /health and ad-hoc
+    inspection) and, when a path is configured, are appended to a JSONL
+    file that trace_report.py summarizes.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = TURN_TRACE_BUFFER_SIZE,
+        path: Optional[str] = TURN_TRACE_PATH,
+        enabled: bool = TURN_TRACE_ENABLED,
+    ):
+        self.enabled = enabled
+        self.path = path
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._sink = None
+        self.turns = 0
+        self.sink_errors = 0
+
+    @contextmanager
+    def turn(self, sender: Optional[str] = None, started: Optional[float] = None):
+        """Trace everything in the block as one turn.
+
+        Yields the Trace (None when tracing is off). started (perf_counter)
+        backdates the turn, e.g. to when a queued webhook arrived. Set
+        trace.sender once the message is parsed; a trace without one, such
+        as a status-only webhook, is dropped.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(sender, started)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            trace.total_ms = round((time.perf_counter() - trace._started) * 1000, 2)
+            if trace.sender is not None:
+                self._finish(trace)
+
+    def _finish(self, trace: Trace):
+        record = trace.to_dict()
+        with self._lock:
+            self._buffer.append(record)
+            self.turns += 1
+            if self.path:
+                self._write(record)
+
+    def _write(self, record: Dict[str, Any]):
+        try:
+            if self._sink is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._sink = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._sink.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            self.sink_errors += 1
+            print(f"Turn trace write failed: {e}")
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest traces last"""
+        with self._lock:
+            traces = list(self._buffer)
+        return traces[-limit:] if limit else traces
+
+    def stats(self) -> Dict[str, Any]:
+        summary = summarize(self.recent())
+        return {
+            "enabled": self.enabled,
+            "turns": self.turns,
+            "sink": self.path,
+            "sink_errors": self.sink_errors,
+            "spans": {
+                name: {key: values[key] for key in ("count", "p50_ms", "p95_ms")}
+                for name, values in summary.items()
+            },
+        }
+
+    def close(self):
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+
+
+def load_traces(path: str) -> List[Dict[str, Any]]:
+    traces = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                traces.append(json.loads(line))
+    return traces
+
+
+turn_tracer = TurnTracer()
@@ -1,12 +1,89 @@
+import asyncio
 import os
 import hmac
 import hashlib
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from dotenv import load_dotenv
-from typing import Dict, Optional
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Tuple
+from .graph_client import AsyncGraphClient, GraphClient, messages_url
 from .llm_service import LLMService
+from .reply_stream import (
+    STREAM_FIRST_MESSAGE_CHARS,
+    WHATSAPP_MAX_MESSAGE_CHARS,
+    ReplyTimings,
+    SentenceChunker,
+)
+from .message_dedup import MessageDeduplicator
+from .intent_router import detect_language
+from .outbound_queue import CHAT, build_outbound_queue
+from .session_store import SessionStore
+from .shared_sessions import SessionUnavailable, build_shared_sessions
+from .sender_queue import WEBHOOK_ASYNC_ACK, AsyncSenderQueues, SenderQueues
+from .turn_trace import record_span, span, turn_tracer
 
 load_dotenv()
+WHATSAPP_STREAM_REPLIES = os.getenv("WHATSAPP_STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+# Times a queued message goes back on its sender's queue when the shared
+# session cannot be locked or loaded; after that the customer is asked to
+# send it again
+WEBHOOK_SESSION_RETRIES = int(os.getenv("WEBHOOK_SESSION_RETRIES", "1"))
+
+SESSION_UNAVAILABLE_REPLY = {
+    "en": "Sorry, we couldn't handle your message just now. Please send it again in a moment.",
+    "ar": "عذراً، لم نتمكن من معالجة رسالتك الآن. يرجى إرسالها مرة أخرى بعد قليل.",
+}
+
+
+class InboundMessage:
+    """A customer text message taken off a webhook, with perf_counter
+    timestamps for when the webhook arrived and finished parsing.
+
+    Several messages from one sender can be merged into a single turn;
+    `count` is how many went into it. `attempts` counts the times it was
+    put back on the queue because its turn could not start.
+    """
+
+    def __init__(
+        self,
+        sender: str,
+        text: str,
+        received: float,
+        parsed: float,
+        message_id: Optional[str] = None,
+        count: int = 1,
+        attempts: int = 0,
+    ):
+        self.sender = sender
+        self.text = text
+        self.message_id = message_id
+        self.received = received
+        self.parsed = parsed
+        self.count = count
+        self.attempts = attempts
+
+    def retried(self) -> "InboundMessage":
+        return InboundMessage(
+            self.sender, self.text, self.received, self.parsed, self.message_id, self.count, self.attempts + 1
+        )
+
+    @classmethod
+    def merge(cls, messages: List["InboundMessage"]) -> "InboundMessage":
+        """One message with the texts in arrival order, one per line, timed
+        from the first arrival"""
+        if len(messages) == 1:
+            return messages[0]
+        first = messages[0]
+        return cls(
+            first.sender,
+            "\n".join(message.text for message in messages),
+            first.received,
+            first.parsed,
+            messages[-1].message_id,
+            sum(message.count for message in messages),
+            max(message.attempts for message in messages),
+        )
 
 
 class WhatsAppService:
@@ -15,12 +92,38 @@ class WhatsAppService:
         self.access_token = os.getenv("WHATSAPP_ACCESS_TOKEN")
         self.app_secret = os.getenv("WHATSAPP_APP_SECRET")
         self.verify_token = os.getenv("VERIFY_TOKEN")
-        self.graph_url = (
-            f"https://graph.facebook.com/v20.0/{self.phone_number_id}/messages"
+        self.graph_url = messages_url(self.phone_number_id)
+        # Keep-alive connection pools, shared by every reply and notification
+        self.graph = GraphClient(self.graph_url, self.access_token)
+        self.async_graph = AsyncGraphClient(self.graph_url, self.access_token)
+        # Durable, rate-limited outbound queue (None: send inline)
+        self.outbound = build_outbound_queue(self.graph_url, self.access_token)
+
+        # Conversations shared with other worker processes (None: this
+        # process keeps its own)
+        self.shared_sessions = build_shared_sessions()
+
+        # Live sessions are capped; idle ones are hibernated to their history,
+        # or just released when the shared store already holds it
+        self.chat_sessions = SessionStore(
+            LLMService.restore, keep_hibernated=self.shared_sessions is None
         )
 
-        # Store active chat sessions (in production, use Redis or database)
-        self.chat_sessions = {}
+        self.stream_replies = WHATSAPP_STREAM_REPLIES
+        self.reply_timings = ReplyTimings()
+
+        # Turns run on workers, in order per sender, after the webhook is
+        # acked; messages a sender sends in quick succession share one turn
+        self.async_ack = WEBHOOK_ASYNC_ACK
+        self.queue = SenderQueues(self.handle_message, merge=InboundMessage.merge)
+        self.async_queue = AsyncSenderQueues(self.handle_message_async, merge=InboundMessage.merge)
+
+        # WhatsApp message ids already taken in, so redeliveries are dropped
+        # before they cost a model call or a second order; with a shared
+        # store, whichever worker the redelivery lands on
+        self.dedup = MessageDeduplicator(
+            store=self.shared_sessions.backend if self.shared_sessions is not None else None
+        )
 
     def verify_webhook(self, mode: str, token: str, challenge: str) -> tuple:
         """Verify webhook for WhatsApp"""
@@ -45,34 +148,85 @@ class WhatsAppService:
             print(f"Signature verification error: {e}")
             return False
 
-    def process_webhook_event(self, data: Dict) -> str:
-        """Process incoming WhatsApp message"""
-        try:
-            entry = data["entry"][0]
-            changes = entry["changes"][0]["value"]
-            messages = changes.get("messages")
+    @staticmethod
+    def _extract_messages(data: Dict) -> List[Tuple[str, str, Optional[str]]]:
+        """(sender, text, message id) of every text message in the payload,
+        across all entries and changes; status updates carry none"""
+        extracted = []
+        for entry in data.get("entry", []):
+            for change in entry.get("changes", []):
+                for msg in change.get("value", {}).get("messages") or []:
+                    text = msg.get("text", {}).get("body")
+                    if text is None:
+                        print(f"⚠️ Ignoring {msg.get('type', 'unknown')} message from {msg.get('from')}")
+                        continue
+                    extracted.append((msg["from"], text, msg.get("id")))
+        return extracted
 
-            if messages:
-                msg = messages[0]
-                sender = msg["from"]
-                text = msg["text"]["body"]
+    def _get_session(self, sender: str) -> LLMService:
+        """Get or create chat session for this user"""
+        def create():
+            print(f"🆕 Creating new chat session for {sender}")
+            return LLMService(sender)
 
-                print(f"User: {text}")
+        with span("session.lookup") as attrs:
+            llm, attrs["source"] = self.chat_sessions.get_or_create(sender, create)
+            return llm
 
-                # Get or create chat session for this user
-                if sender not in self.chat_sessions:
-                    print(f"🆕 Creating new chat session for {sender}")
-                    self.chat_sessions[sender] = LLMService(sender)
+    def _parse_webhook(self, data: Dict) -> List[InboundMessage]:
+        received = time.perf_counter()
+        extracted = self._extract_messages(data)
+        parsed = time.perf_counter()
+        return [
+            InboundMessage(sender, text, received, parsed, message_id)
+            for sender, text, message_id in extracted
+        ]
 
-                # Get response from LLM
-                llm = self.chat_sessions[sender]
-                response = llm.chat(text)
+    def _new_messages(self, data: Dict) -> List[InboundMessage]:
+        return [message for message in self._parse_webhook(data) if not self._is_duplicate(message)]
 
-                # Send response back
-                self.send_message(sender, response)
-                print(f"Bot: {response}")
+    @staticmethod
+    def _by_sender(messages: List[InboundMessage]) -> List[InboundMessage]:
+        """One merged message per sender, senders in order of first message"""
+        grouped: Dict[str, List[InboundMessage]] = {}
+        for message in messages:
+            grouped.setdefault(message.sender, []).append(message)
+        return [InboundMessage.merge(group) for group in grouped.values()]
 
-            return "EVENT_RECEIVED"
+    def _submit_all(self, queue, messages: List[InboundMessage]) -> str:
+        busy = False
+        for message in messages:
+            if not queue.submit(message.sender, message):
+                print(f"⚠️ Webhook queue full, deferring message from {message.sender}")
+                # Let the redelivery through; messages already queued are
+                # recognised as duplicates then
+                self.dedup.release(message.message_id)
+                busy = True
+        return "BUSY" if busy else "EVENT_RECEIVED"
+
+    def _is_duplicate(self, message: InboundMessage) -> bool:
+        if not self.dedup.check(message.message_id):
+            return False
+        print(f"🔁 Dropping redelivered message {message.message_id} from {message.sender}")
+        return True
+
+    def process_webhook_event(self, data: Dict) -> str:
+        """Process every incoming WhatsApp message in a webhook payload.
+
+        Redeliveries of a message id already taken in are acknowledged and
+        dropped. With async ack each message is queued for a webhook worker,
+        which merges a sender's rapid messages into one turn, and this
+        returns straight away; BUSY means the queue is full and the webhook
+        should not be acknowledged, so WhatsApp redelivers it later. Inline,
+        each sender's messages in the payload make one turn.
+        """
+        try:
+            messages = self._new_messages(data)
+            if not self.async_ack:
+                for message in self._by_sender(messages):
+                    self.handle_message(message.sender, message)
+                return "EVENT_RECEIVED"
+            return self._submit_all(self.queue, messages)
 
         except Exception as e:
             print(f"❌ Error processing message: {e}")
@@ -81,30 +235,261 @@ class WhatsAppService:
             traceback.print_exc()
             return "ERROR"
 
-    def send_message(self, to: str, text: str) -> Dict:
-        """Send a WhatsApp message"""
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
-
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": to,
-            "type": "text",
-            "text": {"body": text},
-        }
-
+    async def process_webhook_event_async(self, data: Dict) -> str:
+        """Async variant of process_webhook_event for the ASGI app"""
         try:
-            response = requests.post(self.graph_url, headers=headers, json=payload)
-            print(f"📤 Send Message Response: {response.status_code}")
-            return response.json()
+            messages = self._new_messages(data)
+            if not self.async_ack:
+                await asyncio.gather(*(
+                    self.handle_message_async(message.sender, message)
+                    for message in self._by_sender(messages)
+                ))
+                return "EVENT_RECEIVED"
+            return self._submit_all(self.async_queue, messages)
+
         except Exception as e:
-            print(f"❌ Error sending message: {e}")
-            return {"error": str(e)}
+            print(f"❌ Error processing message: {e}")
+            import traceback
+
+            traceback.print_exc()
+            return "ERROR"
+
+    @contextmanager
+    def _synced(self, sender: str, llm: LLMService):
+        """Load what other workers added to the conversation before the turn
+        and save what it added afterwards"""
+        if self.shared_sessions is None:
+            yield
+            return
+        with self.shared_sessions.turn(sender, llm):
+            yield
+
+    @asynccontextmanager
+    async def _synced_async(self, sender: str, llm: LLMService):
+        if self.shared_sessions is None:
+            yield
+            return
+        async with self.shared_sessions.aturn(sender, llm):
+            yield
+
+    def _requeue(self, queue, message: InboundMessage, error: Exception) -> bool:
+        """Put a message whose turn could not start back on its sender's
+        queue, after anything they sent meanwhile. False when it has used
+        its retries or was handled inline, and the customer has to be told."""
+        print(f"⚠️ Session for {message.sender} unavailable: {error}")
+        if not self.async_ack or message.attempts >= WEBHOOK_SESSION_RETRIES:
+            return False
+        if not queue.submit(message.sender, message.retried()):
+            return False
+        print(f"🔁 Requeued message from {message.sender}")
+        return True
+
+    @staticmethod
+    def _unavailable_reply(message: InboundMessage) -> str:
+        return SESSION_UNAVAILABLE_REPLY[detect_language(message.text)]
+
+    @staticmethod
+    def _trace_arrival(message: InboundMessage):
+        record_span("webhook.parse", message.received, message.parsed)
+        record_span("queue.wait", message.parsed, messages=message.count)
+
+    def handle_message(self, sender: str, message: InboundMessage):
+        """Run one conversation turn: LLM reply (with tools) sent back over
+        WhatsApp. Called by a webhook worker, one message per sender at a time."""
+        with turn_tracer.turn(sender, message.received), self.chat_sessions.pinned(sender):
+            self._trace_arrival(message)
+            try:
+                print(f"User: {message.text}")
+
+                # Get response from LLM and send it back
+                llm = self._get_session(sender)
+                with self._synced(sender, llm):
+                    if self.stream_replies:
+                        response = self._send_streamed(
+                            sender, llm.chat_stream(message.text), message.received
+                        )
+                    else:
+                        response = self._send_streamed(
+                            sender, [llm.chat(message.text)], message.received, WHATSAPP_MAX_MESSAGE_CHARS
+                        )
+                print(f"Bot: {response}")
+
+            except SessionUnavailable as e:
+                # The webhook is acked and the id recorded: retry or say so,
+                # never drop the message silently
+                if not self._requeue(self.queue, message, e):
+                    self.send_message(sender, self._unavailable_reply(message))
+
+            except Exception as e:
+                print(f"❌ Error processing message: {e}")
+                import traceback
+
+                traceback.print_exc()
+
+    async def handle_message_async(self, sender: str, message: InboundMessage):
+        with turn_tracer.turn(sender, message.received), self.chat_sessions.pinned(sender):
+            self._trace_arrival(message)
+            try:
+                print(f"User: {message.text}")
+
+                # Creating or rehydrating a session may fetch the menu and
+                # build the model, so only a live session is looked up inline
+                if self.chat_sessions.peek(sender) is not None:
+                    with span("session.lookup", source="live"):
+                        llm = self.chat_sessions[sender]
+                else:
+                    llm = await asyncio.to_thread(self._get_session, sender)
+                async with self._synced_async(sender, llm):
+                    if self.stream_replies:
+                        chunks = llm.achat_stream(message.text)
+                    else:
+                        chunks = self._single_chunk(await llm.achat(message.text))
+                    response = await self._send_streamed_async(
+                        sender,
+                        chunks,
+                        message.received,
+                        None if self.stream_replies else WHATSAPP_MAX_MESSAGE_CHARS,
+                    )
+                print(f"Bot: {response}")
+
+            except SessionUnavailable as e:
+                if not self._requeue(self.async_queue, message, e):
+                    await self.send_message_async(sender, self._unavailable_reply(message))
+
+            except Exception as e:
+                print(f"❌ Error processing message: {e}")
+                import traceback
+
+                traceback.print_exc()
+
+    def _send_streamed(
+        self,
+        sender: str,
+        chunks: Iterable[str],
+        started: float,
+        first_message_chars: Optional[int] = None,
+    ) -> str:
+        """Send reply text as it arrives, one message per complete chunk, and
+        record time-to-first-message separately from the whole turn.
+
+        A complete reply is passed as a single chunk with first_message_chars
+        at the WhatsApp limit, so it is only split when it must be."""
+        first_message_ms = None
+        chunker = SentenceChunker(first_message_chars or STREAM_FIRST_MESSAGE_CHARS)
+        parts = []
+
+        def deliver(messages):
+            nonlocal first_message_ms
+            for message in messages:
+                self.send_message(sender, message)
+                if first_message_ms is None:
+                    first_message_ms = (time.perf_counter() - started) * 1000
+
+        for text in chunks:
+            parts.append(text)
+            deliver(chunker.feed(text))
+        deliver(chunker.flush())
+
+        self.reply_timings.record(first_message_ms, (time.perf_counter() - started) * 1000)
+        return "".join(parts)
+
+    async def _send_streamed_async(
+        self,
+        sender: str,
+        chunks: AsyncIterable[str],
+        started: float,
+        first_message_chars: Optional[int] = None,
+    ) -> str:
+        first_message_ms = None
+        chunker = SentenceChunker(first_message_chars or STREAM_FIRST_MESSAGE_CHARS)
+        parts = []
+
+        async def deliver(messages):
+            nonlocal first_message_ms
+            for message in messages:
+                await self.send_message_async(sender, message)
+                if first_message_ms is None:
+                    first_message_ms = (time.perf_counter() - started) * 1000
+
+        async for text in chunks:
+            parts.append(text)
+            await deliver(chunker.feed(text))
+        await deliver(chunker.flush())
+
+        self.reply_timings.record(first_message_ms, (time.perf_counter() - started) * 1000)
+        return "".join(parts)
+
+    @staticmethod
+    async def _single_chunk(text: str):
+        yield text
+
+    def use_graph_url(self, url: str):
+        """Point outbound sends at another messages endpoint (a local stub
+        Graph server in benchmarks)"""
+        self.graph_url = url
+        self.graph = GraphClient(url, self.access_token)
+        self.async_graph = AsyncGraphClient(url, self.access_token)
+        if self.outbound is not None:
+            self.outbound.use_graph_url(url, self.access_token)
+
+    def send_message(self, to: str, text: str, priority: str = CHAT) -> Dict:
+        """Send a WhatsApp message over the pooled Graph client, retrying
+        429/5xx with backoff. With the outbound queue on, the message is
+        journaled and sent in priority order instead."""
+        if self.outbound is not None:
+            return {"queued": self.outbound.enqueue(to, text, priority)}
+        result = self.graph.send(to, text)
+        self._log_send(result)
+        return result
+
+    async def send_message_async(self, to: str, text: str, priority: str = CHAT) -> Dict:
+        """Send a WhatsApp message without blocking the event loop"""
+        if self.outbound is not None:
+            message_id = await asyncio.to_thread(self.outbound.enqueue, to, text, priority)
+            return {"queued": message_id}
+        result = await self.async_graph.send(to, text)
+        self._log_send(result)
+        return result
+
+    def send_many(self, messages: List[Tuple[str, str]], priority: str = CHAT) -> List[Dict]:
+        """Send (to, text) pairs concurrently, up to the Graph client's
+        connection limit; results come back in the same order"""
+        if not messages:
+            return []
+
+        def send(message: Tuple[str, str]) -> Dict:
+            try:
+                return self.send_message(message[0], message[1], priority)
+            except Exception as e:
+                return {"error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=min(len(messages), self.graph.max_connections)) as pool:
+            return list(pool.map(send, messages))
+
+    async def send_many_async(self, messages: List[Tuple[str, str]], priority: str = CHAT) -> List[Dict]:
+        """send_many for the event loop; the async client bounds concurrency"""
+        async def send(message: Tuple[str, str]) -> Dict:
+            try:
+                return await self.send_message_async(message[0], message[1], priority)
+            except Exception as e:
+                return {"error": str(e)}
+
+        return list(await asyncio.gather(*(send(message) for message in messages)))
+
+    @staticmethod
+    def _log_send(result: Dict):
+        if "error" in result:
+            print(f"❌ Error sending message: {result['error']}")
+        else:
+            print("📤 Message sent")
+
+    def get_session_usage(self, sender: str) -> Optional[Dict]:
+        """Token usage and budget of the sender's active chat session"""
+        llm = self.chat_sessions.peek(sender)
+        return llm.usage_stats() if llm else None
 
     def get_active_sessions_count(self) -> int:
-        """Get count of active chat sessions"""
+        """Get count of live (not hibernated) chat sessions"""
         return len(self.chat_sessions)
 
 
@@ -22,8 +22,11 @@ def main():
         if not user_input:
             continue
             
-        response = llm_service.chat(user_input)
-        print(f"\nBot: {response}\n")
+        # Stream the reply so the first words show as soon as they arrive
+        print("\nBot: ", end="", flush=True)
+        for chunk in llm_service.chat_stream(user_input):
+            print(chunk, end="", flush=True)
+        print("\n")
 
 if __name__ == "__main__":
     main()
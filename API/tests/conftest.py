@@ -0,0 +1,4 @@
+import os
+
+# Services build Gemini models at import time; tests never call the API
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+
+class FlaskClient:
+    def __init__(self):
+        from app import app
+
+        self.client = app.test_client()
+
+    def request(self, method, path, **kwargs):
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, response.get_json()
+
+
+class QuartClient:
+    def __init__(self):
+        from asgi import app
+
+        self.client = app.test_client()
+
+    def request(self, method, path, **kwargs):
+        async def call():
+            response = await self.client.open(path, method=method, **kwargs)
+            return response.status_code, await response.get_json()
+
+        return asyncio.run(call())
+
+
+@pytest.fixture(params=[FlaskClient, QuartClient], ids=["flask", "asgi"])
+def client(request):
+    return request.param()
+
+
+@pytest.mark.parametrize(
+    "method, path, kwargs, status, error",
+    [
+        ("GET", "/chat/order-status", {}, 400, "phone_number is required"),
+        ("GET", "/chat/order-history", {"query_string": {"phone_number": "1", "limit": "x"}}, 400,
+         "limit and cursor must be integers"),
+        ("GET", "/chat/usage", {"query_string": {"date": "18/10/2026"}}, 400, "date must be YYYY-MM-DD"),
+        ("POST", "/chat/place-order", {"json": {"items": {}}}, 400,
+         "Missing required fields: ['delivery_address', 'phone_number']"),
+        ("POST", "/chat/notify-status", {"json": {"status": "ON_ROUTE"}}, 400, "order_id is required"),
+        ("POST", "/chat/notify-status/bulk", {"json": {"order_ids": "1,2"}}, 400,
+         "order_ids must be a non-empty list of order ids"),
+        ("POST", "/call/webhook", {"json": {"call": {}}}, 400, "call_id is required"),
+        ("POST", "/call/place-order", {"json": {"call": {"call_id": "c-1"}, "args": {"items": {"Burger": 1}}}}, 400,
+         "delivery_address is required"),
+        ("POST", "/call/send-menu", {"json": {"call": {"call_id": "c-unknown"}}}, 400,
+         "No phone number for call_id: c-unknown"),
+    ],
+)
+def test_both_stacks_reject_bad_requests_alike(client, method, path, kwargs, status, error):
+    assert client.request(method, path, **kwargs) == (status, {"error": error})
+
+
+def test_both_stacks_register_and_end_calls(client):
+    call = {"call": {"call_id": "c-1", "from_number": "971500000001"}}
+    status, body = client.request("POST", "/call/webhook", json=call)
+    assert (status, body["phone_number"]) == (200, "971500000001")
+
+    status, body = client.request("POST", "/call/webhook", json=dict(call, event="call_ended"))
+    assert (status, body) == (200, {"message": "Call ended", "call_id": "c-1"})
+
+
+def test_both_stacks_report_health(client):
+    status, body = client.request("GET", "/health")
+    assert status == 200
+    assert body["status"] == "healthy"
+    assert {"webhook_queue", "graph_client", "webhook_dedup", "order_writer"} <= set(body)
@@ -0,0 +1,249 @@
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+
+from benchmarks.stub_graph import StubGraphServer
+from services.graph_client import AsyncGraphClient, GraphClient
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault("latency", 0.0)
+        server = StubGraphServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def client_for(url, **kwargs):
+    kwargs.setdefault("retry_base", 0.01)
+    kwargs.setdefault("retry_max", 0.05)
+    return GraphClient(url, "token", **kwargs)
+
+
+def record_backoffs(client, monkeypatch):
+    backoffs = []
+    backoff = client._backoff
+
+    def recording(attempt, response):
+        delay = backoff(attempt, response)
+        backoffs.append((attempt, delay))
+        return delay
+
+    monkeypatch.setattr(client, "_backoff", recording)
+    return backoffs
+
+
+def test_sends_and_returns_the_graph_response(stub):
+    graph = stub()
+    client = client_for(graph.url)
+    body = client.send("971500000001", "Your order is on its way")
+    assert body["messages"][0]["id"] == "wamid.stub1"
+    assert graph.delivered[0][1:] == ("971500000001", "Your order is on its way")
+    assert client.stats()["sent"] == 1
+
+
+def test_5xx_and_429_are_retried_with_backoff_then_given_up(stub, monkeypatch):
+    graph = stub(error_rate=1.0)
+    client = client_for(graph.url, max_retries=3)
+    backoffs = record_backoffs(client, monkeypatch)
+
+    result = client.deliver({"to": "971500000001", "text": {"body": "hi"}})
+
+    assert not result.ok
+    assert result.status in (429, 503)
+    assert result.retryable
+    assert graph.requests == 4
+    assert [attempt for attempt, _ in backoffs] == [0, 1, 2]
+    assert all(0 <= delay <= 0.05 for _, delay in backoffs)
+    stats = client.stats()
+    assert (stats["failed"], stats["retries"]) == (1, 3)
+    assert sum(stats["statuses"].values()) == 4
+
+
+class Clock:
+    """Stands in for the stub's rate-limit clock; only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_retry_after_is_honoured_and_the_retry_succeeds(stub, monkeypatch):
+    clock = Clock()
+    graph = stub(rate_limit=1, clock=clock)
+    client = client_for(graph.url, retry_max=1.5)
+    backoffs = []
+
+    def wait(attempt, response):
+        delay = client._retry_after(response)
+        backoffs.append(delay)
+        # Sleeping out Retry-After moves the stub into its next window
+        clock.now += delay
+        return 0
+
+    monkeypatch.setattr(client, "_backoff", wait)
+
+    client.send("971500000001", "first")
+    result = client.deliver({"to": "971500000002", "text": {"body": "second"}})
+
+    assert result.ok
+    assert graph.throttled == 1
+    assert backoffs == [1.0]
+    assert [to for _, to, _ in graph.delivered] == ["971500000001", "971500000002"]
+
+
+def test_retry_after_is_capped_at_retry_max(stub):
+    client = client_for(stub().url, retry_max=0.5)
+    response = httpx.Response(429, headers={"Retry-After": "30"})
+    assert client._backoff(0, response) == 0.5
+
+
+def test_4xx_is_not_retried(stub, monkeypatch):
+    graph = stub()
+    client = client_for(graph.url, max_retries=3)
+    backoffs = record_backoffs(client, monkeypatch)
+
+    result = client.deliver({"to": "not-a-number", "text": {"body": "hi"}})
+
+    assert result.status == 400
+    assert not result.retryable
+    assert graph.requests == 1
+    assert backoffs == []
+    assert client.stats()["retries"] == 0
+
+
+def test_read_timeout_applies_and_is_not_retried(stub):
+    graph = stub(latency=1.0)
+    client = client_for(graph.url, timeout=0.1, max_retries=3)
+
+    start = time.perf_counter()
+    result = client.deliver({"to": "971500000001", "text": {"body": "hi"}})
+    elapsed = time.perf_counter() - start
+
+    # The message may already be on its way, so no second attempt
+    assert result.status is None
+    assert not result.retryable
+    assert client.stats()["statuses"] == {"ReadTimeout": 1}
+    assert elapsed < 0.8
+
+
+@pytest.fixture
+def unaccepting_port():
+    """A listener whose accept queue is full: new connects hang"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    fillers = []
+    for _ in range(3):
+        filler = socket.socket()
+        filler.setblocking(False)
+        try:
+            filler.connect(("127.0.0.1", port))
+        except BlockingIOError:
+            pass
+        fillers.append(filler)
+    time.sleep(0.05)
+    yield port
+    for sock in fillers + [listener]:
+        sock.close()
+
+
+def test_connect_timeout_applies_and_is_retried(unaccepting_port):
+    client = client_for(f"http://127.0.0.1:{unaccepting_port}/v20.0/stub/messages", connect_timeout=0.2, max_retries=1)
+
+    start = time.perf_counter()
+    result = client.deliver({"to": "971500000001", "text": {"body": "hi"}})
+    elapsed = time.perf_counter() - start
+
+    assert result.status is None
+    assert result.retryable
+    assert client.stats()["statuses"] == {"connect_error": 2}
+    assert elapsed < 3
+
+
+def test_refused_connection_is_retried():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = client_for(f"http://127.0.0.1:{port}/v20.0/stub/messages", max_retries=2)
+
+    result = client.deliver({"to": "971500000001", "text": {"body": "hi"}})
+
+    assert result.retryable
+    assert client.stats()["statuses"] == {"connect_error": 3}
+
+
+def test_connections_are_reused(stub):
+    graph = stub()
+    client = client_for(graph.url, max_connections=4)
+    for i in range(30):
+        client.send("971500000001", f"message {i}")
+    assert graph.messages == 30
+    assert graph.connections == 1
+
+
+def test_concurrent_sends_stay_within_the_bound(stub):
+    graph = stub(latency=0.05)
+    client = client_for(graph.url, max_connections=4)
+    peak = 0
+    done = threading.Event()
+
+    def watch():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, client.stats()["in_flight"])
+            time.sleep(0.002)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    start = time.perf_counter()
+    senders = [threading.Thread(target=client.send, args=("971500000001", f"m{i}")) for i in range(20)]
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+
+    assert graph.messages == 20
+    assert 1 <= peak <= 4
+    assert graph.connections <= 4
+    # 20 sends, 4 at a time, 50 ms each
+    assert elapsed >= 0.25
+
+
+def test_async_client_retries_and_reuses_connections(stub):
+    graph = stub()
+    failing = stub(error_rate=1.0)
+
+    async def main():
+        client = AsyncGraphClient(graph.url, "token", max_connections=3, retry_base=0.01, retry_max=0.05)
+        bodies = await asyncio.gather(*(client.send("971500000001", f"m{i}") for i in range(12)))
+        await client.aclose()
+
+        retrying = AsyncGraphClient(failing.url, "token", max_retries=2, retry_base=0.01, retry_max=0.05)
+        result = await retrying.deliver({"to": "971500000001", "text": {"body": "hi"}})
+        await retrying.aclose()
+        return client, bodies, result
+
+    client, bodies, result = asyncio.run(main())
+
+    assert all("messages" in body for body in bodies)
+    assert graph.connections <= 3
+    assert client.stats()["sent"] == 12
+    assert result.retryable and failing.requests == 3
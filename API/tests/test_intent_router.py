@@ -0,0 +1,105 @@
+import pytest
+
+from benchmarks.intent_routing import SAMPLES
+from services.intent_router import IntentRouter
+
+router = IntentRouter(enabled=True)
+
+
+def answered(message):
+    match = router.classify(message)
+    return match.intent if match.confidence >= router.threshold else None
+
+
+@pytest.mark.parametrize("message, expected", SAMPLES)
+def test_labelled_samples(message, expected):
+    assert answered(message) == expected
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        # An item, a price or a second clause needs the model
+        "Do you have shawarma on the menu?",
+        "what specials do you have today and how much is the burger",
+        "whats the special today, and is the mango shake on it?",
+        "menu? also is the karak tea sweet",
+        "send me the menu and 2 burgers",
+        "where is my order, I also want to add fries",
+        "today's special is it spicy?",
+    ],
+)
+def test_extra_content_goes_to_the_llm(message):
+    assert answered(message) is None
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("hi, menu please", "menu"),
+        ("Menu!", "menu"),
+        ("hello where is my order?", "order_status"),
+        ("what specials do you have today", "today_specials"),
+        ("today's specials?", "today_specials"),
+    ],
+)
+def test_short_whole_message_forms_are_answered(message, expected):
+    assert answered(message) == expected
+
+
+class UnreachableOrders:
+    def get_order_status(self, phone_number, limit, statuses):
+        raise RuntimeError("database unreachable")
+
+
+class MenuOnlyHandler:
+    phone_number = "971500000001"
+    db_service = UnreachableOrders()
+
+
+def test_route_falls_back_to_llm_when_the_answer_fails():
+    local = IntentRouter(enabled=True)
+    assert local.route("where is my order", MenuOnlyHandler()) is None
+    assert local.route("menu please", MenuOnlyHandler()) is not None
+    assert local.stats()["by_intent"] == {"menu": 1}
+
+
+def test_disabled_router_answers_nothing():
+    assert IntentRouter(enabled=False).route("menu", MenuOnlyHandler()) is None
+
+
+class Orders:
+    def __init__(self, orders):
+        self.orders = orders
+        self.asked = None
+
+    def get_order_status(self, phone_number, limit, statuses):
+        self.asked = (phone_number, statuses)
+        return [order for order in self.orders if order["status"] in statuses][:limit]
+
+
+class OrdersHandler:
+    phone_number = "971500000001"
+
+    def __init__(self, *orders):
+        self.db_service = Orders(list(orders))
+
+
+ON_ROUTE = {"order_id": 4812, "status": "ON_ROUTE", "items": {"Karak Tea": 2, "French Fries": 1}, "total_amount": 18.0}
+DELIVERED = {"order_id": 4790, "status": "DELIVERED", "items": {"Burger": 1}, "total_amount": 25.0}
+
+
+def test_order_status_reply_is_for_the_customer():
+    handler = OrdersHandler(ON_ROUTE, DELIVERED)
+    reply = IntentRouter(enabled=True).route("where is my order", handler)
+
+    assert reply == "Your order of Karak Tea x2, French Fries is on its way to you."
+    assert handler.db_service.asked == ("971500000001", ["PREPARING", "ON_ROUTE"])
+
+
+def test_order_status_reply_is_in_the_customers_language():
+    reply = IntentRouter(enabled=True).route("وين طلبي", OrdersHandler(ON_ROUTE))
+    assert reply == "طلبك (Karak Tea x2, French Fries) في الطريق إليك."
+
+    none = IntentRouter(enabled=True).route("وين طلبي", OrdersHandler(DELIVERED))
+    assert none.startswith("لا توجد لديك طلبات")
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from services.message_dedup import MessageDeduplicator
+from services.shared_sessions import LocalRedis, RedisSessionBackend, SQLiteSessionBackend
+
+
+@pytest.fixture(params=["sqlite", "local-redis"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return lambda: SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+    # One server, a client per worker
+    client = LocalRedis()
+    return lambda: RedisSessionBackend(client)
+
+
+def test_redelivery_to_another_worker_is_a_duplicate(store):
+    first, second = MessageDeduplicator(path=None, store=store()), MessageDeduplicator(path=None, store=store())
+
+    assert not first.check("wamid.1")
+    assert second.check("wamid.1")
+    assert not second.check("wamid.2")
+    assert first.check("wamid.2")
+    assert (first.duplicates, second.duplicates) == (1, 1)
+
+
+def test_released_id_is_taken_in_by_the_next_worker(store):
+    first, second = MessageDeduplicator(path=None, store=store()), MessageDeduplicator(path=None, store=store())
+
+    assert not first.check("wamid.1")
+    # Queue full: the webhook is not acked, WhatsApp redelivers elsewhere
+    first.release("wamid.1")
+    assert not second.check("wamid.1")
+    assert first.check("wamid.1")
+
+
+def test_ids_expire_from_the_store_after_the_window(tmp_path):
+    store = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+    first, second = MessageDeduplicator(window=0.01, path=None, store=store), MessageDeduplicator(path=None, store=store)
+
+    assert not first.check("wamid.1")
+    time.sleep(0.02)
+    assert not second.check("wamid.1")
+
+
+def test_store_failure_lets_the_message_through():
+    class Down:
+        def mark_seen(self, message_id, ttl):
+            raise ConnectionError("redis unreachable")
+
+    dedup = MessageDeduplicator(path=None, store=Down())
+    assert not dedup.check("wamid.1")
+    # This worker still recognises its own redelivery
+    assert dedup.check("wamid.1")
+    assert dedup.stats()["store_errors"] == 1
@@ -0,0 +1,275 @@
+import json
+import os
+import time
+
+import pytest
+
+from services.journal import ProcessJournal
+from services.order_writer import OrderWriter
+from services.storage_backend import SQLiteStorage
+
+
+def order(phone="971500000001", total=10.0):
+    return {"items": {"1": 1}, "total_amount": total, "customer_phone_number": phone, "status": "PREPARING"}
+
+
+def stored_orders(storage):
+    return storage._conn.execute("SELECT customer_phone_number FROM orders ORDER BY order_id").fetchall()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "order_journal.jsonl")
+
+
+def make_writer(journal, insert_batch, **kwargs):
+    kwargs.setdefault("flush_size", 100)
+    # Long interval: tests flush explicitly
+    kwargs.setdefault("flush_interval", 60)
+    return OrderWriter(insert_batch, journal, fsync=False, **kwargs)
+
+
+def test_flush_inserts_and_resolves_provisional_ids(journal):
+    storage = SQLiteStorage(":memory:")
+    writer = make_writer(journal, storage.insert_orders)
+
+    ids = [writer.submit(order(f"97150000000{i}")) for i in range(3)]
+    assert [o["order_id"] for o in writer.pending_for("971500000001")] == [ids[1]]
+    writer.flush()
+
+    assert len(stored_orders(storage)) == 3
+    assert [writer.resolve(i) for i in ids] == [1, 2, 3]
+    assert writer.stats()["pending"] == 0
+    assert writer.stats()["flushed"] == 3
+    writer.close()
+    # Nothing pending: the journal was started afresh
+    assert open(writer._journal.path).read() == ""
+
+
+def test_journaled_orders_are_replayed_after_a_crash(journal):
+    def down(rows):
+        raise ConnectionError("database unreachable")
+
+    crashed = make_writer(journal, down)
+    for i in range(3):
+        crashed.submit(order(f"97150000000{i}"))
+    crashed.flush()
+    assert crashed.stats()["pending"] == 3
+    # The process dies here: no close(), the journal is all that is left
+    crashed._journal.close()
+
+    storage = SQLiteStorage(":memory:")
+    restarted = make_writer(journal, storage.insert_orders)
+    restarted.submit(order("971500000009"))
+    restarted.flush()
+    restarted.close()
+
+    assert len(stored_orders(storage)) == 4
+    # Replayed once, never again
+    again = make_writer(journal, storage.insert_orders)
+    again.submit(order("971500000010"))
+    again.flush()
+    again.close()
+    assert len(stored_orders(storage)) == 5
+
+
+def test_torn_final_journal_line_is_skipped(journal):
+    # Journal of a worker process that is gone
+    with open(journal + ".4242", "w") as f:
+        f.write(json.dumps({"op": "submit", "id": "P-1", "row": order()}) + "\n")
+        f.write('{"op": "submit", "id": "P-2", "ro')
+
+    storage = SQLiteStorage(":memory:")
+    writer = make_writer(journal, storage.insert_orders)
+    writer.submit(order("971500000002"))
+    writer.flush()
+    writer.close()
+    assert len(stored_orders(storage)) == 2
+
+
+@pytest.mark.parametrize("returned", [0, 1])
+def test_short_insert_result_is_a_failed_batch(journal, returned):
+    """Supabase returns [] when RLS hides inserted rows; the rows must not
+    be reported flushed, and flush() must not spin on them"""
+    calls = []
+
+    def insert(rows):
+        calls.append(len(rows))
+        return [dict(row, order_id=i + 1) for i, row in enumerate(rows)][:returned]
+
+    writer = make_writer(journal, insert)
+    writer.submit(order("971500000001"))
+    writer.submit(order("971500000002"))
+    writer.flush()
+
+    stats = writer.stats()
+    assert calls == [2]
+    assert stats["pending"] == 2
+    assert stats["flushed"] == 0
+    assert stats["failures"] == 1
+
+
+def test_stored_rows_without_order_id_stay_pending(journal):
+    writer = make_writer(journal, lambda rows: [dict(row) for row in rows])
+    writer.submit(order())
+    writer.flush()
+    assert writer.stats()["pending"] == 1
+    assert writer.stats()["flushed"] == 0
+
+
+def test_bad_row_is_dead_lettered_and_the_rest_written(journal):
+    storage = SQLiteStorage(":memory:")
+
+    def insert(rows):
+        if any(row["customer_phone_number"] == "bad" for row in rows):
+            raise ValueError("violates check constraint")
+        return storage.insert_orders(rows)
+
+    writer = make_writer(journal, insert, max_batch_attempts=1, flush_interval=0.05)
+    writer.submit(order("971500000001"))
+    bad_id = writer.submit(order("bad"))
+    writer.submit(order("971500000003"))
+
+    wait_for(lambda: writer.stats()["pending"] == 0)
+    writer.close()
+
+    assert len(stored_orders(storage)) == 2
+    assert writer.stats()["dead_lettered"] == 1
+    dead = [json.loads(line) for line in open(journal + ".dead")]
+    assert [record["id"] for record in dead] == [bad_id]
+
+
+def test_hidden_rows_end_in_the_dead_letter_file_not_in_a_loop(journal):
+    writer = make_writer(journal, lambda rows: [], max_batch_attempts=1, flush_interval=0.05)
+    writer.submit(order())
+
+    wait_for(lambda: writer.stats()["dead_lettered"] == 1)
+    writer.close()
+    assert writer.stats()["flushed"] == 0
+    assert len(open(journal + ".dead").readlines()) == 1
+
+
+def worker(journal, insert_batch, pid):
+    """Writer as a separate worker process would have it, with its own journal file"""
+    writer = make_writer(journal, insert_batch)
+    writer._journal = ProcessJournal(journal, fsync=False, owner=pid)
+    return writer
+
+
+def test_workers_never_replay_or_truncate_each_others_orders(journal):
+    def down(rows):
+        raise ConnectionError("database unreachable")
+
+    storage = SQLiteStorage(":memory:")
+    slow = worker(journal, down, "101")
+    slow.submit(order("971500000001"))
+    slow.flush()
+
+    # A second worker starts, writes its own order and empties its journal
+    fast = worker(journal, storage.insert_orders, "102")
+    fast.submit(order("971500000002"))
+    fast.flush()
+    fast.close()
+    assert [row[0] for row in stored_orders(storage)] == ["971500000002"]
+    assert slow.stats()["pending"] == 1
+    assert len(open(journal + ".101").readlines()) == 1
+
+    # Once the first worker is gone, the next one to start adopts its journal
+    slow._journal.close()
+    restarted = worker(journal, storage.insert_orders, "103")
+    restarted.submit(order("971500000003"))
+    restarted.flush()
+    restarted.close()
+    assert sorted(row[0] for row in stored_orders(storage)) == ["971500000001", "971500000002", "971500000003"]
+    assert not os.path.exists(journal + ".101")
+
+
+def test_plain_journal_from_before_per_process_files_is_replayed(journal):
+    with open(journal, "w") as f:
+        f.write(json.dumps({"op": "submit", "id": "P-1", "row": order()}) + "\n")
+
+    storage = SQLiteStorage(":memory:")
+    writer = make_writer(journal, storage.insert_orders)
+    writer.submit(order("971500000002"))
+    writer.flush()
+    writer.close()
+    assert len(stored_orders(storage)) == 2
+    assert not os.path.exists(journal)
+
+
+def test_provisional_ids_are_looked_up_before_and_after_the_write(journal, monkeypatch):
+    from services import supabase_service
+    from services.supabase_service import SupabaseService
+
+    storage = SQLiteStorage(":memory:")
+    writer = make_writer(journal, storage.insert_orders)
+    monkeypatch.setattr(supabase_service, "order_writer", writer)
+    db = SupabaseService(storage=storage)
+
+    provisional_id = writer.submit(order("971500000001"))
+    assert db.get_order(provisional_id)["customer_phone_number"] == "971500000001"
+    assert SupabaseService.parse_order_ids([provisional_id, "7"]) == [provisional_id, 7]
+
+    writer.flush()
+    written = db.get_order(provisional_id)
+    assert written["order_id"] == writer.resolve(provisional_id) == 1
+
+    pending_id = writer.submit(order("971500000002"))
+    notifications = db.get_status_notifications([provisional_id, pending_id, "P-unknown"])
+    assert [(n["order_id"], n.get("phone_number"), n.get("error")) for n in notifications] == [
+        (provisional_id, "971500000001", None),
+        (pending_id, "971500000002", None),
+        ("P-unknown", None, "Order not found"),
+    ]
+    writer.close()
+
+
+def test_history_page_with_unflushed_orders_stays_within_the_limit(journal, monkeypatch):
+    from services import supabase_service
+    from services.supabase_service import SupabaseService
+
+    storage = SQLiteStorage(":memory:")
+    storage.insert_orders([order(total=1.0), order(total=2.0)])
+    writer = make_writer(journal, storage.insert_orders)
+    monkeypatch.setattr(supabase_service, "order_writer", writer)
+    db = SupabaseService(storage=storage)
+
+    provisional_id = writer.submit(order(total=3.0))
+    page = db.get_order_history("971500000001", limit=2)
+    assert [o["order_id"] for o in page["orders"]] == [provisional_id, 2]
+    assert page["next_cursor"] == 2
+    assert [o["order_id"] for o in db.get_order_history("971500000001", limit=2, cursor=2)["orders"]] == [1]
+    writer.close()
+
+
+@pytest.mark.parametrize("flushed_before_the_table_read", [True, False])
+def test_order_flushed_during_a_history_read_shows_once(journal, monkeypatch, flushed_before_the_table_read):
+    from services import supabase_service
+    from services.supabase_service import SupabaseService
+
+    storage = SQLiteStorage(":memory:")
+    writer = make_writer(journal, storage.insert_orders)
+    monkeypatch.setattr(supabase_service, "order_writer", writer)
+    fetch_orders = storage.fetch_orders
+
+    def racing_fetch(*args):
+        if flushed_before_the_table_read:
+            writer.flush()
+            return fetch_orders(*args)
+        rows = fetch_orders(*args)
+        writer.flush()
+        return rows
+
+    monkeypatch.setattr(storage, "fetch_orders", racing_fetch)
+    writer.submit(order())
+    page = SupabaseService(storage=storage).get_order_history("971500000001")
+    assert [o["order_id"] for o in page["orders"]] == [1]
+    writer.close()
@@ -0,0 +1,229 @@
+import json
+import threading
+import time
+
+import pytest
+
+from benchmarks.stub_graph import StubGraphServer
+from services.graph_client import GraphResult
+from services.journal import ProcessJournal
+from services.outbound_queue import CHAT, TRANSACTIONAL, OutboundQueue, graph_sender
+
+OK = GraphResult(200, {"messages": [{"id": "wamid.test"}]}, retryable=False)
+UNAVAILABLE = GraphResult(503, {"error": "Service temporarily unavailable"}, retryable=True)
+
+
+class Recorder:
+    """deliver() stand-in that records (to, text) and answers from a script"""
+
+    def __init__(self, answer=None):
+        self.sent = []
+        self.answer = answer or (lambda to, text: OK)
+        self._lock = threading.Lock()
+
+    def __call__(self, payload):
+        to, text = payload["to"], payload["text"]["body"]
+        result = self.answer(to, text)
+        with self._lock:
+            self.sent.append((to, text, result.ok))
+        return result
+
+    def delivered(self):
+        return [(to, text) for to, text, ok in self.sent if ok]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "outbound_journal.jsonl")
+
+
+@pytest.fixture
+def queues():
+    made = []
+
+    def make(deliver, journal_path, **kwargs):
+        kwargs.setdefault("rate", 1000)
+        kwargs.setdefault("burst", 100)
+        kwargs.setdefault("retry_base", 0.01)
+        kwargs.setdefault("retry_max", 0.05)
+        queue = OutboundQueue(deliver, journal_path, **kwargs)
+        made.append(queue)
+        return queue
+
+    yield make
+    for queue in made:
+        queue.close(timeout=0)
+
+
+def test_transactional_messages_go_before_chat(journal, queues):
+    started, gate = threading.Event(), threading.Event()
+
+    def answer(to, text):
+        if text == "blocker":
+            started.set()
+            gate.wait(5)
+        return OK
+
+    deliver = Recorder(answer)
+    queue = queues(deliver, journal, workers=1)
+    queue.enqueue("971500000000", "blocker")
+    started.wait(5)
+    for i in range(3):
+        queue.enqueue(f"97150000010{i}", f"chat {i}", CHAT)
+    for i in range(2):
+        queue.enqueue(f"97150000020{i}", f"order {i} confirmed", TRANSACTIONAL)
+    # The message being sent still counts until it settles
+    assert queue.stats()["depth"] == {TRANSACTIONAL: 2, CHAT: 4}
+    gate.set()
+
+    assert queue.join(timeout=5)
+    assert [text for _, text in deliver.delivered()] == [
+        "blocker", "order 0 confirmed", "order 1 confirmed", "chat 0", "chat 1", "chat 2",
+    ]
+
+
+def test_retried_message_is_not_overtaken_by_later_ones(journal, queues):
+    failures = {"2": 2}
+
+    def answer(to, text):
+        if failures.get(text):
+            failures[text] -= 1
+            return UNAVAILABLE
+        return OK
+
+    deliver = Recorder(answer)
+    queue = queues(deliver, journal, workers=4)
+    for n in range(1, 6):
+        queue.enqueue("971500000001", str(n))
+
+    assert queue.join(timeout=5)
+    assert [text for _, text in deliver.delivered()] == ["1", "2", "3", "4", "5"]
+    assert queue.stats()["retried"] == 2
+    assert queue.stats()["sent"] == 5
+
+
+def test_rejected_message_goes_to_the_dead_letter_file(journal, queues):
+    graph = StubGraphServer(latency=0).start()
+    try:
+        queue = queues(graph_sender(graph.url, "token").deliver, journal)
+        dead_id = queue.enqueue("not-a-number", "hello")
+        queue.enqueue("971500000001", "hello")
+        assert queue.join(timeout=5)
+    finally:
+        graph.stop()
+
+    # A 400 is permanent: one attempt, no retries
+    assert graph.requests == 2
+    stats = queue.stats()
+    assert (stats["sent"], stats["dead_lettered"], stats["retried"]) == (1, 1, 0)
+    dead = [json.loads(line) for line in open(journal + ".dead")]
+    assert [(record["id"], record["status"], record["attempts"]) for record in dead] == [(dead_id, 400, 1)]
+
+
+def test_message_that_keeps_failing_is_dead_lettered_after_max_attempts(journal, queues):
+    deliver = Recorder(lambda to, text: UNAVAILABLE)
+    queue = queues(deliver, journal, max_attempts=3)
+    queue.enqueue("971500000001", "status update")
+    queue.enqueue("971500000001", "second")
+
+    assert queue.join(timeout=5)
+    assert len(deliver.sent) == 6
+    dead = [json.loads(line) for line in open(journal + ".dead")]
+    assert [(record["text"], record["attempts"]) for record in dead] == [("status update", 3), ("second", 3)]
+
+
+def test_unsent_messages_are_replayed_after_a_restart(journal, queues):
+    # Graph is down: messages wait to retry when the process stops
+    down = queues(Recorder(lambda to, text: UNAVAILABLE), journal, retry_base=60, retry_max=60)
+    for n in range(3):
+        down.enqueue("971500000001", f"update {n}", TRANSACTIONAL)
+    down.enqueue("971500000002", "hi", CHAT)
+    down.close(timeout=0)
+    with open(down._journal.path, "a") as f:
+        f.write('{"op": "enqueue", "id": "O-torn", "to": "97150')
+
+    deliver = Recorder()
+    restarted = queues(deliver, journal)
+    restarted.start()
+    assert restarted.join(timeout=5)
+
+    assert restarted.stats()["replayed"] == 4
+    assert [text for to, text in deliver.delivered() if to == "971500000001"] == ["update 0", "update 1", "update 2"]
+    assert len(deliver.delivered()) == 4
+    restarted.close()
+
+    # Everything was sent: nothing is replayed again
+    again = queues(Recorder(), journal)
+    again.start()
+    assert again.stats()["replayed"] == 0
+
+
+def test_workers_never_resend_or_drop_each_others_messages(journal, queues):
+    def worker(deliver, pid, **kwargs):
+        """Queue as a separate worker process would have it, with its own journal file"""
+        queue = queues(deliver, journal, **kwargs)
+        queue._journal = ProcessJournal(journal, owner=pid)
+        return queue
+
+    stuck = worker(Recorder(lambda to, text: UNAVAILABLE), "101", retry_base=60, retry_max=60)
+    stuck.enqueue("971500000001", "from worker 101")
+
+    # Another worker starts, sends its own message and empties its journal
+    deliver = Recorder()
+    busy = worker(deliver, "102")
+    busy.enqueue("971500000002", "from worker 102")
+    assert busy.join(timeout=5)
+    busy.close()
+    assert deliver.delivered() == [("971500000002", "from worker 102")]
+    assert [json.loads(line)["text"] for line in open(journal + ".101")] == ["from worker 101"]
+
+    # The stuck worker stops; the next worker to start sends its message once
+    stuck.close(timeout=0)
+    restarted = worker(deliver, "103")
+    restarted.start()
+    assert restarted.join(timeout=5)
+    assert deliver.delivered()[1:] == [("971500000001", "from worker 101")]
+
+
+def test_sends_are_held_to_the_rate_limit(journal, queues):
+    deliver = Recorder()
+    queue = queues(deliver, journal, rate=20, burst=2, workers=4)
+    start = time.perf_counter()
+    for i in range(10):
+        queue.enqueue(f"97150000000{i}", "hi")
+    assert queue.join(timeout=5)
+
+    # Two from the burst, then eight at 20 a second
+    assert time.perf_counter() - start >= 0.35
+    assert queue.stats()["throttled"] > 0
+
+
+def test_429_from_graph_is_retried_until_delivered(journal, queues):
+    clock = {"now": 0.0}
+    graph = StubGraphServer(latency=0, rate_limit=5, clock=lambda: clock["now"]).start()
+    sender = graph_sender(graph.url, "token")
+
+    def deliver(payload):
+        result = sender.deliver(payload)
+        if result.status == 429:
+            # The queue waits out Retry-After; move the stub into its next window
+            clock["now"] += 1
+        return result
+
+    try:
+        queue = queues(deliver, journal, retry_max=0.05)
+        for i in range(8):
+            queue.enqueue(f"97150000000{i}", f"message {i}")
+        assert queue.join(timeout=10)
+    finally:
+        graph.stop()
+
+    assert graph.messages == 8
+    assert graph.throttled > 0
+    assert queue.stats()["retried"] == graph.throttled
+    assert queue.stats()["dead_lettered"] == 0
+
+
+def test_unknown_priority_is_rejected(journal, queues):
+    with pytest.raises(ValueError):
+        queues(Recorder(), journal).enqueue("971500000001", "hi", priority="bulk")
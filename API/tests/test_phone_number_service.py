@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from services.phone_number_service import LocalCallRegistry, PhoneNumberService, RedisCallRegistry
+from services.shared_sessions import LocalRedis
+
+
+@pytest.fixture(params=["local", "local-redis"])
+def make_registry(request):
+    store = LocalRedis()
+
+    def make(ttl=60.0, max_size=100):
+        if request.param == "local":
+            return LocalCallRegistry(ttl, max_size)
+        return RedisCallRegistry(store, ttl, max_size)
+
+    return make
+
+
+def test_set_get_and_clear(make_registry):
+    service = PhoneNumberService(make_registry(), sweep_interval=60)
+    assert service.set_phone("call_1", "971500000001")
+    assert service.get_phone("call_1") == "971500000001"
+    assert service.clear_phone("call_1")
+    assert not service.clear_phone("call_1")
+    assert service.get_phone("call_1") is None
+
+    stats = service.stats()
+    assert (stats["registered"], stats["cleared"], stats["lookups"], stats["misses"]) == (1, 1, 2, 1)
+
+
+def test_missing_call_id_is_refused(make_registry):
+    service = PhoneNumberService(make_registry(), sweep_interval=60)
+    assert not service.set_phone("", "971500000001")
+    assert service.get_active_sessions_count() == 0
+
+
+def test_entries_expire_after_the_ttl(make_registry):
+    registry = make_registry(ttl=0.1)
+    registry.set("call_1", "971500000001")
+    registry.set("call_2", "971500000002")
+    assert registry.count() == 2
+
+    time.sleep(0.15)
+    registry.set("call_3", "971500000003")
+    assert registry.get("call_1") is None
+    assert registry.count() == 1
+    assert registry.get("call_3") == "971500000003"
+
+
+def test_sweep_drops_only_expired_entries(make_registry):
+    registry = make_registry(ttl=0.1)
+    for i in range(5):
+        registry.set(f"old_{i}", "971500000001")
+    time.sleep(0.15)
+    registry.set("new", "971500000002")
+
+    assert registry.sweep() == 5
+    assert registry.sweep() == 0
+    assert registry.get("new") == "971500000002"
+
+
+def test_cap_trims_the_oldest_calls(make_registry):
+    registry = make_registry(max_size=3)
+    for i in range(5):
+        registry.set(f"call_{i}", f"97150000000{i}")
+
+    assert registry.count() == 3
+    assert registry.evicted == 2
+    assert [registry.get(f"call_{i}") for i in range(5)] == [None, None, "971500000002", "971500000003", "971500000004"]
+
+
+def test_re_registering_a_call_refreshes_it(make_registry):
+    registry = make_registry(ttl=0.2, max_size=2)
+    registry.set("call_1", "971500000001")
+    registry.set("call_2", "971500000002")
+    time.sleep(0.1)
+    registry.set("call_1", "971500000001")
+    registry.set("call_3", "971500000003")
+
+    # call_2 is now the oldest, so the cap evicts it
+    assert registry.get("call_2") is None
+    time.sleep(0.15)
+    assert registry.get("call_1") == "971500000001"
+
+
+def test_background_sweeper_runs(make_registry):
+    service = PhoneNumberService(make_registry(ttl=0.05), sweep_interval=0.05)
+    service.set_phone("call_1", "971500000001")
+    deadline = time.monotonic() + 2
+    while service.stats()["swept"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert service.stats()["swept"] == 1
+
+
+def test_workers_share_calls_through_one_store():
+    store = LocalRedis()
+    webhook_worker = PhoneNumberService(RedisCallRegistry(store), sweep_interval=60)
+    tool_worker = PhoneNumberService(RedisCallRegistry(store), sweep_interval=60)
+
+    webhook_worker.set_phone("call_1", "971500000001")
+    assert tool_worker.get_phone("call_1") == "971500000001"
+    assert tool_worker.get_active_sessions_count() == 1
+    tool_worker.clear_phone("call_1")
+    assert webhook_worker.get_phone("call_1") is None
+
+
+class BrokenRegistry(LocalCallRegistry):
+    def set(self, call_id, phone_number):
+        raise ConnectionError("redis unreachable")
+
+    def get(self, call_id):
+        raise ConnectionError("redis unreachable")
+
+
+def test_store_errors_are_counted_not_raised():
+    service = PhoneNumberService(BrokenRegistry(), sweep_interval=60)
+    assert not service.set_phone("call_1", "971500000001")
+    assert service.get_phone("call_1") is None
+    assert service.stats()["errors"] == 2
@@ -0,0 +1,36 @@
+from services.reply_stream import SentenceChunker
+
+SHORT = (
+    "Your order of 2 Karak Tea and French Fries comes to 18 AED. "
+    "We deliver to Marina Walk in about 30 minutes. "
+    "Shall I place it for you?"
+)
+
+
+def stream(chunker, text, size=7):
+    messages = []
+    for start in range(0, len(text), size):
+        messages.extend(chunker.feed(text[start:start + size]))
+    return messages + chunker.flush()
+
+
+def test_typical_reply_is_one_message():
+    assert stream(SentenceChunker(), SHORT) == [SHORT]
+
+
+def test_long_reply_sends_its_first_sentences_early():
+    long_reply = " ".join([SHORT] * 6)
+    chunker = SentenceChunker()
+    sent_while_streaming = []
+    for start in range(0, len(long_reply), 7):
+        sent_while_streaming.extend(chunker.feed(long_reply[start:start + 7]))
+    rest = chunker.flush()
+
+    assert len(sent_while_streaming) == 1 and len(sent_while_streaming[0]) >= 400
+    assert " ".join(sent_while_streaming + rest) == long_reply
+
+
+def test_remainder_is_split_at_the_whatsapp_limit():
+    messages = stream(SentenceChunker(first_message_chars=10, max_message_chars=120), " ".join([SHORT] * 3))
+    assert all(len(message) <= 120 for message in messages)
+    assert len(messages) > 2
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+
+from services.sender_queue import AsyncSenderQueues, SenderQueues
+
+
+class Recorder:
+    """Handler that records jobs per sender and checks no sender ever has
+    two jobs in progress at once"""
+
+    def __init__(self, delay=0.0, seed=7):
+        self.delay = delay
+        self.seen = defaultdict(list)
+        self.running = defaultdict(int)
+        self.overlaps = 0
+        self.peak = 0
+        self._active = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _begin(self, sender, job):
+        with self._lock:
+            self.running[sender] += 1
+            self.overlaps += self.running[sender] > 1
+            self._active += 1
+            self.peak = max(self.peak, self._active)
+            self.seen[sender].append(job)
+            return self._random.uniform(0, self.delay)
+
+    def _end(self, sender):
+        with self._lock:
+            self.running[sender] -= 1
+            self._active -= 1
+
+    def __call__(self, sender, job):
+        time.sleep(self._begin(sender, job))
+        self._end(sender)
+
+    async def handle(self, sender, job):
+        await asyncio.sleep(self._begin(sender, job))
+        self._end(sender)
+
+
+def test_jobs_run_in_order_per_sender():
+    handler = Recorder(delay=0.005)
+    queues = SenderQueues(handler, workers=8, coalesce_window=0)
+    senders = [f"97150000000{i}" for i in range(4)]
+    for n in range(20):
+        for sender in senders:
+            assert queues.submit(sender, n)
+
+    assert queues.join(timeout=10)
+    assert all(handler.seen[sender] == list(range(20)) for sender in senders)
+    assert handler.overlaps == 0
+    assert queues.stats()["processed"] == 80
+    queues.close()
+
+
+def test_senders_run_in_parallel():
+    queues = SenderQueues(lambda sender, job: time.sleep(0.1), workers=4, coalesce_window=0)
+    start = time.perf_counter()
+    for i in range(4):
+        queues.submit(f"sender-{i}", "hi")
+    queues.join(timeout=5)
+    assert time.perf_counter() - start < 0.3
+    queues.close()
+
+
+def test_busy_sender_does_not_starve_others():
+    order = []
+    started, gate = threading.Event(), threading.Event()
+
+    def handler(sender, job):
+        if sender == "blocker":
+            started.set()
+            gate.wait(5)
+        order.append(sender)
+
+    queues = SenderQueues(handler, workers=1, coalesce_window=0)
+    queues.submit("blocker", None)
+    started.wait(5)
+    for _ in range(3):
+        queues.submit("chatty", None)
+    queues.submit("quiet", None)
+    gate.set()
+
+    queues.join(timeout=5)
+    # The worker hands "chatty" back to the end of the line after each job
+    assert order == ["blocker", "chatty", "quiet", "chatty", "chatty"]
+    queues.close()
+
+
+def test_full_queues_refuse_jobs():
+    started, gate = threading.Event(), threading.Event()
+    queues = SenderQueues(lambda sender, job: (started.set(), gate.wait(5)), workers=1, max_depth=4,
+                          sender_max_depth=2, coalesce_window=0)
+    assert queues.submit("a", 1)
+    started.wait(5)  # the worker has taken "a"'s first job
+    assert queues.submit("a", 2) and queues.submit("a", 3)
+    assert not queues.submit("a", 4)
+    assert queues.submit("b", 1) and queues.submit("c", 1)
+    assert not queues.submit("d", 1)
+    assert queues.stats()["rejected"] == 2
+
+    gate.set()
+    assert queues.join(timeout=5)
+    queues.close()
+
+
+def test_failing_job_is_counted_and_the_sender_continues():
+    seen = []
+
+    def handler(sender, job):
+        if job == "bad":
+            raise ValueError("boom")
+        seen.append(job)
+
+    queues = SenderQueues(handler, workers=2, coalesce_window=0)
+    for job in ("first", "bad", "last"):
+        queues.submit("971500000001", job)
+    queues.join(timeout=5)
+    assert seen == ["first", "last"]
+    assert queues.stats()["failed"] == 1
+    queues.close()
+
+
+def test_rapid_messages_are_coalesced_into_one_turn():
+    seen = []
+    queues = SenderQueues(lambda sender, job: seen.append(job), workers=2,
+                          merge=" ".join, coalesce_window=0.05, coalesce_max_wait=1)
+    for bubble in ("hi", "I want", "2 shawarma"):
+        queues.submit("971500000001", bubble)
+    queues.submit("971500000002", "menu")
+
+    queues.join(timeout=5)
+    assert sorted(seen) == ["hi I want 2 shawarma", "menu"]
+    assert queues.stats()["coalesced"] == 2
+    queues.close()
+
+
+def test_join_times_out_while_work_is_queued():
+    gate = threading.Event()
+    queues = SenderQueues(lambda sender, job: gate.wait(5), workers=1, coalesce_window=0)
+    queues.submit("a", None)
+    assert not queues.join(timeout=0.05)
+    gate.set()
+    assert queues.join(timeout=5)
+    queues.close()
+
+
+def test_async_queues_keep_order_and_bound_concurrency():
+    handler = Recorder(delay=0.005)
+
+    async def main():
+        queues = AsyncSenderQueues(handler.handle, workers=3, coalesce_window=0)
+        for n in range(10):
+            for i in range(6):
+                assert queues.submit(f"sender-{i}", n)
+        await queues.join()
+        return queues
+
+    queues = asyncio.run(main())
+    assert all(jobs == list(range(10)) for jobs in handler.seen.values())
+    assert handler.overlaps == 0
+    assert handler.peak <= 3
+    assert queues.stats()["processed"] == 60
@@ -0,0 +1,46 @@
+import contextlib
+import io
+
+from services.session_store import SessionStore
+
+
+class Session:
+    def __init__(self, name, fails=False):
+        self.name = name
+        self.fails = fails
+
+    def hibernate(self):
+        if self.fails:
+            raise ValueError("history not serializable")
+        return self.name.encode()
+
+
+def restore(sender, state):
+    return Session(state.decode())
+
+
+def test_session_that_cannot_hibernate_stays_live():
+    store = SessionStore(restore, max_active=2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        store["a"] = Session("a", fails=True)
+        store["b"] = Session("b")
+        store["c"] = Session("c")
+
+    # "a" was least recently used but could not be hibernated, so "b" went instead
+    assert store.peek("a").name == "a"
+    assert store.peek("b") is None and store["b"].name == "b"
+    stats = store.stats()
+    assert stats["hibernate_errors"] == 1
+    assert stats["hibernated_lru"] == 2
+    assert stats["forgotten"] == 0
+
+
+def test_idle_session_that_cannot_hibernate_stays_live():
+    store = SessionStore(restore, idle_ttl=0)
+    store["a"] = Session("a", fails=True)
+    store["b"] = Session("b")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert store.hibernate_idle() == 1
+    assert store.peek("a") is not None
+    assert store.peek("b") is None
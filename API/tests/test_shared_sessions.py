@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import google.generativeai as genai
+import pytest
+
+from services.shared_sessions import (
+    LocalRedis,
+    RedisSessionBackend,
+    SessionLockTimeout,
+    SharedSessions,
+    SQLiteSessionBackend,
+)
+
+SENDER = "971500000001"
+
+
+class FakeSession:
+    """The parts of LLMService that SharedSessions uses"""
+
+    def __init__(self):
+        self.chat_session = SimpleNamespace(history=[])
+        self.history = SimpleNamespace(compactions=0)
+        self.meta = {"cart": None}
+
+    def say(self, *texts):
+        for role, text in zip(("user", "model") * len(texts), texts):
+            self.chat_session.history.append(
+                genai.protos.Content(role=role, parts=[genai.protos.Part(text=text)])
+            )
+
+    def texts(self):
+        return [content.parts[0].text for content in self.chat_session.history]
+
+    def session_meta(self):
+        return dict(self.meta)
+
+    def load_session_meta(self, meta):
+        self.meta = dict(meta)
+
+
+@pytest.fixture(params=["sqlite", "local-redis"])
+def backends(request, tmp_path):
+    """Two handles on one store, as two worker processes would have"""
+    if request.param == "sqlite":
+        path = str(tmp_path / "sessions.db")
+        return SQLiteSessionBackend(path), SQLiteSessionBackend(path)
+    store = LocalRedis()
+    return RedisSessionBackend(store), RedisSessionBackend(store)
+
+
+@pytest.fixture
+def workers(backends):
+    return [SharedSessions(backend, lock_ttl=5, lock_wait=0.1) for backend in backends]
+
+
+def test_first_turn_is_new_and_another_worker_loads_it_in_full(workers):
+    a, b = workers
+    session = FakeSession()
+    with a.turn(SENDER, session):
+        session.say("hi", "Hello! How can I help?")
+        session.meta = {"cart": "2x Karak Tea"}
+    assert a.stats()["pulls"]["new"] == 1
+
+    other = FakeSession()
+    assert b.pull(SENDER, other) == "full"
+    assert other.texts() == ["hi", "Hello! How can I help?"]
+    assert other.meta == {"cart": "2x Karak Tea"}
+
+
+def test_only_new_entries_move_between_workers(workers):
+    a, b = workers
+    first, second = FakeSession(), FakeSession()
+    with a.turn(SENDER, first):
+        first.say("hi", "Hello!")
+    with b.turn(SENDER, second):
+        second.say("menu", "Here is the menu")
+    assert b.stats()["entries_written"] == 2
+
+    # a last saw two entries; it reads just the two b added
+    assert a.pull(SENDER, first) == "delta"
+    assert first.texts() == ["hi", "Hello!", "menu", "Here is the menu"]
+    assert a.stats()["entries_read"] == 2
+
+    with a.turn(SENDER, first):
+        first.say("thanks", "Anytime")
+    assert a.stats()["entries_written"] == 4
+    assert b.pull(SENDER, second) == "delta"
+    assert second.texts() == first.texts()
+
+
+def test_pull_after_own_push_reads_nothing(workers):
+    a, _ = workers
+    session = FakeSession()
+    with a.turn(SENDER, session):
+        session.say("hi", "Hello!")
+    read = a.stats()["entries_read"]
+    assert a.pull(SENDER, session) == "current"
+    assert a.stats()["entries_read"] == read
+
+
+def test_unchanged_turn_writes_nothing(workers):
+    a, _ = workers
+    session = FakeSession()
+    with a.turn(SENDER, session):
+        session.say("hi", "Hello!")
+    with a.turn(SENDER, session):
+        pass
+    assert a.stats()["pushes"] == 1
+
+
+def test_compaction_rewrites_and_others_reload_in_full(workers):
+    a, b = workers
+    first, second = FakeSession(), FakeSession()
+    with a.turn(SENDER, first):
+        first.say("hi", "Hello!", "menu", "Here is the menu")
+    b.pull(SENDER, second)
+
+    with a.turn(SENDER, first):
+        first.chat_session.history = first.chat_session.history[2:]
+        first.history.compactions += 1
+    assert a.stats()["rewrites"] == 1
+
+    assert b.pull(SENDER, second) == "full"
+    assert second.texts() == ["menu", "Here is the menu"]
+
+
+def test_failed_turn_is_not_stored_and_reloads_next_time(workers):
+    a, _ = workers
+    session = FakeSession()
+    with a.turn(SENDER, session):
+        session.say("hi", "Hello!")
+
+    with pytest.raises(RuntimeError):
+        with a.turn(SENDER, session):
+            session.say("half a turn")
+            raise RuntimeError("model call failed")
+
+    assert a.pull(SENDER, session) == "full"
+    assert session.texts() == ["hi", "Hello!"]
+    # The lease was released on the way out
+    a.acquire(SENDER)
+    a.release(SENDER)
+
+
+def test_lease_excludes_other_workers_until_released(workers):
+    a, b = workers
+    a.acquire(SENDER)
+    with pytest.raises(SessionLockTimeout):
+        b.acquire(SENDER)
+    assert b.stats()["lock_timeouts"] == 1
+    # Other senders are not affected
+    b.acquire("971500000002")
+
+    threading.Timer(0.03, a.release, args=(SENDER,)).start()
+    b.acquire(SENDER)
+    b.release(SENDER)
+
+
+def test_lease_of_a_crashed_worker_expires(backends):
+    crashed = SharedSessions(backends[0], lock_ttl=0.1, lock_wait=1)
+    survivor = SharedSessions(backends[1], lock_ttl=0.1, lock_wait=1)
+    crashed.acquire(SENDER)
+
+    start = time.monotonic()
+    survivor.acquire(SENDER)
+    assert 0.05 <= time.monotonic() - start < 1
+    # The late release must not drop the survivor's lease
+    crashed.release(SENDER)
+    with pytest.raises(SessionLockTimeout):
+        SharedSessions(backends[0], lock_ttl=5, lock_wait=0.05).acquire(SENDER)
+
+
+def test_concurrent_turns_for_one_sender_are_serialised(workers):
+    a, b = workers
+    sessions = {a: FakeSession(), b: FakeSession()}
+    for worker in workers:
+        worker.lock_wait = 5
+
+    def run(worker, n):
+        for i in range(n):
+            session = sessions[worker]
+            with worker.turn(SENDER, session):
+                session.say(f"{id(worker)}-{i}", "ok")
+
+    threads = [threading.Thread(target=run, args=(worker, 10)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    a.pull(SENDER, sessions[a])
+    b.pull(SENDER, sessions[b])
+    assert len(sessions[a].texts()) == 40
+    assert sessions[a].texts() == sessions[b].texts()
+
+
+def test_aturn_syncs_from_the_event_loop(workers):
+    a, b = workers
+    session = FakeSession()
+
+    async def main():
+        async with a.aturn(SENDER, session):
+            session.say("hi", "Hello!")
+
+    asyncio.run(main())
+    other = FakeSession()
+    assert b.pull(SENDER, other) == "full"
+    assert other.texts() == ["hi", "Hello!"]
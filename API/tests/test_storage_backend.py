@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from benchmarks.storage_baseline import MENU
+from services.storage_backend import SQLiteStorage, ThreadedStorage, build_storage_backend
+
+PHONE = "971500000001"
+
+
+def order(phone=PHONE, status="PREPARING", items=None):
+    return {
+        "items": items or {"1": 2},
+        "total_amount": 24.0,
+        "delivery_address": "Marina Walk",
+        "customer_phone_number": phone,
+        "status": status,
+    }
+
+
+@pytest.fixture
+def storage():
+    storage = SQLiteStorage(":memory:")
+    storage.load_menu(MENU)
+    return storage
+
+
+def test_menu_round_trips_optional_columns(storage):
+    rows = storage.fetch_menu_rows()
+    assert [row["name"] for row in rows] == [item["name"] for item in MENU]
+    assert all(row["is_available"] is True for row in rows)
+    breakfast = rows[4]
+    assert (breakfast["available_from"], breakfast["available_until"]) == ("07:00", "11:30")
+    # Unset availability columns are left out rather than returned as None
+    assert "available_from" not in rows[0]
+
+
+def test_load_menu_replaces_the_table(storage):
+    storage.load_menu([{"name": "Karak Tea", "category": "Drinks", "price": 5, "is_available": False,
+                        "available_days": ["Friday", "Saturday"]}])
+    rows = storage.fetch_menu_rows()
+    assert len(rows) == 1
+    assert rows[0]["is_available"] is False
+    assert rows[0]["available_days"] == "Friday,Saturday"
+
+
+def test_insert_orders_returns_stored_rows_in_order(storage):
+    stored = storage.insert_orders([order(items={"1": 1}), order(items={"2": 3})])
+    assert [row["order_id"] for row in stored] == [1, 2]
+
+    fetched = storage.get_order(2)
+    assert fetched["items"] == {"2": 3}
+    assert fetched["customer_phone_number"] == PHONE
+    assert storage.get_order(99) is None
+
+
+def test_get_orders_fetches_notification_columns_and_skips_missing_ids(storage):
+    storage.insert_orders([order("971500000001"), order("971500000002", status="ON_ROUTE")])
+    rows = sorted(storage.get_orders([2, 1, 42]), key=lambda row: row["order_id"])
+    assert [row["order_id"] for row in rows] == [1, 2]
+    assert set(rows[1]) == {"order_id", "items", "delivery_address", "customer_phone_number", "status"}
+    assert rows[1]["status"] == "ON_ROUTE"
+    assert storage.get_orders([]) == []
+
+
+def test_fetch_orders_pages_newest_first(storage):
+    storage.insert_orders([order() for _ in range(5)] + [order("971500000002")])
+
+    first = storage.fetch_orders(PHONE, limit=2)
+    assert [row["order_id"] for row in first] == [5, 4]
+    second = storage.fetch_orders(PHONE, limit=2, cursor=first[-1]["order_id"])
+    assert [row["order_id"] for row in second] == [3, 2]
+    last = storage.fetch_orders(PHONE, limit=2, cursor=second[-1]["order_id"])
+    assert [row["order_id"] for row in last] == [1]
+    assert "customer_phone_number" not in first[0]
+
+
+def test_fetch_orders_filters_by_status(storage):
+    statuses = ["PREPARING", "ON_ROUTE", "DELIVERED", "ON_ROUTE"]
+    storage.insert_orders([order(status=status) for status in statuses])
+
+    assert [row["order_id"] for row in storage.fetch_orders(PHONE, 10, statuses=["ON_ROUTE"])] == [4, 2]
+    active = storage.fetch_orders(PHONE, 10, statuses=["PREPARING", "ON_ROUTE"])
+    assert [row["order_id"] for row in active] == [4, 2, 1]
+
+
+def test_sqlite_file_persists_across_instances(tmp_path):
+    path = str(tmp_path / "data" / "ritaj.db")
+    SQLiteStorage(path).insert_orders([order()])
+    assert SQLiteStorage(path).get_order(1)["status"] == "PREPARING"
+
+
+def test_threaded_storage_awaits_the_sync_backend(storage):
+    threaded = ThreadedStorage(storage)
+
+    async def main():
+        stored = await threaded.insert_orders([order(), order()])
+        return stored, await threaded.fetch_orders(PHONE, 10), await threaded.get_orders([1])
+
+    stored, fetched, notify = asyncio.run(main())
+    assert [row["order_id"] for row in stored] == [1, 2]
+    assert [row["order_id"] for row in fetched] == [2, 1]
+    assert notify[0]["order_id"] == 1
+
+
+def test_unknown_backend_is_rejected():
+    assert isinstance(build_storage_backend("memory"), SQLiteStorage)
+    with pytest.raises(ValueError):
+        build_storage_backend("postgres")
@@ -0,0 +1,80 @@
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.session_memory import setup
+from services.llm_service import LLMService
+from services.token_usage import BUDGET_EXHAUSTED_REPLY, SessionBudget
+
+MESSAGE = "Can I get two karak tea and fries to Marina Walk"
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_budget_resets_once_the_window_passes():
+    clock = Clock()
+    budget = SessionBudget(limit=1000, compact_fraction=0.5, window_hours=1, clock=clock)
+    budget.charge(600)
+    assert budget.should_compact() and not budget.exhausted()
+    clock.now += 1800
+    budget.charge(400)
+    assert budget.exhausted()
+    assert budget.resets_in() == 1800
+
+    clock.now += 1800
+    assert not budget.exhausted()
+    assert budget.to_dict()["remaining"] == 1000
+    # The next window starts with the next model call
+    clock.now += 100
+    budget.charge(10)
+    assert budget.resets_in() == 3600
+
+
+def test_budget_state_round_trips():
+    clock = Clock()
+    budget = SessionBudget(limit=100, window_hours=1, clock=clock)
+    budget.charge(150)
+    budget.cutoffs = 2
+
+    restored = SessionBudget(limit=100, window_hours=1, clock=clock)
+    restored.load_state(budget.state())
+    assert restored.exhausted() and restored.cutoffs == 2
+    clock.now += 3600
+    assert not restored.exhausted()
+
+
+def test_zero_limit_disables_the_budget():
+    budget = SessionBudget(limit=0)
+    budget.charge(10 ** 9)
+    assert not budget.exhausted() and not budget.should_compact()
+
+
+@pytest.fixture
+def llm():
+    setup()
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield LLMService("971500000001")
+
+
+def test_sender_is_cut_off_then_chats_again_in_a_new_window(llm):
+    clock = Clock()
+    llm.budget = SessionBudget(limit=1, window_hours=6, clock=clock)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert llm.chat(MESSAGE) != BUDGET_EXHAUSTED_REPLY
+        assert llm.chat(MESSAGE) == BUDGET_EXHAUSTED_REPLY
+
+        # Hibernating keeps the window, so a restore is not a way around it
+        restored = LLMService.restore("971500000001", llm.hibernate())
+        restored.budget.limit, restored.budget.clock = 1, clock
+        assert restored.chat(MESSAGE) == BUDGET_EXHAUSTED_REPLY
+
+        clock.now += 6 * 3600
+        assert restored.chat(MESSAGE) != BUDGET_EXHAUSTED_REPLY
+    assert restored.budget.cutoffs == 2
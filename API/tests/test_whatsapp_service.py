@@ -0,0 +1,96 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import google.generativeai as genai
+import pytest
+
+from services.shared_sessions import LocalRedis, RedisSessionBackend, SharedSessions, SQLiteSessionBackend
+from services.whatsapp_service import SESSION_UNAVAILABLE_REPLY, InboundMessage, WhatsAppService
+
+SENDER = "971500000001"
+
+
+class EchoSession:
+    """LLMService stand-in: echoes the message and keeps it in its history"""
+
+    def __init__(self):
+        self.chat_session = SimpleNamespace(history=[])
+        self.history = SimpleNamespace(compactions=0)
+
+    def chat(self, text):
+        reply = f"echo: {text}"
+        for role, part in (("user", text), ("model", reply)):
+            self.chat_session.history.append(genai.protos.Content(role=role, parts=[genai.protos.Part(text=part)]))
+        return reply
+
+    def session_meta(self):
+        return {}
+
+    def load_session_meta(self, meta):
+        pass
+
+
+@pytest.fixture(params=["sqlite", "local-redis"])
+def backends(request, tmp_path):
+    """Two handles on one store, as two worker processes would have"""
+    if request.param == "sqlite":
+        path = str(tmp_path / "sessions.db")
+        return SQLiteSessionBackend(path), SQLiteSessionBackend(path)
+    store = LocalRedis()
+    return RedisSessionBackend(store), RedisSessionBackend(store)
+
+
+@pytest.fixture
+def service(backends):
+    service = WhatsAppService()
+    service.shared_sessions = SharedSessions(backends[0], lock_ttl=5, lock_wait=0.05)
+    service.stream_replies = False
+    service.queue.coalesce_window = 0
+    service.chat_sessions[SENDER] = EchoSession()
+    service.sent = []
+    service.send_message = lambda to, text, priority=None: service.sent.append((to, text))
+    yield service
+    service.queue.close(timeout=1)
+
+
+@pytest.fixture
+def other_worker(backends):
+    return SharedSessions(backends[1], lock_ttl=5, lock_wait=0.05)
+
+
+def message(text):
+    now = time.perf_counter()
+    return InboundMessage(SENDER, text, now, now, "wamid.1")
+
+
+def test_message_is_retried_once_the_other_worker_lets_go(service, other_worker):
+    other_worker.acquire(SENDER)
+
+    def release_after_first_timeout():
+        while service.shared_sessions.lock_timeouts == 0:
+            time.sleep(0.01)
+        other_worker.release(SENDER)
+
+    releaser = threading.Thread(target=release_after_first_timeout)
+    releaser.start()
+    assert service.queue.submit(SENDER, message("hi"))
+    assert service.queue.join(timeout=5)
+    releaser.join()
+
+    assert service.shared_sessions.lock_timeouts == 1
+    assert service.sent == [(SENDER, "echo: hi")]
+
+
+def test_customer_is_asked_to_resend_when_the_lease_stays_held(service, other_worker):
+    other_worker.acquire(SENDER)
+
+    assert service.queue.submit(SENDER, message("hi"))
+    assert service.queue.join(timeout=5)
+    assert service.shared_sessions.lock_timeouts == 2
+    assert service.sent == [(SENDER, SESSION_UNAVAILABLE_REPLY["en"])]
+
+    # Handled inline there is no queue to go back on
+    service.async_ack = False
+    service.handle_message(SENDER, message("وين طلبي"))
+    assert service.sent[-1] == (SENDER, SESSION_UNAVAILABLE_REPLY["ar"])
@@ -0,0 +1,64 @@
+"""Summarize per-turn latency traces written to TURN_TRACE_PATH.
+
+    python trace_report.py data/turn_traces.jsonl
+    python trace_report.py data/turn_traces.jsonl --last 500 --slowest 5
+    python trace_report.py data/turn_traces.jsonl --sender 971500000000
+"""
+import argparse
+import json
+
+from services.turn_trace import TURN_TRACE_PATH, load_traces, summarize
+
+
+def print_summary(summary):
+    print(f"{'span':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in summary.items():
+        print(
+            f"{name:<28}{row['count']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+
+
+def print_slowest(traces, count):
+    print(f"\nSlowest {count} turns:")
+    for trace in sorted(traces, key=lambda t: t.get("total_ms") or 0, reverse=True)[:count]:
+        print(f"\n{trace['trace_id']}  sender={trace['sender']}  total={trace['total_ms']} ms")
+        for item in sorted(trace["spans"], key=lambda s: s["start_ms"]):
+            attrs = " ".join(f"{k}={v}" for k, v in item.get("attrs", {}).items())
+            print(f"  +{item['start_ms']:>9.1f}  {item['duration_ms']:>9.1f} ms  {item['name']}  {attrs}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=TURN_TRACE_PATH)
+    parser.add_argument("--last", type=int, help="only the most recent N turns")
+    parser.add_argument("--sender", help="only turns from this WhatsApp number")
+    parser.add_argument("--slowest", type=int, default=0, help="also show the span breakdown of the N slowest turns")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    if not args.path:
+        parser.error("no trace file given and TURN_TRACE_PATH is not set")
+
+    traces = load_traces(args.path)
+    if args.sender:
+        traces = [t for t in traces if t.get("sender") == args.sender]
+    if args.last:
+        traces = traces[-args.last:]
+    if not traces:
+        print("No traces found")
+        return
+
+    summary = summarize(traces)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{len(traces)} turns from {args.path}\n")
+    print_summary(summary)
+    if args.slowest:
+        print_slowest(traces, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
@@ -52,6 +52,16 @@ function App() {
     }
   };
 
+  // Tell the API to drop its cached menu so bots see the edit immediately
+  const refreshApiMenuCache = async () => {
+    try {
+      const apiUrl = process.env.REACT_APP_API_URL || 'https://tortoise-working-naturally.ngrok-free.app';
+      await fetch(`${apiUrl}/menu/refresh`, { method: 'POST' });
+    } catch (err) {
+      console.error('Error refreshing API menu cache:', err);
+    }
+  };
+
   const fetchCategories = async () => {
     const { data, error } = await supabase
       .from('menu')
@@ -71,7 +81,7 @@ function App() {
       case 'orders':
         return <LiveOrders orders={orders} onOrderUpdate={fetchOrders} menuItems={menuItems} />;
       case 'menu':
-        return <MenuManagement menuItems={menuItems} categories={categories} onMenuUpdate={() => { fetchMenuItems(); fetchCategories(); }} />;
+        return <MenuManagement menuItems={menuItems} categories={categories} onMenuUpdate={() => { fetchMenuItems(); fetchCategories(); refreshApiMenuCache(); }} />;
       case 'analytics':
         return <Analytics orders={orders} menuItems={menuItems} />;
       default:
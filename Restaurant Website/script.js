@@ -23,6 +23,7 @@ const translations = {
         'feature-location': 'Prime Location',
         'feature-location-desc': 'Conveniently located in Abu Dhabi',
         'menu-title': 'Our Menu',
+        'menu-available-title': 'Available Now',
         'gallery-title': 'Gallery',
         'contact-title': 'Contact Us',
         'contact-address-title': 'Address',
@@ -54,6 +55,7 @@ const translations = {
         'feature-location': 'موقع متميز',
         'feature-location-desc': 'موقع مناسب في أبو ظبي',
         'menu-title': 'قائمتنا',
+        'menu-available-title': 'متوفر الآن',
         'gallery-title': 'المعرض',
         'contact-title': 'اتصل بنا',
         'contact-address-title': 'العنوان',
@@ -85,6 +87,7 @@ const translations = {
         'feature-location': 'प्रमुख स्थान',
         'feature-location-desc': 'अबू धाबी में सुविधाजनक स्थित',
         'menu-title': 'हमारा मेनू',
+        'menu-available-title': 'अभी उपलब्ध',
         'gallery-title': 'गैलरी',
         'contact-title': 'संपर्क करें',
         'contact-address-title': 'पता',
@@ -101,6 +104,7 @@ const translations = {
 
 // ===== GLOBAL VARIABLES =====
 let currentLanguage = 'en';
+const API_URL = 'https://tortoise-working-naturally.ngrok-free.app';
 
 // ===== DOM ELEMENTS =====
 const header = document.getElementById('header');
@@ -121,6 +125,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initNavigation();
     initLanguageSwitcher();
     initMenuTabs();
+    initAvailableNow();
     initGallery();
 });
 
@@ -250,6 +255,41 @@ function initMenuTabs() {
     });
 }
 
+// ===== AVAILABLE NOW =====
+// Day/time-limited specials that can be ordered right now, from the API's
+// precompiled availability schedule
+async function initAvailableNow() {
+    const container = document.getElementById('menuAvailable');
+    const list = document.getElementById('menuAvailableList');
+    if (!container || !list) return;
+
+    try {
+        const response = await fetch(`${API_URL}/menu`, {
+            headers: { 'ngrok-skip-browser-warning': 'true' }
+        });
+        if (!response.ok) return;
+
+        const menu = await response.json();
+        const specials = Object.values(menu)
+            .flat()
+            .filter(item => item.is_available && item.schedule);
+
+        if (specials.length === 0) return;
+
+        specials.forEach(item => {
+            const li = document.createElement('li');
+            li.textContent = `${item.name} `;
+            const schedule = document.createElement('span');
+            schedule.textContent = `(${item.schedule})`;
+            li.appendChild(schedule);
+            list.appendChild(li);
+        });
+        container.hidden = false;
+    } catch (err) {
+        console.error('Error loading available menu items:', err);
+    }
+}
+
 // ===== GALLERY & LIGHTBOX =====
 function initGallery() {
     galleryItems.forEach(item => {